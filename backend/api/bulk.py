@@ -0,0 +1,105 @@
+"""
+Разбор тела запроса для массового импорта (POST /<коллекция>/bulk).
+
+Поддерживаются JSON массив, NDJSON, CSV и загрузка файла (multipart,
+поле file; формат по расширению или типу файла). Строки проверяются
+схемой по отдельности, ошибки возвращаются с номером строки (с 1),
+а прошедшие проверку записи сохраняются одной записью репозитория.
+"""
+import csv
+import io
+import json
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
+
+from fastapi import HTTPException, Query, Request, status
+from pydantic import BaseModel, ValidationError
+
+from domain.schemas import BulkResult, BulkRowError
+
+
+Row = Dict[str, Any]
+Schema = TypeVar("Schema", bound=BaseModel)
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_TYPES = ("text/csv", "application/csv")
+
+
+def atomic_query():
+    return Query(False, description="Ничего не сохранять, если хотя бы одна строка с ошибкой")
+
+
+def _bad_request(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+def parse_rows(body: bytes, content_type: str) -> List[Row]:
+    """Разобрать тело как JSON массив, NDJSON или CSV"""
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise _bad_request("Тело запроса должно быть в кодировке UTF-8")
+
+    try:
+        if content_type in CSV_TYPES:
+            return list(csv.DictReader(io.StringIO(text)))
+        if content_type in NDJSON_TYPES:
+            return [json.loads(line) for line in text.splitlines() if line.strip()]
+        rows = json.loads(text)
+    except (ValueError, csv.Error) as e:
+        raise _bad_request(f"Не удалось разобрать данные: {e}")
+
+    if not isinstance(rows, list):
+        raise _bad_request("Ожидался JSON массив записей")
+    return rows
+
+
+def _upload_content_type(filename: Optional[str], content_type: str) -> str:
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "text/csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "application/x-ndjson"
+    if name.endswith(".json"):
+        return "application/json"
+    return content_type
+
+
+async def read_rows(request: Request) -> List[Row]:
+    """Прочитать строки импорта из тела запроса или загруженного файла"""
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    if content_type == "multipart/form-data":
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise _bad_request("Ожидался файл в поле file")
+        body = await upload.read()
+        content_type = _upload_content_type(upload.filename, (upload.content_type or "").lower())
+    else:
+        body = await request.body()
+    return parse_rows(body, content_type)
+
+
+def _error_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()
+    )
+
+
+def validate_rows(rows: List[Row], schema: Type[Schema]) -> Tuple[List[Tuple[int, Schema]], List[BulkRowError]]:
+    """Проверить строки схемой: (номер строки, объект) для верных и ошибки для остальных"""
+    valid: List[Tuple[int, Schema]] = []
+    errors: List[BulkRowError] = []
+    for row_number, row in enumerate(rows, 1):
+        if not isinstance(row, dict):
+            errors.append(BulkRowError(row=row_number, message="Строка должна быть объектом"))
+            continue
+        try:
+            valid.append((row_number, schema.parse_obj(row)))
+        except ValidationError as e:
+            errors.append(BulkRowError(row=row_number, message=_error_message(e)))
+    return valid, errors
+
+
+def bulk_result(ids: List[str], errors: List[BulkRowError]) -> BulkResult:
+    errors.sort(key=lambda error: error.row)
+    return BulkResult(created=len(ids), ids=ids, errors=errors)
@@ -0,0 +1,65 @@
+"""
+Условные GET-запросы (ETag / If-None-Match) для коллекций и отчетов.
+
+ETag ответа строится из счетчиков изменений репозиториев: пока не было
+ни одной мутации, любой GET под /students, /courses, /grades и /reports
+возвращает те же данные, и на запрос с совпадающим If-None-Match
+middleware отвечает 304 без вызова эндпоинта и сериализации тела.
+
+Счетчики у каждого воркера свои, поэтому в ETag входит случайный
+идентификатор процесса: ETag другого воркера (или до перезапуска)
+просто не совпадет, и клиент получит полный ответ. Изменения других
+воркеров (файлы данных или таблица generations SQLite) подгружает
+middleware refresh_data до расчета ETag: их запись меняет счетчики и
+здесь, и 304 на устаревшие данные не отдается. Сам расчет только
+читает счетчики и не блокирует цикл событий.
+"""
+import uuid
+from typing import Optional
+
+from fastapi import Request, Response
+
+from infrastructure.repositories import course_repo, data_generation, grade_repo, student_repo
+
+
+ETAG_HEADER = "ETag"
+
+CONDITIONAL_PREFIXES = ("/students", "/courses", "/grades", "/reports")
+
+_PROCESS_TAG = uuid.uuid4().hex[:12]
+
+
+def is_conditional(request: Request) -> bool:
+    """Поддерживает ли запрос ETag (GET коллекций и отчетов)"""
+    return request.method in ("GET", "HEAD") and request.url.path.startswith(CONDITIONAL_PREFIXES)
+
+
+def current_etag() -> Optional[str]:
+    """ETag текущего состояния данных (None, пока репозитории не загружены).
+    Чужие изменения к этому моменту уже подгружены middleware refresh_data."""
+    if not all(repo.loaded for repo in (student_repo, course_repo, grade_repo)):
+        return None
+    return 'W/"%s-%s"' % (_PROCESS_TAG, "-".join(map(str, data_generation())))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Сравнить If-None-Match с ETag (слабое сравнение, список через запятую или *)"""
+    if not if_none_match:
+        return False
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    """Ответ 304 без тела"""
+    return Response(status_code=304, headers={ETAG_HEADER: etag, "Cache-Control": "no-cache"})
+
+
+def set_etag(response: Response, etag: str):
+    """Проставить ETag успешному ответу; no-cache - клиент перепроверяет его при каждом запросе"""
+    response.headers[ETAG_HEADER] = etag
+    response.headers.setdefault("Cache-Control", "no-cache")
@@ -1,19 +1,37 @@
 
-from fastapi import APIRouter, HTTPException, status
-from typing import List
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from typing import Dict, List, Optional
 
-from domain.schemas import CourseCreate, CourseResponse
+from domain.schemas import BatchRequest, BulkResult, BulkRowError, CourseCreate, CourseResponse
 from domain.models import Course
-from infrastructure.repositories import course_repo
+from domain.exceptions import DuplicateKeyError
+from infrastructure.async_repositories import async_course_repo, async_grade_repo
+from infrastructure.repositories import course_repo, normalize_key
+from api.pagination import after_query, include_total_query, limit_query, set_page_headers
+from api.projection import ListSerializer, fields_query
+from api.bulk import Row, atomic_query, bulk_result, read_rows, validate_rows
 
 
 router = APIRouter(prefix="/courses", tags=["courses"])
 
+course_serializer = ListSerializer(CourseResponse)
+
 @router.get("/", response_model=List[CourseResponse])
-async def get_all_courses():
-    """Получить все курсы"""
-    courses = course_repo.get_all()
-    if not courses:
+async def get_all_courses(
+    limit: Optional[int] = limit_query(),
+    after: Optional[str] = after_query(),
+    include_total: bool = include_total_query(),
+    fields: Optional[str] = fields_query()
+):
+    """Получить все курсы (или страницу при заданном limit), fields - только нужные поля"""
+    selected = course_serializer.parse_fields(fields)
+    if limit is None:
+        courses = await async_course_repo.get_all()
+    else:
+        courses = await async_course_repo.list_page(limit, after)
+    
+    if not courses and after is None:
        
         test_courses = [
             Course("CS101", "Введение в программирование", 4),
@@ -21,15 +39,18 @@ async def get_all_courses():
             Course("ENG301", "Английский язык", 3)
         ]
         for course in test_courses:
-            course_repo.add(course)
-        courses = test_courses
+            await async_course_repo.add(course)
+        courses = test_courses if limit is None else await async_course_repo.list_page(limit)
     
-    return courses
+    total = await async_course_repo.count() if include_total else None
+    response = await run_in_threadpool(course_serializer.response, courses, selected)
+    set_page_headers(response, courses, limit, lambda c: c.course_id, total)
+    return response
 
 @router.get("/{course_id}", response_model=CourseResponse)
 async def get_course(course_id: str):
     """Получить курс по ID"""
-    course = course_repo.get_by_id(course_id)
+    course = await async_course_repo.get_by_id(course_id)
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -40,30 +61,68 @@ async def get_course(course_id: str):
 @router.post("/", response_model=CourseResponse, status_code=status.HTTP_201_CREATED)
 async def create_course(course_data: CourseCreate):
     """Создать новый курс"""
-  
-    existing_course = course_repo.get_by_code(course_data.code)
-    if existing_course:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Курс с таким кодом уже существует"
-        )
-    
-   
     new_course = Course(
         code=course_data.code,
         name=course_data.name,
         credits=course_data.credits
     )
     
-    course_repo.add(new_course)
+    try:
+        await async_course_repo.add(new_course)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Курс с таким кодом уже существует"
+        )
     return new_course
 
+@router.post("/batch", response_model=List[CourseResponse])
+async def get_courses_batch(request: BatchRequest):
+    """Получить курсы по списку ID одним запросом (ненайденные пропускаются)"""
+    return await async_course_repo.get_many(request.ids)
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_courses(request: Request, atomic: bool = atomic_query()):
+    """Массово создать курсы (JSON массив, NDJSON, CSV или файл) одной записью"""
+    rows = await read_rows(request)
+    return await run_in_threadpool(_import_courses, rows, atomic)
+
+def _import_courses(rows: List[Row], atomic: bool) -> BulkResult:
+    """Проверить строки и добавить курсы (выполняется в пуле потоков)"""
+    valid, errors = validate_rows(rows, CourseCreate)
+    
+    new_courses = []
+    batch_codes: Dict[str, int] = {}
+    for row_number, course_data in valid:
+        key = normalize_key(course_data.code)
+        if key in batch_codes:
+            errors.append(BulkRowError(row=row_number, message=f"Код повторяет строку {batch_codes[key]}"))
+        elif course_repo.get_by_code(course_data.code):
+            errors.append(BulkRowError(row=row_number, message="Курс с таким кодом уже существует"))
+        else:
+            batch_codes[key] = row_number
+            new_courses.append(Course(code=course_data.code, name=course_data.name, credits=course_data.credits))
+    
+    if errors and atomic:
+        return bulk_result([], errors)
+    try:
+        course_repo.add_many(new_courses)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Курс с таким кодом уже существует"
+        )
+    return bulk_result([course.course_id for course in new_courses], errors)
+
 @router.delete("/{course_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_course(course_id: str):
-    """Удалить курс"""
-    success = course_repo.delete(course_id)
+    """Удалить курс вместе с его оценками"""
+    success = await async_course_repo.delete(course_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Курс с ID {course_id} не найден"
         )
+    # Оценки удаляются следом одной записью. Если она не удастся, оставшиеся
+    # оценки-сироты убирает python -m infrastructure.orphans
+    await async_grade_repo.delete_by_course(course_id)
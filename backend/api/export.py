@@ -0,0 +1,181 @@
+"""
+Потоковая выгрузка оценок и отчетов в NDJSON/CSV.
+
+Ответ формируется генератором, который читает репозитории страницами
+по курсору (list_page), поэтому в памяти одновременно находится не
+больше одной страницы, независимо от размера данных. Строки отчетов
+выгружаются в порядке ID, без сортировки, требующей всей выборки.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+
+from api.grades import local_time
+from api.reports import course_summary_row, gpa_in_range, student_summary_row
+from domain.aggregation import GRADE_BUCKETS
+from domain.models import Grade
+from infrastructure.repositories import course_repo, grade_repo, student_repo
+
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+# Размер страницы при чтении из репозиториев
+EXPORT_BATCH_SIZE = 1000
+
+GRADE_FIELDS = ["grade_id", "student_id", "course_id", "score", "letter_grade", "date"]
+STUDENT_SUMMARY_FIELDS = ["student_id", "name", "email", "grades_count", "average_score", "gpa", "created_at"]
+COURSE_SUMMARY_FIELDS = ["course_id", "code", "name", "credits", "grades_count", "average_score"] + \
+    [f"grade_{bucket}" for bucket in GRADE_BUCKETS]
+
+
+def iter_pages(fetch_page: Callable[[int, Optional[str]], List[Any]],
+               cursor_of: Callable[[Any], str]) -> Iterator[Any]:
+    """Перебрать коллекцию страницами по курсору"""
+    after = None
+    while True:
+        page = fetch_page(EXPORT_BATCH_SIZE, after)
+        yield from page
+        if len(page) < EXPORT_BATCH_SIZE:
+            return
+        after = cursor_of(page[-1])
+
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def ndjson_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """Строки NDJSON"""
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False, default=_json_default) + "\n"
+
+
+def csv_lines(rows: Iterable[Dict[str, Any]], fields: List[str]) -> Iterator[str]:
+    """Строки CSV с заголовком; буфер переиспользуется для каждой пачки"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    for i, row in enumerate(rows, 1):
+        writer.writerow({
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in row.items()
+        })
+        if i % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _stream(lines: Iterator[str], media_type: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        lines,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+def _grade_row(grade: Grade) -> Dict[str, Any]:
+    return {
+        "grade_id": grade.grade_id,
+        "student_id": grade.student_id,
+        "course_id": grade.course_id,
+        "score": grade.score,
+        "letter_grade": grade.letter_grade,
+        "date": grade.date
+    }
+
+
+def _grade_rows(student_id: Optional[str], course_id: Optional[str],
+                min_score: Optional[float], max_score: Optional[float],
+                date_from: Optional[datetime], date_to: Optional[datetime]) -> Iterator[Dict[str, Any]]:
+    filters = dict(student_id=student_id, course_id=course_id, min_score=min_score, max_score=max_score,
+                   date_from=local_time(date_from), date_to=local_time(date_to))
+    grades = iter_pages(lambda limit, after: grade_repo.list_page(limit, after, **filters),
+                        lambda grade: grade.grade_id)
+    return (_grade_row(grade) for grade in grades)
+
+
+def _student_summary_rows(min_gpa: Optional[float], max_gpa: Optional[float]) -> Iterator[Dict[str, Any]]:
+    students = iter_pages(student_repo.list_page, lambda student: student.student_id)
+    rows = (student_summary_row(student) for student in students)
+    return (row for row in rows if gpa_in_range(row, min_gpa, max_gpa))
+
+
+def _course_summary_rows(flat: bool) -> Iterator[Dict[str, Any]]:
+    courses = iter_pages(course_repo.list_page, lambda course: course.course_id)
+    for course in courses:
+        row = course_summary_row(course)
+        if flat:
+            for bucket, count in row.pop("grade_distribution").items():
+                row[f"grade_{bucket}"] = count
+        yield row
+
+
+@router.get("/grades.ndjson")
+def export_grades_ndjson(
+    student_id: Optional[str] = Query(None, description="Фильтр по ID студента"),
+    course_id: Optional[str] = Query(None, description="Фильтр по ID курса"),
+    min_score: Optional[float] = Query(None, ge=0, le=100, description="Минимальный балл"),
+    max_score: Optional[float] = Query(None, ge=0, le=100, description="Максимальный балл"),
+    date_from: Optional[datetime] = Query(None, description="Оценки, выставленные не раньше (ISO 8601)"),
+    date_to: Optional[datetime] = Query(None, description="Оценки, выставленные не позже (ISO 8601)")
+):
+    """Выгрузить оценки в NDJSON (по одной оценке на строку)"""
+    rows = _grade_rows(student_id, course_id, min_score, max_score, date_from, date_to)
+    return _stream(ndjson_lines(rows), "application/x-ndjson", "grades.ndjson")
+
+
+@router.get("/grades.csv")
+def export_grades_csv(
+    student_id: Optional[str] = Query(None, description="Фильтр по ID студента"),
+    course_id: Optional[str] = Query(None, description="Фильтр по ID курса"),
+    min_score: Optional[float] = Query(None, ge=0, le=100, description="Минимальный балл"),
+    max_score: Optional[float] = Query(None, ge=0, le=100, description="Максимальный балл"),
+    date_from: Optional[datetime] = Query(None, description="Оценки, выставленные не раньше (ISO 8601)"),
+    date_to: Optional[datetime] = Query(None, description="Оценки, выставленные не позже (ISO 8601)")
+):
+    """Выгрузить оценки в CSV"""
+    rows = _grade_rows(student_id, course_id, min_score, max_score, date_from, date_to)
+    return _stream(csv_lines(rows, GRADE_FIELDS), "text/csv; charset=utf-8", "grades.csv")
+
+
+@router.get("/reports/students.ndjson")
+def export_students_summary_ndjson(
+    min_gpa: Optional[float] = Query(None, ge=0, le=5, description="Минимальный GPA"),
+    max_gpa: Optional[float] = Query(None, ge=0, le=5, description="Максимальный GPA")
+):
+    """Выгрузить сводку по студентам в NDJSON"""
+    rows = _student_summary_rows(min_gpa, max_gpa)
+    return _stream(ndjson_lines(rows), "application/x-ndjson", "students_summary.ndjson")
+
+
+@router.get("/reports/students.csv")
+def export_students_summary_csv(
+    min_gpa: Optional[float] = Query(None, ge=0, le=5, description="Минимальный GPA"),
+    max_gpa: Optional[float] = Query(None, ge=0, le=5, description="Максимальный GPA")
+):
+    """Выгрузить сводку по студентам в CSV"""
+    rows = _student_summary_rows(min_gpa, max_gpa)
+    return _stream(csv_lines(rows, STUDENT_SUMMARY_FIELDS), "text/csv; charset=utf-8", "students_summary.csv")
+
+
+@router.get("/reports/courses.ndjson")
+def export_courses_summary_ndjson():
+    """Выгрузить сводку по курсам в NDJSON"""
+    return _stream(ndjson_lines(_course_summary_rows(flat=False)), "application/x-ndjson",
+                   "courses_summary.ndjson")
+
+
+@router.get("/reports/courses.csv")
+def export_courses_summary_csv():
+    """Выгрузить сводку по курсам в CSV (распределение - столбцы grade_A..grade_F)"""
+    rows = _course_summary_rows(flat=True)
+    return _stream(csv_lines(rows, COURSE_SUMMARY_FIELDS), "text/csv; charset=utf-8", "courses_summary.csv")
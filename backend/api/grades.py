@@ -1,43 +1,100 @@
 
-from fastapi import APIRouter, HTTPException, status, Query
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Request, Response, status, Query
+from fastapi.concurrency import run_in_threadpool
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
-from domain.schemas import GradeCreate, GradeResponse
+from domain.schemas import (BulkResult, BulkRowError, CourseRef, GradeCreate, GradeExpandedResponse, GradeResponse,
+                            StudentRef)
 from domain.models import Grade
+from infrastructure.async_repositories import async_course_repo, async_grade_repo, async_student_repo
 from infrastructure.repositories import grade_repo, student_repo, course_repo
+from api.pagination import after_query, include_total_query, limit_query, set_page_headers
+from api.projection import ListSerializer, fields_query, json_response
+from api.bulk import Row, atomic_query, bulk_result, read_rows, validate_rows
 
 
 router = APIRouter(prefix="/grades", tags=["grades"])
 
-@router.get("/", response_model=List[GradeResponse])
+EXPANSIONS = ("student", "course")
+
+grade_serializer = ListSerializer(GradeResponse)
+student_ref_serializer = ListSerializer(StudentRef)
+course_ref_serializer = ListSerializer(CourseRef)
+
+
+@router.get("/", response_model=List[GradeExpandedResponse])
 async def get_all_grades(
     student_id: Optional[str] = Query(None, description="Фильтр по ID студента"),
     course_id: Optional[str] = Query(None, description="Фильтр по ID курса"),
     min_score: Optional[float] = Query(None, ge=0, le=100, description="Минимальный балл"),
-    max_score: Optional[float] = Query(None, ge=0, le=100, description="Максимальный балл")
+    max_score: Optional[float] = Query(None, ge=0, le=100, description="Максимальный балл"),
+    date_from: Optional[datetime] = Query(None, description="Оценки, выставленные не раньше (ISO 8601)"),
+    date_to: Optional[datetime] = Query(None, description="Оценки, выставленные не позже (ISO 8601)"),
+    expand: Optional[str] = Query(None, description="Подставить данные связанных записей: student, course (через запятую)"),
+    limit: Optional[int] = limit_query(),
+    after: Optional[str] = after_query(),
+    include_total: bool = include_total_query(),
+    fields: Optional[str] = fields_query()
 ):
-    """Получить все оценки с возможностью фильтрации"""
-    grades = grade_repo.get_all()
-    
-   
-    if student_id:
-        grades = [g for g in grades if g.student_id == student_id]
+    """Получить все оценки с возможностью фильтрации (или страницу при заданном limit), fields - только нужные поля"""
+    expansions = parse_expand(expand)
+    selected = grade_serializer.parse_fields(fields)
+    filters = dict(student_id=student_id, course_id=course_id, min_score=min_score, max_score=max_score,
+                   date_from=local_time(date_from), date_to=local_time(date_to))
     
-    if course_id:
-        grades = [g for g in grades if g.course_id == course_id]
+    if limit is not None:
+        grades = await async_grade_repo.list_page(limit, after, **filters)
+    else:
+        grades = await async_grade_repo.find(**filters)
     
-    if min_score is not None:
-        grades = [g for g in grades if g.score >= min_score]
-    
-    if max_score is not None:
-        grades = [g for g in grades if g.score <= max_score]
-    
-    return grades
+    total = await async_grade_repo.count(**filters) if include_total else None
+    if expansions:
+        response = await run_in_threadpool(expand_grades, grades, selected, expansions)
+    else:
+        response = await run_in_threadpool(grade_serializer.response, grades, selected)
+    set_page_headers(response, grades, limit, lambda g: g.grade_id, total)
+    return response
+
+
+def parse_expand(expand: Optional[str]) -> List[str]:
+    """Разобрать параметр expand (400 на неизвестное значение)"""
+    expansions = [name.strip() for name in (expand or "").split(",") if name.strip()]
+    unknown = [name for name in expansions if name not in EXPANSIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Неизвестные значения expand: {', '.join(unknown)} (доступны: {', '.join(EXPANSIONS)})"
+        )
+    return expansions
+
+
+def expand_grades(grades: List[Grade], fields: Tuple[str, ...], expansions: List[str]) -> Response:
+    """Подставить в оценки студентов и курсов: по одной пачке get_many на коллекцию"""
+    rows = grade_serializer.rows(grades, fields)
+    if "student" in expansions:
+        students = {row["student_id"]: row for row in
+                    student_ref_serializer.rows(student_repo.get_many(g.student_id for g in grades))}
+        for row, grade in zip(rows, grades):
+            row["student"] = students.get(grade.student_id)
+    if "course" in expansions:
+        courses = {row["course_id"]: row for row in
+                   course_ref_serializer.rows(course_repo.get_many(g.course_id for g in grades))}
+        for row, grade in zip(rows, grades):
+            row["course"] = courses.get(grade.course_id)
+    return json_response(rows)
+
+
+def local_time(value: Optional[datetime]) -> Optional[datetime]:
+    """Привести дату с часовым поясом к локальному времени без пояса, как в хранимых оценках"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
 
 @router.get("/{grade_id}", response_model=GradeResponse)
 async def get_grade(grade_id: str):
     """Получить оценку по ID"""
-    grade = grade_repo.get_by_id(grade_id)
+    grade = await async_grade_repo.get_by_id(grade_id)
     if not grade:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -49,7 +106,7 @@ async def get_grade(grade_id: str):
 async def create_grade(grade_data: GradeCreate):
     """Создать новую оценку"""
    
-    student = student_repo.get_by_id(grade_data.student_id)
+    student = await async_student_repo.get_by_id(grade_data.student_id)
     if not student:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -57,7 +114,7 @@ async def create_grade(grade_data: GradeCreate):
         )
     
    
-    course = course_repo.get_by_id(grade_data.course_id)
+    course = await async_course_repo.get_by_id(grade_data.course_id)
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -71,21 +128,57 @@ async def create_grade(grade_data: GradeCreate):
         score=grade_data.score
     )
     
-    grade_repo.add(new_grade)
+    await async_grade_repo.add(new_grade)
     
     return new_grade
 
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_grades(request: Request, atomic: bool = atomic_query()):
+    """Массово создать оценки (JSON массив, NDJSON, CSV или файл) одной записью"""
+    rows = await read_rows(request)
+    return await run_in_threadpool(_import_grades, rows, atomic)
+
+def _import_grades(rows: List[Row], atomic: bool) -> BulkResult:
+    """Проверить строки и добавить оценки (выполняется в пуле потоков)"""
+    valid, errors = validate_rows(rows, GradeCreate)
+    
+    # Существование студентов и курсов проверяется один раз на ID
+    known_students: Dict[str, bool] = {}
+    known_courses: Dict[str, bool] = {}
+    new_grades = []
+    for row_number, grade_data in valid:
+        if grade_data.student_id not in known_students:
+            known_students[grade_data.student_id] = student_repo.get_by_id(grade_data.student_id) is not None
+        if grade_data.course_id not in known_courses:
+            known_courses[grade_data.course_id] = course_repo.get_by_id(grade_data.course_id) is not None
+        
+        if not known_students[grade_data.student_id]:
+            errors.append(BulkRowError(row=row_number, message=f"Студент с ID {grade_data.student_id} не найден"))
+        elif not known_courses[grade_data.course_id]:
+            errors.append(BulkRowError(row=row_number, message=f"Курс с ID {grade_data.course_id} не найден"))
+        else:
+            new_grades.append(Grade(
+                student_id=grade_data.student_id,
+                course_id=grade_data.course_id,
+                score=grade_data.score
+            ))
+    
+    if errors and atomic:
+        return bulk_result([], errors)
+    grade_repo.add_many(new_grades)
+    return bulk_result([grade.grade_id for grade in new_grades], errors)
+
 @router.put("/{grade_id}", response_model=GradeResponse)
 async def update_grade(grade_id: str, score: float = Query(..., ge=0, le=100)):
     """Обновить оценку"""
-    grade = grade_repo.get_by_id(grade_id)
+    grade = await async_grade_repo.get_by_id(grade_id)
     if not grade:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Оценка с ID {grade_id} не найдена"
         )
     
-    updated_grade = grade_repo.update(grade_id, score)
+    updated_grade = await async_grade_repo.update(grade_id, score)
     if not updated_grade:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -97,14 +190,14 @@ async def update_grade(grade_id: str, score: float = Query(..., ge=0, le=100)):
 @router.delete("/{grade_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_grade(grade_id: str):
     """Удалить оценку"""
-    grade = grade_repo.get_by_id(grade_id)
+    grade = await async_grade_repo.get_by_id(grade_id)
     if not grade:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Оценка с ID {grade_id} не найдена"
         )
     
-    success = grade_repo.delete(grade_id)
+    success = await async_grade_repo.delete(grade_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,38 @@
+"""
+Keyset-пагинация для списковых эндпоинтов.
+
+Без параметра limit эндпоинт возвращает всю коллекцию, как раньше.
+С limit возвращается страница, упорядоченная по ID; курсор следующей
+страницы (ID последнего элемента) приходит в заголовке X-Next-Cursor
+и передается обратно в параметре after.
+"""
+from typing import Any, Callable, List, Optional
+
+from fastapi import Query, Response
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+MAX_PAGE_SIZE = 1000
+
+
+def limit_query():
+    return Query(None, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы (без него - вся коллекция)")
+
+
+def after_query():
+    return Query(None, description="Курсор: ID последнего элемента предыдущей страницы")
+
+
+def include_total_query():
+    return Query(False, description="Вернуть общее количество в заголовке X-Total-Count")
+
+
+def set_page_headers(response: Response, page: List[Any], limit: Optional[int],
+                     cursor_of: Callable[[Any], str], total: Optional[int] = None):
+    """Проставить заголовки курсора следующей страницы и общего количества"""
+    if limit is not None and len(page) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = cursor_of(page[-1])
+    if total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
@@ -0,0 +1,92 @@
+"""
+Проекция полей (fields=) и быстрая сериализация списковых ответов.
+
+Списковые эндпоинты объявляют response_model=List[...Response]: если
+вернуть объекты, FastAPI проверяет каждый элемент моделью Pydantic
+(orm_mode копирует все атрибуты), а затем переводит результат в JSON
+через jsonable_encoder - на 100k оценок это секунды. Здесь JSON
+собирается прямо из атрибутов записей репозитория: значения читаются
+одним attrgetter, приводятся так же, как это сделала бы модель (float-
+поля - float, даты - ISO 8601), и весь список сериализуется одним
+json.dumps. response_model остается для схемы OpenAPI.
+
+Параметр fields (например, fields=student_id,name) оставляет в ответе
+только перечисленные поля; порядок полей - как в запросе.
+"""
+import json
+from datetime import datetime
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, Query, Response, status
+from pydantic import BaseModel
+
+
+def fields_query():
+    return Query(None, description="Поля ответа через запятую (без него - все поля)")
+
+
+def _converter(field_type: Any) -> Optional[Callable[[Any], Any]]:
+    """Приведение значения атрибута к типу поля схемы (None - без приведения)"""
+    if field_type is float:
+        return float
+    if field_type is int:
+        return int
+    if field_type is datetime:
+        return datetime.isoformat
+    return None
+
+
+class ListSerializer:
+    """JSON списка записей по полям схемы ответа без создания моделей"""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.fields: Tuple[str, ...] = tuple(model.__fields__)
+        self._converters: Dict[str, Callable[[Any], Any]] = {}
+        for name, field in model.__fields__.items():
+            convert = _converter(field.type_)
+            if convert is not None:
+                self._converters[name] = convert
+
+    def parse_fields(self, fields: Optional[str]) -> Tuple[str, ...]:
+        """Разобрать параметр fields (400 на неизвестное поле)"""
+        if fields is None:
+            return self.fields
+        requested = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        unknown = [name for name in requested if name not in self.fields]
+        if unknown or not requested:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Неизвестные поля: {', '.join(unknown) or '-'} (доступны: {', '.join(self.fields)})"
+            )
+        return requested
+
+    def rows(self, records: Iterable[Any], fields: Optional[Tuple[str, ...]] = None) -> List[Dict[str, Any]]:
+        """Словари выбранных полей записей"""
+        fields = fields or self.fields
+        values_of = attrgetter(*fields)
+        if len(fields) == 1:
+            # attrgetter одного атрибута возвращает значение, а не кортеж
+            rows = [{fields[0]: values_of(record)} for record in records]
+        else:
+            rows = [dict(zip(fields, values_of(record))) for record in records]
+
+        for name in fields:
+            convert = self._converters.get(name)
+            if convert is None:
+                continue
+            for row in rows:
+                value = row[name]
+                if value is not None:
+                    row[name] = convert(value)
+        return rows
+
+    def response(self, records: Iterable[Any], fields: Optional[Tuple[str, ...]] = None) -> Response:
+        """JSON-ответ со списком записей"""
+        return json_response(self.rows(records, fields))
+
+
+def json_response(rows: List[Dict[str, Any]]) -> Response:
+    """JSON-ответ в том же виде, что и JSONResponse FastAPI"""
+    content = json.dumps(rows, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+    return Response(content=content.encode("utf-8"), media_type="application/json")
@@ -1,48 +1,71 @@
 
 from fastapi import APIRouter, HTTPException, Query
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import Dict, Any, Optional
 
-from infrastructure.repositories import student_repo, course_repo, grade_repo
+from domain.aggregation import GRADE_BUCKET_LABELS
+from domain.models import Course, Student
+from infrastructure.async_repositories import async_student_repo, run_report
+from infrastructure.report_cache import report_cache
+from infrastructure.repositories import student_repo, course_repo
+from infrastructure.stats import grade_stats
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
+
+def student_summary_row(student: Student) -> Dict[str, Any]:
+    """Строка сводки по студенту"""
+    acc = grade_stats.student(student.student_id)
+    return {
+        "student_id": student.student_id,
+        "name": student.name,
+        "email": student.email,
+        "grades_count": acc.count,
+        "average_score": round(acc.average, 2),
+        "gpa": acc.gpa,
+        "created_at": student.created_at
+    }
+
+
+def gpa_in_range(row: Dict[str, Any], min_gpa: Optional[float], max_gpa: Optional[float]) -> bool:
+    """Проверить фильтр по GPA для строки сводки"""
+    if min_gpa is not None and row["gpa"] < min_gpa:
+        return False
+    if max_gpa is not None and row["gpa"] > max_gpa:
+        return False
+    return True
+
+
+def course_summary_row(course: Course) -> Dict[str, Any]:
+    """Строка сводки по курсу"""
+    acc = grade_stats.course(course.course_id)
+    return {
+        "course_id": course.course_id,
+        "code": course.code,
+        "name": course.name,
+        "credits": course.credits,
+        "grades_count": acc.count,
+        "average_score": round(acc.average, 2),
+        "grade_distribution": acc.distribution()
+    }
+
+
 @router.get("/students/summary")
 async def get_students_summary(
     min_gpa: Optional[float] = Query(None, ge=0, le=5, description="Минимальный GPA"),
     max_gpa: Optional[float] = Query(None, ge=0, le=5, description="Максимальный GPA")
 ):
     """Получить сводку по студентам с фильтрацией по GPA"""
+    return await run_report(_students_summary, min_gpa, max_gpa)
+
+@report_cache.cached("students_summary")
+def _students_summary(min_gpa: Optional[float], max_gpa: Optional[float]) -> Dict[str, Any]:
     students = student_repo.get_all()
-    grades = grade_repo.get_all()
     
     summary = []
     for student in students:
-        student_grades = [g for g in grades if g.student_id == student.student_id]
-        
-        if student_grades:
-            total_score = sum(g.score for g in student_grades)
-            avg_score = total_score / len(student_grades)
-            gpa = round(avg_score / 20, 2)  
-        else:
-            avg_score = 0
-            gpa = 0
-        
-     
-        if min_gpa is not None and gpa < min_gpa:
-            continue
-        if max_gpa is not None and gpa > max_gpa:
-            continue
-        
-        summary.append({
-            "student_id": student.student_id,
-            "name": student.name,
-            "email": student.email,
-            "grades_count": len(student_grades),
-            "average_score": round(avg_score, 2),
-            "gpa": gpa,
-            "created_at": student.created_at
-        })
+        row = student_summary_row(student)
+        if gpa_in_range(row, min_gpa, max_gpa):
+            summary.append(row)
     
    
     summary.sort(key=lambda x: x["gpa"], reverse=True)
@@ -55,38 +78,13 @@ async def get_students_summary(
 @router.get("/courses/summary")
 async def get_courses_summary():
     """Получить сводку по курсам"""
+    return await run_report(_courses_summary)
+
+@report_cache.cached("courses_summary")
+def _courses_summary() -> Dict[str, Any]:
     courses = course_repo.get_all()
-    grades = grade_repo.get_all()
     
-    summary = []
-    for course in courses:
-        course_grades = [g for g in grades if g.course_id == course.course_id]
-        
-        if course_grades:
-            total_score = sum(g.score for g in course_grades)
-            avg_score = total_score / len(course_grades)
-            
-            
-            grade_distribution = {
-                "A": len([g for g in course_grades if g.score >= 90]),
-                "B": len([g for g in course_grades if g.score >= 80 and g.score < 90]),
-                "C": len([g for g in course_grades if g.score >= 70 and g.score < 80]),
-                "D": len([g for g in course_grades if g.score >= 60 and g.score < 70]),
-                "F": len([g for g in course_grades if g.score < 60])
-            }
-        else:
-            avg_score = 0
-            grade_distribution = {"A": 0, "B": 0, "C": 0, "D": 0, "F": 0}
-        
-        summary.append({
-            "course_id": course.course_id,
-            "code": course.code,
-            "name": course.name,
-            "credits": course.credits,
-            "grades_count": len(course_grades),
-            "average_score": round(avg_score, 2),
-            "grade_distribution": grade_distribution
-        })
+    summary = [course_summary_row(course) for course in courses]
     
    
     summary.sort(key=lambda x: x["grades_count"], reverse=True)
@@ -102,79 +100,60 @@ async def get_grades_statistics(
     course_id: Optional[str] = Query(None, description="ID курса для фильтрации")
 ):
     """Получить статистику по оценкам"""
-    grades = grade_repo.get_all()
-    
-   
-    if student_id:
-        grades = [g for g in grades if g.student_id == student_id]
-    
-    if course_id:
-        grades = [g for g in grades if g.course_id == course_id]
+    return await run_report(_grades_statistics, student_id, course_id)
+
+@report_cache.cached("grades_statistics")
+def _grades_statistics(student_id: Optional[str], course_id: Optional[str]) -> Dict[str, Any]:
+    acc = grade_stats.select(student_id=student_id, course_id=course_id)
     
-    if not grades:
+    if not acc.count:
         return {
             "total_grades": 0,
             "message": "Нет оценок для отображения"
         }
     
-   
-    scores = [g.score for g in grades]
-    
+    summary = grade_stats.describe(student_id=student_id, course_id=course_id)
     return {
-        "total_grades": len(grades),
-        "average_score": round(sum(scores) / len(scores), 2),
-        "min_score": round(min(scores), 2),
-        "max_score": round(max(scores), 2),
-        "grade_distribution": {
-            "A (90-100)": len([g for g in grades if g.score >= 90]),
-            "B (80-89)": len([g for g in grades if g.score >= 80 and g.score < 90]),
-            "C (70-79)": len([g for g in grades if g.score >= 70 and g.score < 80]),
-            "D (60-69)": len([g for g in grades if g.score >= 60 and g.score < 70]),
-            "F (0-59)": len([g for g in grades if g.score < 60])
-        }
+        "total_grades": acc.count,
+        "average_score": round(acc.average, 2),
+        "min_score": round(acc.min, 2),
+        "max_score": round(acc.max, 2),
+        "median_score": round(summary.median, 2),
+        "std_dev": round(summary.std_dev, 2),
+        "percentiles": {name: round(value, 2) for name, value in summary.percentiles.items()},
+        "grade_distribution": acc.distribution(GRADE_BUCKET_LABELS)
     }
 
 @router.get("/top/students")
 async def get_top_students(limit: int = Query(10, ge=1, le=100, description="Количество студентов")):
     """Получить топ студентов по GPA"""
-    students = student_repo.get_all()
-    
-   
-    students_with_gpa = []
-    for student in students:
-        gpa = student.gpa if student.gpa is not None else 0
-        students_with_gpa.append({
-            "student": student,
-            "gpa": gpa
-        })
-    
-    students_with_gpa.sort(key=lambda x: x["gpa"], reverse=True)
-    
-  
-    top_students = students_with_gpa[:limit]
+    # GPA поддерживается при изменении оценок, рейтинг хранится отсортированным
+    top_students = await async_student_repo.top_by_gpa(limit)
     
     return {
         "limit": limit,
         "students": [
             {
-                "student_id": item["student"].student_id,
-                "name": item["student"].name,
-                "email": item["student"].email,
-                "gpa": item["gpa"],
-                "created_at": item["student"].created_at
+                "student_id": student.student_id,
+                "name": student.name,
+                "email": student.email,
+                "gpa": student.gpa if student.gpa is not None else 0,
+                "created_at": student.created_at
             }
-            for item in top_students
+            for student in top_students
         ]
     }
 
 @router.get("/student/{student_id}/progress")
 async def get_student_progress(student_id: str):
     """Получить прогресс студента по всем курсам"""
-    student = student_repo.get_by_id(student_id)
+    student = await async_student_repo.get_by_id(student_id)
     if not student:
         raise HTTPException(status_code=404, detail="Студент не найден")
-    
-    student_grades = grade_repo.get_by_student(student_id)
+    return await run_report(_student_progress, student)
+
+def _student_progress(student: Student) -> Dict[str, Any]:
+    student_id = student.student_id
     courses = course_repo.get_all()
     
     progress = []
@@ -182,26 +161,21 @@ async def get_student_progress(student_id: str):
     weighted_score_sum = 0
     
     for course in courses:
-        course_grades = [g for g in student_grades if g.course_id == course.course_id]
-        
-        if course_grades:
-            avg_score = sum(g.score for g in course_grades) / len(course_grades)
-            status = "completed"
-        else:
-            avg_score = 0
-            status = "not_started"
+        acc = grade_stats.pair(student_id, course.course_id)
+        avg_score = acc.average
+        status = "completed" if acc.count else "not_started"
         
         progress.append({
             "course_id": course.course_id,
             "course_code": course.code,
             "course_name": course.name,
             "credits": course.credits,
-            "grades_count": len(course_grades),
+            "grades_count": acc.count,
             "average_score": round(avg_score, 2),
             "status": status
         })
         
-        if course_grades:
+        if acc.count:
             total_credits += course.credits
             weighted_score_sum += avg_score * course.credits
     
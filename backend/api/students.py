@@ -1,19 +1,37 @@
 
-from fastapi import APIRouter, HTTPException, status
-from typing import List
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from typing import Dict, List, Optional
 
-from domain.schemas import StudentCreate, StudentUpdate, StudentResponse
+from domain.schemas import BatchRequest, BulkResult, BulkRowError, StudentCreate, StudentUpdate, StudentResponse
 from domain.models import Student
-from infrastructure.repositories import student_repo
+from domain.exceptions import DuplicateKeyError
+from infrastructure.async_repositories import async_student_repo, async_grade_repo
+from infrastructure.repositories import normalize_key, student_repo
+from api.pagination import after_query, include_total_query, limit_query, set_page_headers
+from api.projection import ListSerializer, fields_query
+from api.bulk import Row, atomic_query, bulk_result, read_rows, validate_rows
 
 
 router = APIRouter(prefix="/students", tags=["students"])
 
+student_serializer = ListSerializer(StudentResponse)
+
 @router.get("/", response_model=List[StudentResponse])
-async def get_all_students():
-    """Получить всех студентов"""
-    students = student_repo.get_all()
-    if not students:
+async def get_all_students(
+    limit: Optional[int] = limit_query(),
+    after: Optional[str] = after_query(),
+    include_total: bool = include_total_query(),
+    fields: Optional[str] = fields_query()
+):
+    """Получить всех студентов (или страницу при заданном limit), fields - только нужные поля"""
+    selected = student_serializer.parse_fields(fields)
+    if limit is None:
+        students = await async_student_repo.get_all()
+    else:
+        students = await async_student_repo.list_page(limit, after)
+    
+    if not students and after is None:
        
         test_students = [
             Student("Иван Иванов", "ivan@example.com"),
@@ -21,15 +39,18 @@ async def get_all_students():
             Student("Алексей Сидоров", "alex@example.com")
         ]
         for student in test_students:
-            student_repo.add(student)
-        students = test_students
+            await async_student_repo.add(student)
+        students = test_students if limit is None else await async_student_repo.list_page(limit)
     
-    return students
+    total = await async_student_repo.count() if include_total else None
+    response = await run_in_threadpool(student_serializer.response, students, selected)
+    set_page_headers(response, students, limit, lambda s: s.student_id, total)
+    return response
 
 @router.get("/{student_id}", response_model=StudentResponse)
 async def get_student(student_id: str):
     """Получить студента по ID"""
-    student = student_repo.get_by_id(student_id)
+    student = await async_student_repo.get_by_id(student_id)
     if not student:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -40,50 +61,81 @@ async def get_student(student_id: str):
 @router.post("/", response_model=StudentResponse, status_code=status.HTTP_201_CREATED)
 async def create_student(student_data: StudentCreate):
     """Создать нового студента"""
- 
-    existing_student = student_repo.get_by_email(student_data.email)
-    if existing_student:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Студент с таким email уже существует"
-        )
-    
-   
     new_student = Student(
         name=student_data.name,
         email=student_data.email
     )
     
-    student_repo.add(new_student)
+    try:
+        await async_student_repo.add(new_student)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Студент с таким email уже существует"
+        )
     return new_student
 
+@router.post("/batch", response_model=List[StudentResponse])
+async def get_students_batch(request: BatchRequest):
+    """Получить студентов по списку ID одним запросом (ненайденные пропускаются)"""
+    return await async_student_repo.get_many(request.ids)
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_students(request: Request, atomic: bool = atomic_query()):
+    """Массово создать студентов (JSON массив, NDJSON, CSV или файл) одной записью"""
+    rows = await read_rows(request)
+    return await run_in_threadpool(_import_students, rows, atomic)
+
+def _import_students(rows: List[Row], atomic: bool) -> BulkResult:
+    """Проверить строки и добавить студентов (выполняется в пуле потоков)"""
+    valid, errors = validate_rows(rows, StudentCreate)
+    
+    new_students = []
+    batch_emails: Dict[str, int] = {}
+    for row_number, student_data in valid:
+        key = normalize_key(student_data.email)
+        if key in batch_emails:
+            errors.append(BulkRowError(row=row_number, message=f"email повторяет строку {batch_emails[key]}"))
+        elif student_repo.get_by_email(student_data.email):
+            errors.append(BulkRowError(row=row_number, message="Студент с таким email уже существует"))
+        else:
+            batch_emails[key] = row_number
+            new_students.append(Student(name=student_data.name, email=student_data.email))
+    
+    if errors and atomic:
+        return bulk_result([], errors)
+    try:
+        student_repo.add_many(new_students)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Студент с таким email уже существует"
+        )
+    return bulk_result([student.student_id for student in new_students], errors)
+
 @router.put("/{student_id}", response_model=StudentResponse)
 async def update_student(student_id: str, student_data: StudentUpdate):
     """Обновить данные студента"""
-    student = student_repo.get_by_id(student_id)
+    student = await async_student_repo.get_by_id(student_id)
     if not student:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Студент с ID {student_id} не найден"
         )
     
-    
-    if student_data.email is not None and student_data.email != student.email:
-        existing_student = student_repo.get_by_email(student_data.email)
-        if existing_student:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Студент с таким email уже существует"
-            )
-    
-    
     update_data = {}
     if student_data.name is not None:
         update_data['name'] = student_data.name
     if student_data.email is not None:
         update_data['email'] = student_data.email
     
-    updated_student = student_repo.update(student_id, **update_data)
+    try:
+        updated_student = await async_student_repo.update(student_id, **update_data)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Студент с таким email уже существует"
+        )
     if not updated_student:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -94,10 +146,13 @@ async def update_student(student_id: str, student_data: StudentUpdate):
 
 @router.delete("/{student_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_student(student_id: str):
-    """Удалить студента"""
-    success = student_repo.delete(student_id)
+    """Удалить студента вместе с его оценками"""
+    success = await async_student_repo.delete(student_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Студент с ID {student_id} не найден"
         )
+    # Оценки удаляются следом одной записью. Если она не удастся, оставшиеся
+    # оценки-сироты убирает python -m infrastructure.orphans
+    await async_grade_repo.delete_by_student(student_id)
@@ -0,0 +1,81 @@
+"""
+Бенчмарк импорта оценок: по одной через add (как POST /grades/) против add_many.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_bulk_import --grades 100000
+
+При JSON хранилище add переписывает файл целиком на каждую оценку, поэтому
+поштучный импорт измеряется на --legacy-sample оценках и экстраполируется.
+Для add_many учитывается и проверка строк схемой, как в POST /grades/bulk.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from api.bulk import validate_rows
+from domain.models import Grade
+from domain.schemas import GradeCreate
+from infrastructure.repositories import GradeRepository
+from infrastructure.stats import MaterializedStats
+from infrastructure.storage import JsonFileStorage, JournalStorage
+
+
+def make_rows(n_grades: int, n_students: int = 5000, n_courses: int = 200):
+    return [
+        {"student_id": f"s{i % n_students}", "course_id": f"c{i % n_courses}", "score": (i * 37) % 101}
+        for i in range(n_grades)
+    ]
+
+
+def make_repo(directory: str, name: str, storage_cls) -> GradeRepository:
+    path = os.path.join(directory, name)
+    storage = JournalStorage(path, 'grade_id') if storage_cls is JournalStorage else storage_cls(path)
+    repo = GradeRepository(path, storage=storage)
+    MaterializedStats(repo)
+    return repo
+
+
+def import_one_by_one(repo: GradeRepository, rows):
+    for row in rows:
+        repo.add(Grade(row["student_id"], row["course_id"], row["score"]))
+
+
+def import_bulk(repo: GradeRepository, rows):
+    valid, _ = validate_rows(rows, GradeCreate)
+    repo.add_many([Grade(data.student_id, data.course_id, data.score) for _, data in valid])
+    repo.storage.flush()
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--grades", type=int, default=100_000)
+    parser.add_argument("--legacy-sample", type=int, default=300)
+    args = parser.parse_args()
+
+    rows = make_rows(args.grades)
+    # Поштучный импорт в середину набора: файл уже содержит половину оценок
+    prefill = rows[:args.grades // 2]
+    sample = rows[:args.legacy_sample]
+    print(f"Данные: {args.grades} оценок")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for label, storage_cls in (("json", JsonFileStorage), ("journal", JournalStorage)):
+            legacy_repo = make_repo(directory, f"legacy_{label}.json", storage_cls)
+            legacy_repo.add_many([Grade(r["student_id"], r["course_id"], r["score"]) for r in prefill])
+            legacy = timed(import_one_by_one, legacy_repo, sample) * args.grades / len(sample)
+            legacy_repo.storage.flush()
+
+            bulk = timed(import_bulk, make_repo(directory, f"bulk_{label}.json", storage_cls), rows)
+            print(f"[{label:7}] поштучно (экстраполяция): {legacy:10.2f} с   "
+                  f"add_many: {bulk:6.2f} с   ускорение x{legacy / bulk:.0f}")
+
+
+if __name__ == "__main__":
+    main()
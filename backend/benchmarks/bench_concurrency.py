@@ -0,0 +1,121 @@
+"""
+Бенчмарк задержек под смешанной нагрузкой: параллельные чтения (студент,
+страница оценок, статистика) на фоне записи оценок в JSON хранилище.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_concurrency --grades 50000
+
+Приложение вызывается в процессе через ASGI (httpx). Режим "в цикле
+событий" воспроизводит прежнее поведение: вызовы репозиториев и отчеты
+выполняются прямо в async-эндпоинтах; режим "пул потоков" - текущий.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.bench_startup import write_dataset
+
+
+async def inline(func, *args, **kwargs):
+    return func(*args, **kwargs)
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+async def run_load(client, student_ids, course_ids, readers: int, writers: int, writes: int):
+    latencies: Dict[str, List[float]] = {"read": [], "write": []}
+    done = asyncio.Event()
+
+    async def timed(kind, request):
+        start = time.perf_counter()
+        response = await request
+        assert response.status_code < 300, response.text
+        latencies[kind].append(time.perf_counter() - start)
+
+    async def reader():
+        while not done.is_set():
+            student_id = random.choice(student_ids)
+            await timed("read", client.get(f"/students/{student_id}"))
+            await timed("read", client.get("/grades/", params={"student_id": student_id, "limit": 20}))
+            await timed("read", client.get("/reports/grades/statistics", params={"student_id": student_id}))
+
+    async def writer():
+        for _ in range(writes):
+            await timed("write", client.post("/grades/", json={
+                "student_id": random.choice(student_ids), "course_id": random.choice(course_ids),
+                "score": random.randint(0, 100)}))
+
+    reader_tasks = [asyncio.create_task(reader()) for _ in range(readers)]
+    start = time.perf_counter()
+    await asyncio.gather(*(writer() for _ in range(writers)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await asyncio.gather(*reader_tasks)
+    return latencies, elapsed
+
+
+def report(label, latencies, elapsed):
+    for kind in ("read", "write"):
+        values = [v * 1000 for v in latencies[kind]]
+        print(f"{label:17} {kind:5} n={len(values):5}  p50 {statistics.median(values):8.1f} мс  "
+              f"p99 {percentile(values, 0.99):8.1f} мс  макс {max(values):8.1f} мс")
+    print(f"{label:17} чтений в секунду: {len(latencies['read']) / elapsed:8.0f}")
+
+
+async def main_async(args, directory):
+    import httpx
+    from api import courses, grades, reports, students
+    from infrastructure import async_repositories
+    from infrastructure.repositories import course_repo, student_repo
+    import main
+
+    main.warmup.run()
+    student_ids = [student.student_id for student in student_repo.get_all()]
+    course_ids = [course.course_id for course in course_repo.get_all()]
+    async with httpx.AsyncClient(app=main.app, base_url="http://bench") as client:
+        modules = (async_repositories, students, courses, grades)
+        offloaded = [module.run_in_threadpool for module in modules], reports.run_report
+        for label, blocking in (("в цикле событий", True), ("пул потоков", False)):
+            for module, original in zip(modules, offloaded[0]):
+                module.run_in_threadpool = inline if blocking else original
+            reports.run_report = inline if blocking else offloaded[1]
+            latencies, elapsed = await run_load(client, student_ids, course_ids,
+                                                args.readers, args.writers, args.writes)
+            report(label, latencies, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--students", type=int, default=5_000)
+    parser.add_argument("--courses", type=int, default=100)
+    parser.add_argument("--grades", type=int, default=50_000)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--writes", type=int, default=10)
+    args = parser.parse_args()
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    os.environ["STARTUP_LOAD"] = "lazy"
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, args.students, args.courses, args.grades)
+        print(f"Данные: {args.students} студентов, {args.courses} курсов, {args.grades} оценок; "
+              f"{args.readers} читателей, {args.writers} x {args.writes} записей")
+        sys.path.insert(0, backend_dir)
+        os.chdir(directory)
+        try:
+            asyncio.run(main_async(args, directory))
+        finally:
+            os.chdir(backend_dir)
+
+
+if __name__ == "__main__":
+    main()
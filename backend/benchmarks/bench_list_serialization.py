@@ -0,0 +1,66 @@
+"""
+Бенчмарк сериализации списка оценок (GET /grades/): прежний путь
+FastAPI (проверка каждого элемента моделью GradeResponse, jsonable_encoder,
+JSONResponse) против ListSerializer и проекции fields=.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_list_serialization --grades 100000
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from api.projection import ListSerializer
+from domain.models import Grade
+from domain.schemas import GradeResponse
+
+
+def make_grades(n_grades: int, n_students: int, n_courses: int) -> List[Grade]:
+    return [Grade(f"s{i % n_students}", f"c{i % n_courses}", (i * 37) % 1001 / 10) for i in range(n_grades)]
+
+
+def pydantic_body(field, grades: List[Grade]) -> bytes:
+    """Прежний путь: response_model=List[GradeResponse]"""
+    content = asyncio.run(serialize_response(field=field, response_content=grades))
+    return JSONResponse(content).body
+
+
+def timed(func, repeat: int = 3):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--grades", type=int, default=100_000)
+    parser.add_argument("--students", type=int, default=5_000)
+    parser.add_argument("--courses", type=int, default=100)
+    args = parser.parse_args()
+
+    grades = make_grades(args.grades, args.students, args.courses)
+    field = create_response_field(name="Response_get_all_grades", type_=List[GradeResponse])
+    serializer = ListSerializer(GradeResponse)
+    print(f"Данные: {args.grades} оценок")
+
+    before, expected = timed(lambda: pydantic_body(field, grades))
+    after, body = timed(lambda: serializer.response(grades).body)
+    assert json.loads(body) == json.loads(expected)
+    print(f"{'модели Pydantic':28} {before * 1000:9.1f} мс  {len(expected) / 2**20:6.1f} МБ")
+    print(f"{'ListSerializer':28} {after * 1000:9.1f} мс  {len(body) / 2**20:6.1f} МБ  (x{before / after:.1f})")
+
+    selected = serializer.parse_fields("grade_id,score")
+    projected, body = timed(lambda: serializer.response(grades, selected).body)
+    print(f"{'fields=grade_id,score':28} {projected * 1000:9.1f} мс  {len(body) / 2**20:6.1f} МБ  "
+          f"(x{before / projected:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Бенчмарк памяти на оценку: прежний Grade с __dict__ против Grade со __slots__.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_memory --grades 1000000
+
+Записи разбираются из JSON, как при загрузке репозитория, поэтому ID
+студентов и курсов приходят отдельными строками в каждой записи.
+Учитывается память объектов оценок и словаря grade_id -> Grade.
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+from datetime import datetime
+from typing import Optional
+from uuid import uuid4
+
+from domain.models import Grade, letter_grade_for
+
+
+class LegacyGrade:
+    """Grade до перехода на __slots__"""
+
+    def __init__(self, student_id: str, course_id: str, score: float, grade_id: Optional[str] = None):
+        self.grade_id = grade_id or str(uuid4())
+        self.student_id = student_id
+        self.course_id = course_id
+        self.score = score
+        self.date = datetime.now()
+        self.letter_grade = letter_grade_for(score)
+
+
+def make_records(n_grades: int, n_students: int = 20_000, n_courses: int = 300) -> str:
+    student_ids = [str(uuid4()) for _ in range(n_students)]
+    course_ids = [str(uuid4()) for _ in range(n_courses)]
+    return json.dumps([
+        {"grade_id": str(uuid4()), "student_id": student_ids[i % n_students],
+         "course_id": course_ids[i % n_courses], "score": float(i % 101)}
+        for i in range(n_grades)
+    ])
+
+
+def measure(grade_cls, payload: str, n_grades: int) -> float:
+    """Байт на оценку, удерживаемых после загрузки (включая строки из JSON)"""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    grades = {}
+    for record in json.loads(payload):
+        grade = grade_cls(record['student_id'], record['course_id'], record['score'], record['grade_id'])
+        grades[grade.grade_id] = grade
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (after - before) / n_grades
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--grades", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    payload = make_records(args.grades)
+    print(f"Данные: {args.grades} оценок")
+
+    legacy = measure(LegacyGrade, payload, args.grades)
+    compact = measure(Grade, payload, args.grades)
+    print(f"Прежний Grade (__dict__):     {legacy:8.0f} байт на оценку")
+    print(f"Grade со __slots__ и intern:  {compact:8.0f} байт на оценку")
+    print(f"Экономия: {1 - compact / legacy:.0%}, {(legacy - compact) * args.grades / 2**20:.0f} МБ")
+
+
+if __name__ == "__main__":
+    main()
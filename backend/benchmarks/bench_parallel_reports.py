@@ -0,0 +1,56 @@
+"""
+Бенчмарк полного пересчета статистики оценок: один процесс против шардов
+по ID студента в пуле из REPORT_PROCESSES процессов.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_parallel_reports --grades 1000000 --processes 4
+
+Первый вызов пула включает запуск процессов и замеряется отдельно.
+Выигрыш возможен только при числе свободных ядер >= 2: на одном ядре
+шарды считаются по очереди и к расчету добавляется передача данных.
+"""
+import argparse
+import os
+import time
+
+from domain.aggregation import aggregate_grades
+from domain.models import Grade
+from infrastructure.report_pool import aggregate_grades_parallel, shutdown_report_pool
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--students", type=int, default=20_000)
+    parser.add_argument("--courses", type=int, default=200)
+    parser.add_argument("--grades", type=int, default=1_000_000)
+    parser.add_argument("--processes", type=int, default=max(os.cpu_count() or 1, 2))
+    args = parser.parse_args()
+
+    grades = [Grade(f"s{i % args.students}", f"c{(i * 7) % args.courses}", (i * 37) % 101)
+              for i in range(args.grades)]
+    print(f"Данные: {args.grades} оценок, {args.students} студентов; ядер: {os.cpu_count()}, "
+          f"процессов: {args.processes}")
+
+    expected, sequential = timed(lambda: aggregate_grades(grades, by_student_course=True))
+    print(f"один процесс            {sequential:7.2f} с")
+    try:
+        _, cold = timed(lambda: aggregate_grades_parallel(grades, by_student_course=True,
+                                                          workers=args.processes, threshold=0))
+        actual, warm = timed(lambda: aggregate_grades_parallel(grades, by_student_course=True,
+                                                               workers=args.processes, threshold=0))
+    finally:
+        shutdown_report_pool()
+    assert actual.overall.count == expected.overall.count
+    assert len(actual.by_student_course) == len(expected.by_student_course)
+    print(f"пул (с запуском)        {cold:7.2f} с")
+    print(f"пул                     {warm:7.2f} с   ускорение x{sequential / warm:.2f}")
+
+
+if __name__ == "__main__":
+    main()
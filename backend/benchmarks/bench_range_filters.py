@@ -0,0 +1,85 @@
+"""
+Бенчмарк фильтров /grades по баллу и дате: прежний перебор списка
+против диапазонных индексов (bisect по отсортированным (балл, ID) и
+(дата, ID) с пересечением с индексами студента и курса).
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_range_filters --grades 500000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from domain.models import Grade
+from infrastructure.repositories import GradeRepository
+
+
+def make_grades(n_grades: int, n_students: int, n_courses: int):
+    start = datetime(2024, 1, 1)
+    grades = []
+    for i in range(n_grades):
+        grade = Grade(f"s{(i * 7919) % n_students}", f"c{i % n_courses}", (i * 37) % 1001 / 10)
+        grade.date = start + timedelta(minutes=i)
+        grades.append(grade)
+    return grades, start
+
+
+def scan(repo: GradeRepository, student_id=None, course_id=None, min_score=None, max_score=None,
+         date_from=None, date_to=None):
+    """Прежний путь get_all_grades: find по студенту/курсу и последовательные фильтры"""
+    grades = repo.get_by_student(student_id) if student_id else \
+        repo.get_by_course(course_id) if course_id else repo.get_all()
+    if min_score is not None:
+        grades = [g for g in grades if g.score >= min_score]
+    if max_score is not None:
+        grades = [g for g in grades if g.score <= max_score]
+    if date_from is not None:
+        grades = [g for g in grades if g.date >= date_from]
+    if date_to is not None:
+        grades = [g for g in grades if g.date <= date_to]
+    return grades
+
+
+def timed(func, repeat: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--grades", type=int, default=500_000)
+    parser.add_argument("--students", type=int, default=10_000)
+    parser.add_argument("--courses", type=int, default=200)
+    args = parser.parse_args()
+
+    grades, start = make_grades(args.grades, args.students, args.courses)
+    with tempfile.TemporaryDirectory() as directory:
+        repo = GradeRepository(os.path.join(directory, "grades.json"))
+        repo.add_many(grades)
+        print(f"Данные: {args.grades} оценок, {args.students} студентов, {args.courses} курсов")
+
+        queries = {
+            "балл >= 99.5": dict(min_score=99.5),
+            "балл 40..60": dict(min_score=40, max_score=60),
+            "одни сутки": dict(date_from=start + timedelta(days=100), date_to=start + timedelta(days=101)),
+            "курс + балл >= 95": dict(course_id="c7", min_score=95),
+            "студент + неделя": dict(student_id="s42", date_from=start + timedelta(days=30),
+                                    date_to=start + timedelta(days=37)),
+        }
+        for label, filters in queries.items():
+            expected = scan(repo, **filters)
+            assert sorted(g.grade_id for g in repo.find(**filters)) == sorted(g.grade_id for g in expected)
+            before = timed(lambda: scan(repo, **filters))
+            after = timed(lambda: repo.find(**filters))
+            page = timed(lambda: repo.list_page(50, **filters))
+            count = timed(lambda: repo.count(**filters))
+            print(f"{label:20} найдено {len(expected):7}  перебор {before * 1000:8.2f} мс  "
+                  f"индекс {after * 1000:8.2f} мс  страница 50 {page * 1000:7.2f} мс  count {count * 1000:7.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Бенчмарк сводных отчетов: прежний подсчет (проход по всем оценкам для
+каждого студента/курса) против однопроходной агрегации.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_reports --students 10000 --grades 200000
+
+Прежний подсчет для студентов стоит O(студенты x оценки), поэтому он
+измеряется на выборке из --legacy-sample студентов и экстраполируется.
+"""
+import argparse
+import random
+import time
+
+from domain.aggregation import aggregate_grades
+from domain.score_statistics import HAS_NUMPY, describe_scores
+from domain.models import Course, Grade, Student
+
+
+def make_dataset(n_students: int, n_courses: int, n_grades: int, seed: int = 42):
+    rnd = random.Random(seed)
+    students = [Student(f"Студент {i}", f"student{i}@example.com") for i in range(n_students)]
+    courses = [Course(f"C{i:03d}", f"Курс {i}", rnd.randint(2, 6)) for i in range(n_courses)]
+    grades = [
+        Grade(rnd.choice(students).student_id, rnd.choice(courses).course_id, rnd.uniform(0, 100))
+        for _ in range(n_grades)
+    ]
+    return students, courses, grades
+
+
+def legacy_students_summary(students, grades):
+    result = {}
+    for student in students:
+        student_grades = [g for g in grades if g.student_id == student.student_id]
+        if student_grades:
+            result[student.student_id] = sum(g.score for g in student_grades) / len(student_grades)
+    return result
+
+
+def legacy_courses_summary(courses, grades):
+    result = {}
+    for course in courses:
+        course_grades = [g for g in grades if g.course_id == course.course_id]
+        result[course.course_id] = (
+            len([g for g in course_grades if g.score >= 90]),
+            len([g for g in course_grades if 80 <= g.score < 90]),
+            len([g for g in course_grades if 70 <= g.score < 80]),
+            len([g for g in course_grades if 60 <= g.score < 70]),
+            len([g for g in course_grades if g.score < 60]),
+        )
+    return result
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--students", type=int, default=10_000)
+    parser.add_argument("--courses", type=int, default=200)
+    parser.add_argument("--grades", type=int, default=200_000)
+    parser.add_argument("--legacy-sample", type=int, default=50)
+    args = parser.parse_args()
+
+    students, courses, grades = make_dataset(args.students, args.courses, args.grades)
+    print(f"Данные: {args.students} студентов, {args.courses} курсов, {args.grades} оценок")
+
+    sample = students[:args.legacy_sample]
+    legacy_students = timed(legacy_students_summary, sample, grades) * len(students) / len(sample)
+    legacy_courses = timed(legacy_courses_summary, courses, grades)
+    single_pass = timed(lambda: aggregate_grades(grades, use_numpy=False))
+    scores = [grade.score for grade in grades]
+
+    print(f"Сводка по студентам, прежний подсчет (экстраполяция): {legacy_students:10.3f} с")
+    print(f"Сводка по курсам, прежний подсчет:                     {legacy_courses:10.3f} с")
+    print(f"Однопроходная агрегация (студенты + курсы):            {single_pass:10.3f} с")
+    print(f"Ускорение: студенты x{legacy_students / single_pass:.0f}, "
+          f"курсы x{legacy_courses / single_pass:.0f}")
+
+    describe_python = timed(lambda: describe_scores(scores, use_numpy=False))
+    print(f"Медиана/перцентили/std, Python:                        {describe_python:10.3f} с")
+    if HAS_NUMPY:
+        vectorized = timed(lambda: aggregate_grades(grades, use_numpy=True))
+        describe_numpy = timed(lambda: describe_scores(scores, use_numpy=True))
+        print(f"Агрегация NumPy (bincount):                            {vectorized:10.3f} с")
+        print(f"Медиана/перцентили/std, NumPy:                         {describe_numpy:10.3f} с")
+
+
+if __name__ == "__main__":
+    main()
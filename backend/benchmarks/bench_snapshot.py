@@ -0,0 +1,66 @@
+"""
+Бенчмарк формата снимков: JSON с отступами (прежний), построчный JSON
+(текущий JsonFileStorage) и бинарный колоночный снимок.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_snapshot --grades 500000
+
+Для каждого формата измеряются запись, чтение записей и размер файла.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from uuid import uuid4
+
+from infrastructure.binary_snapshot import read_binary_snapshot, write_binary_snapshot
+from infrastructure.storage import _read_json_snapshot, _write_json_snapshot
+
+
+def make_records(n_grades: int, n_students: int = 20_000, n_courses: int = 300):
+    student_ids = [str(uuid4()) for _ in range(n_students)]
+    course_ids = [str(uuid4()) for _ in range(n_courses)]
+    return [
+        {"grade_id": str(uuid4()), "student_id": student_ids[i % n_students],
+         "course_id": course_ids[i % n_courses], "score": float(i % 101),
+         "letter_grade": str(1 + i % 5), "date": f"2024-10-01T12:{i // 60 % 60:02d}:{i % 60:02d}.{i:06d}"}
+        for i in range(n_grades)
+    ]
+
+
+def write_indented_json(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--grades", type=int, default=500_000)
+    args = parser.parse_args()
+
+    records = make_records(args.grades)
+    print(f"Данные: {args.grades} оценок")
+    formats = (
+        ("JSON indent=2", "grades_indent.json", write_indented_json, _read_json_snapshot),
+        ("JSON построчно", "grades.json", _write_json_snapshot, _read_json_snapshot),
+        ("бинарный", "grades.snap", write_binary_snapshot, read_binary_snapshot),
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for label, name, write, read in formats:
+            path = os.path.join(directory, name)
+            save_time, _ = timed(write, path, records)
+            load_time, loaded = timed(read, path)
+            assert loaded == records
+            size = os.path.getsize(path) / 2**20
+            print(f"{label:15} запись {save_time:7.3f} с   чтение {load_time:7.3f} с   размер {size:7.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
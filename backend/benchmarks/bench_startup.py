@@ -0,0 +1,80 @@
+"""
+Бенчмарк старта воркера: время импорта приложения (после него uvicorn
+может открыть порт) и время загрузки данных.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_startup --grades 300000
+
+До отложенной загрузки репозитории читали JSON при импорте, то есть
+порт открывался только через "импорт + загрузка". Каждый замер идет
+в отдельном процессе в каталоге с заранее сгенерированными файлами.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from uuid import uuid4
+
+
+PROBE = """
+import time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.warmup.run()
+loaded = time.perf_counter()
+print(imported - start, loaded - imported)
+"""
+
+
+def write_dataset(directory: str, n_students: int, n_courses: int, n_grades: int):
+    students = [
+        {"student_id": str(uuid4()), "name": f"Студент {i}", "email": f"student{i}@example.com",
+         "created_at": "2024-09-01T10:00:00", "gpa": None}
+        for i in range(n_students)
+    ]
+    courses = [
+        {"course_id": str(uuid4()), "code": f"C{i:04d}", "name": f"Курс {i}", "credits": 3}
+        for i in range(n_courses)
+    ]
+    grades = [
+        {"grade_id": str(uuid4()), "student_id": students[i % n_students]["student_id"],
+         "course_id": courses[i % n_courses]["course_id"], "score": i % 101,
+         "letter_grade": "3", "date": "2024-10-01T12:00:00"}
+        for i in range(n_grades)
+    ]
+    for name, records in (("students.json", students), ("courses.json", courses), ("grades.json", grades)):
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False)
+
+
+def probe(directory: str, backend_dir: str):
+    env = dict(os.environ, PYTHONPATH=backend_dir, STARTUP_LOAD="lazy")
+    output = subprocess.run([sys.executable, "-c", PROBE], cwd=directory, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    imported, loaded = map(float, output.split()[-2:])
+    return imported, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--students", type=int, default=10_000)
+    parser.add_argument("--courses", type=int, default=200)
+    parser.add_argument("--grades", type=int, default=300_000)
+    args = parser.parse_args()
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, args.students, args.courses, args.grades)
+        print(f"Данные: {args.students} студентов, {args.courses} курсов, {args.grades} оценок")
+        imported, loaded = probe(directory, backend_dir)
+
+    print(f"Импорт приложения (порт можно открывать):  {imported:8.3f} с")
+    print(f"Загрузка данных (фоном или по запросу):    {loaded:8.3f} с")
+    print(f"Прежний старт (загрузка при импорте):      {imported + loaded:8.3f} с")
+
+
+if __name__ == "__main__":
+    main()
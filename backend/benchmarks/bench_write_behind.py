@@ -0,0 +1,73 @@
+"""
+Бенчмарк отложенной записи: серия одиночных оценок (преподаватель вносит
+оценки группы) при синхронной записи и при WRITE_BEHIND.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_write_behind --grades 50000 --burst 40
+
+Для каждого хранилища измеряется время ответа на одну мутацию, общее
+время серии вместе со сбросом на диск и число записей файла.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import Union
+
+from domain.models import Grade
+from infrastructure.repositories import GradeRepository
+from infrastructure.storage import JournalStorage, JsonFileStorage, SharedFileStorage, WriteBehindStorage
+
+
+def make_grades(n_grades: int, n_students: int = 5000, n_courses: int = 200):
+    return [Grade(f"s{i % n_students}", f"c{i % n_courses}", (i * 37) % 101) for i in range(n_grades)]
+
+
+def make_storage(label: str, path: str, interval: float) -> Union[SharedFileStorage, WriteBehindStorage]:
+    storage: SharedFileStorage
+    if label.startswith("json"):
+        storage = JsonFileStorage(path)
+    else:
+        storage = JournalStorage(path, 'grade_id')
+    if label.endswith("write-behind"):
+        return WriteBehindStorage(storage, 'grade_id', interval=interval, max_pending=500)
+    return storage
+
+
+def run_burst(repo: GradeRepository, burst: int):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(burst):
+        begin = time.perf_counter()
+        repo.add(Grade(f"s{i}", "c-burst", 50 + i % 50))
+        latencies.append(time.perf_counter() - begin)
+    repo.storage.flush()
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--grades", type=int, default=50_000)
+    parser.add_argument("--burst", type=int, default=40)
+    parser.add_argument("--interval-ms", type=int, default=200)
+    args = parser.parse_args()
+
+    grades = make_grades(args.grades)
+    print(f"Данные: {args.grades} оценок, серия из {args.burst} одиночных оценок")
+    with tempfile.TemporaryDirectory() as directory:
+        for label in ("json", "json + write-behind", "journal", "journal + write-behind"):
+            path = os.path.join(directory, label.replace(" ", "_").replace("+", "") + ".json")
+            repo = GradeRepository(path, storage=make_storage(label, path, args.interval_ms / 1000))
+            repo.add_many(grades)
+            repo.storage.flush()
+
+            generation = repo.storage.lock.generation()
+            latencies, total = run_burst(repo, args.burst)
+            writes = repo.storage.lock.generation() - generation
+            print(f"{label:23} мутация: медиана {statistics.median(latencies) * 1000:8.2f} мс, "
+                  f"макс {max(latencies) * 1000:8.2f} мс   серия: {total:6.2f} с   записей: {writes}")
+
+
+if __name__ == "__main__":
+    main()
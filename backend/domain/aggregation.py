@@ -0,0 +1,249 @@
+"""
+Агрегация оценок за один проход: количество, сумма, минимум, максимум
+и распределение по буквенным корзинам A-F для всех оценок, каждого
+студента и каждого курса.
+
+На больших наборах при установленном NumPy группировка векторизована:
+ключи групп кодируются целыми числами, суммы и распределения считаются
+через np.bincount, минимумы и максимумы - через np.minimum.at/np.maximum.at.
+"""
+from operator import attrgetter
+from typing import Dict, Hashable, Iterable, List, Optional, Protocol, Sequence, Tuple, TypeVar
+
+from domain.score_statistics import np
+
+
+Key = TypeVar("Key", bound=Hashable)
+
+
+class ScoredGrade(Protocol):
+    """Поля оценки, нужные агрегации (Grade или облегченная оценка шарда)"""
+
+    @property
+    def student_id(self) -> str: ...
+
+    @property
+    def course_id(self) -> str: ...
+
+    @property
+    def score(self) -> float: ...
+
+
+# Минимальное число оценок, начиная с которого используется NumPy
+VECTORIZE_THRESHOLD = 5000
+
+
+GRADE_BUCKETS = ("A", "B", "C", "D", "F")
+
+# Подписи корзин в отчете статистики оценок
+GRADE_BUCKET_LABELS = ("A (90-100)", "B (80-89)", "C (70-79)", "D (60-69)", "F (0-59)")
+
+
+def bucket_index(score: float) -> int:
+    """Индекс корзины A-F для балла"""
+    if score >= 90:
+        return 0
+    if score >= 80:
+        return 1
+    if score >= 70:
+        return 2
+    if score >= 60:
+        return 3
+    return 4
+
+
+def score_to_gpa(average_score: float) -> float:
+    """Перевести средний балл (0-100) в GPA (0-5)"""
+    return round(average_score / 20, 2)
+
+
+class ScoreAccumulator:
+    """Накопитель статистики по набору баллов.
+
+    Удаление балла обновляет count/total/buckets за O(1). Если удален
+    текущий минимум или максимум, флаг extremes_stale сообщает, что
+    min/max нужно пересчитать по исходным баллам.
+    """
+    __slots__ = ("count", "total", "min", "max", "buckets", "extremes_stale")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.buckets: List[int] = [0, 0, 0, 0, 0]
+        self.extremes_stale = False
+
+    def add(self, score: float):
+        """Учесть один балл"""
+        self.count += 1
+        self.total += score
+        if self.min is None or score < self.min:
+            self.min = score
+        if self.max is None or score > self.max:
+            self.max = score
+        self.buckets[bucket_index(score)] += 1
+
+    def remove(self, score: float):
+        """Исключить один ранее учтенный балл"""
+        self.count -= 1
+        self.buckets[bucket_index(score)] -= 1
+        if not self.count:
+            self.total = 0.0
+            self.min = self.max = None
+            self.extremes_stale = False
+            return
+        self.total -= score
+        if score == self.min or score == self.max:
+            self.extremes_stale = True
+
+    def reset_extremes(self, scores: Iterable[float]):
+        """Пересчитать min/max по актуальным баллам"""
+        scores = list(scores)
+        self.min = min(scores) if scores else None
+        self.max = max(scores) if scores else None
+        self.extremes_stale = False
+
+    def merge(self, other: "ScoreAccumulator"):
+        """Объединить с другим накопителем"""
+        if not other.count:
+            return
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        for i, value in enumerate(other.buckets):
+            self.buckets[i] += value
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0
+
+    @property
+    def gpa(self) -> float:
+        return score_to_gpa(self.average) if self.count else 0
+
+    def distribution(self, labels: Tuple[str, ...] = GRADE_BUCKETS) -> Dict[str, int]:
+        """Распределение по корзинам A-F"""
+        return dict(zip(labels, self.buckets))
+
+
+class GradeAggregates:
+    """Результат агрегации: общий накопитель и накопители по группам"""
+
+    def __init__(self):
+        self.overall = ScoreAccumulator()
+        self.by_student: Dict[str, ScoreAccumulator] = {}
+        self.by_course: Dict[str, ScoreAccumulator] = {}
+        self.by_student_course: Dict[Tuple[str, str], ScoreAccumulator] = {}
+
+    def student(self, student_id: str) -> ScoreAccumulator:
+        """Накопитель студента (пустой, если оценок нет)"""
+        return self.by_student.get(student_id) or ScoreAccumulator()
+
+    def course(self, course_id: str) -> ScoreAccumulator:
+        """Накопитель курса (пустой, если оценок нет)"""
+        return self.by_course.get(course_id) or ScoreAccumulator()
+
+    def pair(self, student_id: str, course_id: str) -> ScoreAccumulator:
+        """Накопитель студента по курсу (пустой, если оценок нет)"""
+        return self.by_student_course.get((student_id, course_id)) or ScoreAccumulator()
+
+
+def aggregate_grades(grades: Iterable[ScoredGrade], by_student: bool = True,
+                     by_course: bool = True, by_student_course: bool = False,
+                     use_numpy: Optional[bool] = None) -> GradeAggregates:
+    """Построить статистику по оценкам за один проход.
+
+    use_numpy=None - NumPy для наборов от VECTORIZE_THRESHOLD оценок, если он установлен.
+    """
+    if use_numpy is None:
+        use_numpy = np is not None and isinstance(grades, Sequence) and len(grades) >= VECTORIZE_THRESHOLD
+    if use_numpy:
+        return _aggregate_grades_numpy(grades, by_student, by_course, by_student_course)
+    
+    result = GradeAggregates()
+    overall = result.overall
+    students = result.by_student
+    courses = result.by_course
+    pairs = result.by_student_course
+
+    for grade in grades:
+        score = grade.score
+        overall.add(score)
+        if by_student:
+            acc = students.get(grade.student_id)
+            if acc is None:
+                acc = students[grade.student_id] = ScoreAccumulator()
+            acc.add(score)
+        if by_course:
+            acc = courses.get(grade.course_id)
+            if acc is None:
+                acc = courses[grade.course_id] = ScoreAccumulator()
+            acc.add(score)
+        if by_student_course:
+            key = (grade.student_id, grade.course_id)
+            acc = pairs.get(key)
+            if acc is None:
+                acc = pairs[key] = ScoreAccumulator()
+            acc.add(score)
+    return result
+
+
+def _group_accumulators(keys: Iterable[Key], scores, bucket_indexes) -> Dict[Key, ScoreAccumulator]:
+    """Накопители по группам: ключи кодируются 0..k-1, агрегаты - через bincount"""
+    key_list = list(keys)
+    codes_by_key = {key: code for code, key in enumerate(dict.fromkeys(key_list))}
+    codes = np.fromiter(map(codes_by_key.__getitem__, key_list), dtype=np.int64, count=len(key_list))
+    groups = len(codes_by_key)
+    counts = np.bincount(codes, minlength=groups)
+    totals = np.bincount(codes, weights=scores, minlength=groups)
+    minimums = np.full(groups, np.inf)
+    maximums = np.full(groups, -np.inf)
+    np.minimum.at(minimums, codes, scores)
+    np.maximum.at(maximums, codes, scores)
+    buckets = np.bincount(codes * len(GRADE_BUCKETS) + bucket_indexes,
+                          minlength=groups * len(GRADE_BUCKETS)).reshape(groups, len(GRADE_BUCKETS))
+    
+    count_list, total_list = counts.tolist(), totals.tolist()
+    min_list, max_list, bucket_lists = minimums.tolist(), maximums.tolist(), buckets.tolist()
+    result: Dict[Key, ScoreAccumulator] = {}
+    for key, code in codes_by_key.items():
+        acc = result[key] = ScoreAccumulator()
+        acc.count = count_list[code]
+        acc.total = total_list[code]
+        acc.min = min_list[code]
+        acc.max = max_list[code]
+        acc.buckets = bucket_lists[code]
+    return result
+
+
+def _aggregate_grades_numpy(grades: Iterable[ScoredGrade], by_student: bool,
+                            by_course: bool, by_student_course: bool) -> GradeAggregates:
+    """Векторизованный вариант aggregate_grades"""
+    grades = list(grades)
+    result = GradeAggregates()
+    if not grades:
+        return result
+    
+    scores = np.fromiter(map(attrgetter('score'), grades), dtype=np.float64, count=len(grades))
+    # Границы корзин F|D|C|B|A; индекс корзины 0 соответствует A, как в bucket_index
+    bucket_indexes = len(GRADE_BUCKETS) - 1 - np.searchsorted(np.array([60, 70, 80, 90]), scores, side='right')
+    
+    overall = result.overall
+    overall.count = len(grades)
+    overall.total = float(scores.sum())
+    overall.min = float(scores.min())
+    overall.max = float(scores.max())
+    overall.buckets = np.bincount(bucket_indexes, minlength=len(GRADE_BUCKETS)).tolist()
+    if by_student:
+        result.by_student = _group_accumulators(map(attrgetter('student_id'), grades), scores, bucket_indexes)
+    if by_course:
+        result.by_course = _group_accumulators(map(attrgetter('course_id'), grades), scores, bucket_indexes)
+    if by_student_course:
+        result.by_student_course = _group_accumulators(
+            map(attrgetter('student_id', 'course_id'), grades), scores, bucket_indexes
+        )
+    return result
@@ -0,0 +1,12 @@
+"""
+Доменные исключения
+"""
+
+
+class DuplicateKeyError(ValueError):
+    """Нарушение уникальности ключа (email студента, код курса)"""
+
+    def __init__(self, field: str, value: str):
+        self.field = field
+        self.value = value
+        super().__init__(f"Значение {field}={value!r} уже занято")
@@ -1,9 +1,26 @@
+import sys
 from datetime import datetime
-from typing import Optional, List
-from uuid import UUID, uuid4
+from typing import Optional
+from uuid import uuid4
+
+
+def letter_grade_for(score: float) -> str:
+    """Оценка по пятибалльной шкале для балла 0-100"""
+    if score >= 90:
+        return '5'
+    elif score >= 80:
+        return '4'
+    elif score >= 70:
+        return '3'
+    elif score >= 60:
+        return '2'
+    else:
+        return '1'
 
 
 class Student:
+    __slots__ = ('student_id', 'name', 'email', 'created_at', 'gpa')
+
     def __init__(self, name: str, email: str, student_id: Optional[str] = None):
         self.student_id = student_id or str(uuid4())
         self.name = name
@@ -19,6 +36,8 @@ class Student:
 
 
 class Course:
+    __slots__ = ('course_id', 'code', 'name', 'credits')
+
     def __init__(self, code: str, name: str, credits: int, course_id: Optional[str] = None):
         self.course_id = course_id or str(uuid4())
         self.code = code
@@ -27,21 +46,15 @@ class Course:
 
 
 class Grade:
+    # Оценок на порядки больше, чем студентов и курсов: без __dict__ объект
+    # занимает в разы меньше памяти, а ID студента и курса, повторяющиеся
+    # в тысячах оценок, хранятся одной интернированной строкой
+    __slots__ = ('grade_id', 'student_id', 'course_id', 'score', 'date', 'letter_grade')
+
     def __init__(self, student_id: str, course_id: str, score: float, grade_id: Optional[str] = None):
         self.grade_id = grade_id or str(uuid4())
-        self.student_id = student_id
-        self.course_id = course_id
+        self.student_id = sys.intern(student_id)
+        self.course_id = sys.intern(course_id)
         self.score = score
         self.date = datetime.now()
-        
-        
-        if score >= 90:
-            self.letter_grade = '5'
-        elif score >= 80:
-            self.letter_grade = '4'
-        elif score >= 70:
-            self.letter_grade = '3'
-        elif score >= 60:
-            self.letter_grade = '2'
-        else:
-            self.letter_grade = '1'
\ No newline at end of file
+        self.letter_grade = letter_grade_for(score)
\ No newline at end of file
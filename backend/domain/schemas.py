@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -58,6 +58,26 @@ class GradeInDB(GradeBase):
 
 
 
+# Batch lookup
+MAX_BATCH_SIZE = 1000
+
+
+class BatchRequest(BaseModel):
+    ids: List[str] = Field(..., max_items=MAX_BATCH_SIZE)
+
+
+class StudentRef(BaseModel):
+    student_id: str
+    name: str
+    email: str
+
+
+class CourseRef(BaseModel):
+    course_id: str
+    code: str
+    name: str
+
+
 class StudentResponse(StudentInDB):
     class Config:
         orm_mode = True
@@ -71,3 +91,21 @@ class CourseResponse(CourseInDB):
 class GradeResponse(GradeInDB):
     class Config:
         orm_mode = True
+
+
+# Оценка с данными студента и курса (GET /grades/?expand=student,course)
+class GradeExpandedResponse(GradeResponse):
+    student: Optional[StudentRef] = None
+    course: Optional[CourseRef] = None
+
+
+# Bulk import
+class BulkRowError(BaseModel):
+    row: int
+    message: str
+
+
+class BulkResult(BaseModel):
+    created: int
+    ids: List[str]
+    errors: List[BulkRowError]
@@ -0,0 +1,79 @@
+"""
+Описательная статистика по набору баллов: медиана, перцентили и
+стандартное отклонение.
+
+Если установлен NumPy, расчет векторизован (np.percentile, np.std),
+иначе используется реализация на чистом Python с теми же результатами
+(линейная интерполяция перцентилей, как у NumPy по умолчанию).
+"""
+import math
+from typing import Dict, NamedTuple, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment]
+
+
+HAS_NUMPY = np is not None
+
+# Перцентили в отчете статистики оценок
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+class ScoreSummary(NamedTuple):
+    """Описательная статистика по баллам"""
+    # Не count: так называется метод tuple
+    size: int
+    median: Optional[float]
+    std_dev: Optional[float]
+    percentiles: Dict[str, float]
+
+
+def _use_numpy(use_numpy: Optional[bool]) -> bool:
+    if use_numpy is None:
+        return HAS_NUMPY
+    if use_numpy and not HAS_NUMPY:
+        raise RuntimeError("NumPy не установлен")
+    return use_numpy
+
+
+def percentile_of_sorted(scores: Sequence[float], q: float) -> float:
+    """Перцентиль q (0-100) отсортированных баллов с линейной интерполяцией"""
+    position = (len(scores) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(scores) - 1)
+    return scores[lower] + (scores[upper] - scores[lower]) * (position - lower)
+
+
+def _describe_python(scores: Sequence[float]) -> ScoreSummary:
+    ordered = sorted(scores)
+    count = len(ordered)
+    mean = math.fsum(ordered) / count
+    variance = math.fsum((score - mean) ** 2 for score in ordered) / count
+    return ScoreSummary(
+        size=count,
+        median=percentile_of_sorted(ordered, 50),
+        std_dev=math.sqrt(variance),
+        percentiles={f"p{q}": percentile_of_sorted(ordered, q) for q in PERCENTILES}
+    )
+
+
+def _describe_numpy(scores: Sequence[float]) -> ScoreSummary:
+    values = np.fromiter(scores, dtype=np.float64, count=len(scores))
+    quantiles = np.percentile(values, (50,) + PERCENTILES)
+    return ScoreSummary(
+        size=len(values),
+        median=float(quantiles[0]),
+        std_dev=float(values.std()),
+        percentiles={f"p{q}": float(value) for q, value in zip(PERCENTILES, quantiles[1:])}
+    )
+
+
+def describe_scores(scores: Sequence[float], use_numpy: Optional[bool] = None) -> ScoreSummary:
+    """Медиана, перцентили и стандартное отклонение (use_numpy=None - NumPy, если есть)"""
+    if not scores:
+        return ScoreSummary(size=0, median=None, std_dev=None, percentiles={})
+    if _use_numpy(use_numpy):
+        return _describe_numpy(scores)
+    return _describe_python(scores)
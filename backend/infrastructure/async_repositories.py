@@ -0,0 +1,52 @@
+"""
+Асинхронный интерфейс репозиториев для async-эндпоинтов.
+
+Методы репозиториев синхронные: мутации пишут на диск (снимок, журнал,
+fsync), первое обращение загружает данные, SQLite-версия ходит в базу.
+Вызванные прямо из async def, они останавливают цикл событий и все
+параллельные запросы. AsyncRepository выполняет каждый вызов в пуле
+потоков; мутации при этом сериализуются блокировкой хранилища.
+
+Тяжелые отчеты считаются в отдельном пуле из REPORT_WORKERS потоков,
+чтобы не занимать общий пул, через который идут записи.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from fastapi.concurrency import run_in_threadpool
+
+from infrastructure import config
+from infrastructure.repositories import course_repo, grade_repo, student_repo
+
+
+class AsyncRepository:
+    """Обертка над репозиторием: await repo.method(...) выполняет метод в пуле потоков"""
+
+    def __init__(self, repo: Any):
+        self._repo = repo
+
+    def _call(self, name: str, args: tuple, kwargs: dict) -> Any:
+        # Атрибут берется уже в потоке: у Lazy это может быть загрузка данных
+        return getattr(self._repo, name)(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        async def method(*args, **kwargs):
+            return await run_in_threadpool(self._call, name, args, kwargs)
+        method.__name__ = name
+        return method
+
+
+_report_executor = ThreadPoolExecutor(max_workers=config.REPORT_WORKERS, thread_name_prefix="reports")
+
+
+async def run_report(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Посчитать отчет в пуле отчетов, не блокируя цикл событий"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_report_executor, functools.partial(func, *args, **kwargs))
+
+
+async_student_repo = AsyncRepository(student_repo)
+async_course_repo = AsyncRepository(course_repo)
+async_grade_repo = AsyncRepository(grade_repo)
@@ -0,0 +1,240 @@
+"""
+Бинарный колоночный формат снимков коллекций.
+
+Файл хранит записи по столбцам, поэтому при загрузке числа читаются
+целым массивом, а строки столбца - одним декодированием UTF-8 и
+срезами по смещениям, без разбора JSON. Файл отображается в память
+(mmap), копируются только нужные участки.
+
+Формат (little-endian):
+    заголовок   MAGIC | число записей (uint64) | число столбцов (uint32)
+    столбец     длина имени (uint16) | имя UTF-8 | тип (uint8) | есть None (uint8)
+                [маска None: по байту на запись] | данные
+    данные      float/int - массив float64/int64;
+                str/json  - смещения в символах (int64, записей + 1) |
+                            длина блока (uint64) | блок UTF-8;
+                dict      - словарь различных строк (как str) | коды (uint32)
+
+Строковые столбцы с частыми повторами (ID студента и курса в оценках,
+буквенная оценка) хранятся словарем: файл меньше, а одинаковые значения
+после загрузки - один объект строки. Столбец типа json хранит значения,
+не подходящие под остальные типы (bool, вложенные структуры, смешанные
+типы), в виде JSON строк.
+
+Конвертер JSON снимков (вместе с журналами) в бинарные:
+    python -m infrastructure.binary_snapshot students.json courses.json grades.json
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Tuple
+
+
+Record = Dict[str, Any]
+
+MAGIC = b"SMSNAP\x00\x01"
+SNAPSHOT_SUFFIX = ".snap"
+
+TYPE_FLOAT, TYPE_INT, TYPE_STR, TYPE_JSON, TYPE_DICT = 1, 2, 3, 4, 5
+
+# Словарное кодирование, если различных строк не больше этой доли записей
+DICT_MAX_RATIO = 0.5
+
+_HEADER = struct.Struct("<8sQI")
+_UINT16 = struct.Struct("<H")
+_UINT64 = struct.Struct("<Q")
+_COLUMN_FLAGS = struct.Struct("<BB")
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def snapshot_path_for(json_path: str) -> str:
+    """Путь бинарного снимка для JSON файла коллекции (students.json -> students.snap)"""
+    return os.path.splitext(json_path)[0] + SNAPSHOT_SUFFIX
+
+
+def _column_type(values: List[Any]) -> int:
+    types = {type(value) for value in values if value is not None}
+    if types <= {str}:
+        return TYPE_STR
+    if types == {int} and all(_INT64_MIN <= value <= _INT64_MAX for value in values if value is not None):
+        return TYPE_INT
+    if types <= {int, float}:
+        return TYPE_FLOAT
+    return TYPE_JSON
+
+
+def _numbers_to_bytes(typecode: str, values: List[Any]) -> bytes:
+    numbers = array(typecode, (0 if value is None else value for value in values))
+    if sys.byteorder != "little":
+        numbers.byteswap()
+    return numbers.tobytes()
+
+
+def _texts_to_bytes(texts: List[str]) -> bytes:
+    offsets = array("q", accumulate(map(len, texts), initial=0))
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    blob = "".join(texts).encode("utf-8")
+    return offsets.tobytes() + _UINT64.pack(len(blob)) + blob
+
+
+def _encode_column(values: List[Any]) -> Tuple[int, bytes]:
+    """Тип столбца и его данные"""
+    column_type = _column_type(values)
+    if column_type == TYPE_FLOAT:
+        return column_type, _numbers_to_bytes("d", values)
+    if column_type == TYPE_INT:
+        return column_type, _numbers_to_bytes("q", values)
+    if column_type == TYPE_JSON:
+        return column_type, _texts_to_bytes([json.dumps(value, ensure_ascii=False) for value in values])
+
+    texts = ["" if value is None else value for value in values]
+    codes = {text: code for code, text in enumerate(dict.fromkeys(texts))}
+    if len(codes) > len(texts) * DICT_MAX_RATIO:
+        return TYPE_STR, _texts_to_bytes(texts)
+    return TYPE_DICT, (_UINT64.pack(len(codes)) + _texts_to_bytes(list(codes)) +
+                       _numbers_to_bytes("I", list(map(codes.__getitem__, texts))))
+
+
+def encode_records(records: List[Record]) -> bytes:
+    """Упаковать записи в бинарный снимок"""
+    names: List[str] = list(dict.fromkeys(key for record in records for key in record))
+    parts = [_HEADER.pack(MAGIC, len(records), len(names))]
+    for name in names:
+        values = [record.get(name) for record in records]
+        has_nulls = any(value is None for value in values)
+        column_type, data = _encode_column(values)
+
+        encoded_name = name.encode("utf-8")
+        parts.append(_UINT16.pack(len(encoded_name)) + encoded_name + _COLUMN_FLAGS.pack(column_type, has_nulls))
+        if has_nulls:
+            parts.append(bytes(value is None for value in values))
+        parts.append(data)
+    return b"".join(parts)
+
+
+class _Reader:
+    """Последовательное чтение буфера (mmap или bytes)"""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.position = 0
+
+    def unpack(self, fmt: struct.Struct):
+        values = fmt.unpack_from(self.buffer, self.position)
+        self.position += fmt.size
+        return values
+
+    def take(self, size: int) -> bytes:
+        chunk = self.buffer[self.position:self.position + size]
+        if len(chunk) != size:
+            raise ValueError("Бинарный снимок обрезан")
+        self.position += size
+        return chunk
+
+    def numbers(self, typecode: str, count: int) -> array:
+        numbers = array(typecode)
+        numbers.frombytes(self.take(count * numbers.itemsize))
+        if sys.byteorder != "little":
+            numbers.byteswap()
+        return numbers
+
+    def texts(self, count: int) -> List[str]:
+        offsets = self.numbers("q", count + 1)
+        (blob_size,) = self.unpack(_UINT64)
+        text = self.take(blob_size).decode("utf-8")
+        return list(map(text.__getitem__, map(slice, offsets[:-1], offsets[1:])))
+
+
+def decode_records(buffer) -> List[Record]:
+    """Распаковать записи из бинарного снимка"""
+    reader = _Reader(buffer)
+    magic, count, n_columns = reader.unpack(_HEADER)
+    if magic != MAGIC:
+        raise ValueError("Неизвестный формат бинарного снимка")
+
+    names, columns = [], []
+    for _ in range(n_columns):
+        (name_size,) = reader.unpack(_UINT16)
+        names.append(reader.take(name_size).decode("utf-8"))
+        column_type, has_nulls = reader.unpack(_COLUMN_FLAGS)
+        nulls = reader.take(count) if has_nulls else None
+
+        if column_type == TYPE_FLOAT:
+            values: List[Any] = reader.numbers("d", count).tolist()
+        elif column_type == TYPE_INT:
+            values = reader.numbers("q", count).tolist()
+        elif column_type == TYPE_STR:
+            values = reader.texts(count)
+        elif column_type == TYPE_DICT:
+            (size,) = reader.unpack(_UINT64)
+            uniques = reader.texts(size)
+            values = list(map(uniques.__getitem__, reader.numbers("I", count)))
+        elif column_type == TYPE_JSON:
+            values = [json.loads(text) for text in reader.texts(count)]
+        else:
+            raise ValueError(f"Неизвестный тип столбца {column_type}")
+
+        if nulls is not None:
+            values = [None if null else value for value, null in zip(values, nulls)]
+        columns.append(values)
+
+    return [dict(zip(names, row)) for row in zip(*columns)] if columns else [{} for _ in range(count)]
+
+
+def write_binary_snapshot(file_path: str, records: List[Record]):
+    """Записать бинарный снимок коллекции"""
+    with open(file_path, "wb") as f:
+        f.write(encode_records(list(records)))
+
+
+def read_binary_snapshot(file_path: str) -> List[Record]:
+    """Прочитать бинарный снимок коллекции (через mmap)"""
+    if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+        return []
+    with open(file_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return decode_records(mapped)
+
+
+def convert_json_file(json_path: str, key_field: Optional[str] = None) -> str:
+    """Сконвертировать JSON снимок вместе с его журналами в бинарный снимок.
+
+    Снимок записывается так же, как запись хранилища: под блокировкой
+    .snap.lock, через временный файл и с новым номером поколения. Воркер
+    с STORAGE_MODE=binary не прочитает наполовину записанный файл и
+    перечитает данные при следующем запросе.
+    """
+    from infrastructure.storage import BinarySnapshotStorage, JournalStorage
+
+    key_field = key_field or _guess_key_field(json_path)
+    records = JournalStorage(json_path, key_field).load()
+    target = BinarySnapshotStorage(json_path, key_field)
+    target.save_all(records)
+    return target.file_path
+
+
+def _guess_key_field(json_path: str) -> str:
+    """Ключ записей по имени файла: students.json -> student_id"""
+    name = os.path.splitext(os.path.basename(json_path))[0]
+    return f"{name[:-1] if name.endswith('s') else name}_id"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Конвертация JSON снимков в бинарный формат")
+    parser.add_argument("files", nargs="+", help="JSON файлы коллекций (students.json, ...)")
+    parser.add_argument("--key-field", help="Поле ключа записей (по умолчанию <коллекция>_id)")
+    args = parser.parse_args()
+
+    for json_path in args.files:
+        target = convert_json_file(json_path, args.key_field)
+        print(f"{json_path} ({os.path.getsize(json_path)} байт) -> {target} ({os.path.getsize(target)} байт)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Настройки инфраструктуры (читаются из переменных окружения)
+"""
+import os
+
+
+# Режим хранения данных репозиториев:
+#   json    - вся коллекция перезаписывается в JSON файл при каждом изменении
+#   journal - JSON снимок + журнал изменений (append-only) с фоновой компактизацией
+#   binary  - как journal, но снимок в бинарном колоночном формате (<коллекция>.snap)
+STORAGE_MODE = os.getenv("STORAGE_MODE", "json")
+
+# Сколько записей журнала накапливается до компактизации в снимок
+JOURNAL_COMPACT_THRESHOLD = int(os.getenv("JOURNAL_COMPACT_THRESHOLD", "1000"))
+
+# Сбрасывать ли снимки и записи журнала на диск (fsync) перед подтверждением записи.
+# Без fsync данные переживают падение процесса, но не отключение питания
+STORAGE_FSYNC = os.getenv("STORAGE_FSYNC", "1") == "1"
+
+# Коллекции с отложенной записью (через запятую: students,courses,grades или all).
+# Изменения сбрасываются на диск фоновым потоком не позже WRITE_BEHIND_INTERVAL_MS
+# после первого несохраненного изменения или по накоплении WRITE_BEHIND_MAX_PENDING
+WRITE_BEHIND = {name.strip() for name in os.getenv("WRITE_BEHIND", "").split(",") if name.strip()}
+WRITE_BEHIND_INTERVAL_MS = int(os.getenv("WRITE_BEHIND_INTERVAL_MS", "200"))
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "500"))
+
+# Режим проверки материализованной статистики: после каждой мутации оценок
+# инкрементальное состояние сравнивается с полным пересчетом (медленно, для отладки)
+STATS_VERIFY = os.getenv("STATS_VERIFY", "0") == "1"
+
+# Реализация репозиториев: json (файлы students.json/courses.json/grades.json) | sqlite
+REPOSITORY_BACKEND = os.getenv("REPOSITORY_BACKEND", "json")
+
+# Путь к файлу базы данных для REPOSITORY_BACKEND=sqlite
+SQLITE_PATH = os.getenv("SQLITE_PATH", "student_manager.db")
+
+# Загрузка данных при старте воркера:
+#   background - порт открывается сразу, данные грузятся в фоновом потоке (/health отвечает 503 до готовности)
+#   eager      - данные загружаются до начала приема запросов
+#   lazy       - каждый репозиторий загружается при первом обращении
+STARTUP_LOAD = os.getenv("STARTUP_LOAD", "background")
+
+# Сколько потоков считают тяжелые отчеты (/reports/*) параллельно с обработкой запросов
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+
+# Сколько ответов отчетов хранить в кэше (0 - без кэша). Запись устаревает
+# при любой мутации студентов, курсов или оценок
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "256"))
+
+# Сколько процессов делят полный пересчет статистики оценок (0 или 1 - без пула процессов).
+# Пул включается только начиная с PARALLEL_AGGREGATION_THRESHOLD оценок
+REPORT_PROCESSES = int(os.getenv("REPORT_PROCESSES", "0"))
+PARALLEL_AGGREGATION_THRESHOLD = int(os.getenv("PARALLEL_AGGREGATION_THRESHOLD", "200000"))
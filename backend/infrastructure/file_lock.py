@@ -0,0 +1,76 @@
+"""
+Межпроцессная блокировка файлов данных и счетчик поколений.
+
+Каждый воркер uvicorn держит свою копию данных в памяти. Запись в
+хранилище идет под исключительной блокировкой (fcntl.flock) файла
+<данные>.lock, и после нее увеличивается записанный в этом файле номер
+поколения. По расхождению номера процесс узнает, что данные изменил
+другой процесс, и перечитывает их вместо того, чтобы затереть.
+
+Без fcntl (Windows) блокировка действует только между потоками процесса.
+"""
+import os
+import threading
+from types import ModuleType
+from typing import Optional
+
+fcntl: Optional[ModuleType]
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+class FileLock:
+    """Реентерабельная блокировка: между потоками - RLock, между процессами - flock"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+
+    def _descriptor(self) -> int:
+        # После fork дескриптор родителя разделяет с ним блокировку, поэтому открываем свой
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def __enter__(self):
+        self._lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                fcntl.flock(self._descriptor(), fcntl.LOCK_EX)
+            except BaseException:
+                self._lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0 and fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._lock.release()
+
+    def generation(self) -> int:
+        """Номер поколения данных (0 - в файл еще не писали, -1 - не удалось прочитать)"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+        try:
+            return int(data) if data else 0
+        except ValueError:
+            return -1
+
+    def bump(self) -> int:
+        """Увеличить номер поколения после записи (только под блокировкой)"""
+        generation = max(self.generation(), 0) + 1
+        # Номер только растет, поэтому новая запись всегда перекрывает старую целиком
+        with open(self.path, 'r+b' if os.path.exists(self.path) else 'wb') as f:
+            f.write(str(generation).encode())
+        return generation
@@ -0,0 +1,90 @@
+"""
+Вспомогательные индексы для репозиториев в памяти
+"""
+import bisect
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+
+class _AboveAll:
+    """Значение больше любого другого: верхняя граница (high, _ABOVE_ALL)
+    идет после всех кортежей (high, ...)"""
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+
+_ABOVE_ALL = _AboveAll()
+
+# До скольких ключей remove_many удаляет их по одному: удаление из списка -
+# это сдвиг памяти (быстрый), а проход по всему списку идет на Python
+_REMOVE_ONE_BY_ONE = 64
+
+
+class SortedIndex:
+    """Отсортированный список ключей: вставка и удаление через bisect,
+    перебор начиная с произвольного ключа без копирования списка"""
+
+    def __init__(self, keys: Iterable[Any] = ()):
+        self._keys: List[Any] = sorted(keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._keys)
+
+    def add(self, key: Any):
+        """Добавить ключ"""
+        bisect.insort(self._keys, key)
+
+    def update(self, keys: Iterable[Any]):
+        """Добавить пачку ключей одной сортировкой (вместо insort на каждый)"""
+        keys = list(keys)
+        if keys:
+            self._keys.extend(keys)
+            self._keys.sort()
+
+    def remove(self, key: Any) -> bool:
+        """Удалить ключ, вернуть False, если его не было"""
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+            return True
+        return False
+
+    def remove_many(self, keys: Iterable[Any]) -> int:
+        """Удалить пачку ключей, вернуть число удаленных. Несколько ключей
+        удаляются через bisect, большая пачка - одним проходом по списку"""
+        keys = set(keys)
+        if len(keys) <= _REMOVE_ONE_BY_ONE:
+            return sum(self.remove(key) for key in keys)
+        before = len(self._keys)
+        self._keys = [key for key in self._keys if key not in keys]
+        return before - len(self._keys)
+
+    def iter_after(self, key: Optional[Any] = None) -> Iterator[Any]:
+        """Перебрать ключи строго больше key (все ключи, если key=None)"""
+        keys = self._keys
+        i = bisect.bisect_right(keys, key) if key is not None else 0
+        while i < len(keys):
+            yield keys[i]
+            i += 1
+
+    def _bounds(self, low: Optional[Any], high: Optional[Any]) -> Tuple[int, int]:
+        keys = self._keys
+        start = bisect.bisect_left(keys, (low,)) if low is not None else 0
+        stop = bisect.bisect_right(keys, (high, _ABOVE_ALL)) if high is not None else len(keys)
+        return start, max(start, stop)
+
+    def range(self, low: Optional[Any] = None, high: Optional[Any] = None) -> List[Any]:
+        """Ключи-кортежи (значение, ID), у которых low <= значение <= high (None - без границы)"""
+        start, stop = self._bounds(low, high)
+        return self._keys[start:stop]
+
+    def range_size(self, low: Optional[Any] = None, high: Optional[Any] = None) -> int:
+        """Число ключей в диапазоне range(low, high) без копирования (O(log N))"""
+        start, stop = self._bounds(low, high)
+        return stop - start
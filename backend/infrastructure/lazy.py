@@ -0,0 +1,150 @@
+"""
+Отложенная инициализация тяжелых объектов (репозитории, статистика).
+
+Lazy создает объект при первом обращении к любому его атрибуту, поэтому
+импорт модулей не читает файлы данных и воркер начинает слушать порт
+сразу. Warmup загружает объекты заранее в фоновом потоке и сообщает
+прогресс для /health.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from infrastructure.metrics import Counter, Histogram
+
+
+LOAD_SECONDS = Histogram("component_load_duration_seconds",
+                         "Создание отложенных объектов (загрузка репозиториев и статистики)", ("component",))
+LOAD_ERRORS = Counter("component_load_errors_total", "Ошибки создания отложенных объектов", ("component",))
+
+logger = logging.getLogger(__name__)
+
+
+class Lazy:
+    """Прокси к объекту, создаваемому фабрикой при первом обращении.
+
+    Создание потокобезопасно: параллельные запросы ждут окончания загрузки.
+    Обработчики after_load вызываются после создания объекта, до того как
+    его увидят другие потоки. Повторный вход в load из того же потока
+    возвращает None во время работы фабрики и уже созданный объект -
+    во время обработчиков after_load.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self._name = name
+        self._factory = factory
+        self._instance = None
+        self._creating = False
+        self._pending = None
+        self._after_load: List[Callable[[Any], None]] = []
+        self._lock = threading.RLock()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def after_load(self, callback: Callable[[Any], None]):
+        """Вызвать callback(объект) сразу после создания (или сейчас, если уже создан)"""
+        with self._lock:
+            self._after_load.append(callback)
+            instance = self._instance
+        if instance is not None:
+            callback(instance)
+
+    def load(self) -> Any:
+        """Получить объект, создав его при необходимости"""
+        instance = self._instance
+        if instance is not None:
+            return instance
+        with self._lock:
+            if self._instance is not None or self._creating:
+                return self._instance if self._instance is not None else self._pending
+            self._creating = True
+            try:
+                with LOAD_SECONDS.time(component=self._name):
+                    self._pending = self._factory()
+                for callback in self._after_load:
+                    callback(self._pending)
+                self._instance = self._pending
+            except Exception:
+                LOAD_ERRORS.inc(component=self._name)
+                raise
+            finally:
+                self._creating = False
+                self._pending = None
+            return self._instance
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<Lazy {self._name}: {state}>"
+
+
+class Warmup:
+    """Загрузка отложенных объектов по порядку с отчетом о прогрессе"""
+
+    def __init__(self, components: List[Lazy]):
+        self.components = components
+        self.state = "idle"             # idle | loading | ready | failed
+        self.current: Optional[str] = None
+        self.error: Optional[str] = None
+        self.durations: Dict[str, float] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def run(self):
+        """Загрузить все объекты в текущем потоке"""
+        self.state = "loading"
+        try:
+            for component in self.components:
+                self.current = component.name
+                start = time.perf_counter()
+                component.load()
+                self.durations[component.name] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            logger.exception("Ошибка загрузки %s", self.current)
+            return
+        self.current = None
+        self.state = "ready"
+
+    def start(self):
+        """Запустить загрузку в фоновом потоке"""
+        if self._thread is None:
+            self.state = "loading"
+            self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+            self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None):
+        """Дождаться окончания фоновой загрузки"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def ready(self) -> bool:
+        """Готов ли сервис отвечать без ожидания загрузки"""
+        return self.state in ("idle", "ready")
+
+    def status(self) -> Dict[str, Any]:
+        """Прогресс загрузки для /health"""
+        loaded = [component.name for component in self.components if component.loaded]
+        status = {
+            "state": self.state,
+            "loaded": len(loaded),
+            "total": len(self.components),
+            "components": {c.name: ("loaded" if c.loaded else "pending") for c in self.components},
+        }
+        if self.current:
+            status["current"] = self.current
+        if self.error:
+            status["error"] = self.error
+        if self.durations:
+            status["durations"] = self.durations
+        return status
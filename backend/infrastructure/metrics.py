@@ -0,0 +1,195 @@
+"""
+Метрики процесса в текстовом формате Prometheus (GET /metrics).
+
+Counter и Histogram обновляются из обработчиков запросов, пула потоков
+и фоновых потоков хранилища, поэтому каждая метрика защищена своей
+блокировкой. CallbackMetric ничего не хранит: значения берутся из
+функции в момент запроса /metrics (например, из метрик кэша отчетов).
+
+Метрики у каждого воркера свои: при --workers N Prometheus собирает их
+с каждого процесса отдельно (или суммирует по меткам экземпляра).
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Границы корзин гистограмм в секундах: от миллисекунды (поиск по индексу)
+# до десятков секунд (полная загрузка или пересчет больших данных)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: List["Metric"] = []
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Общая часть метрик: имя, описание, имена меток и регистрация"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Метрика {self.name} ожидает метки {self.labelnames}, получены {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, Sequence[str], Sequence[str], float]]:
+        """Строки метрики: (суффикс имени, имена меток, значения меток, значение)"""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.type}"]
+        for suffix, names, values, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Монотонно растущий счетчик"""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield "", self.labelnames, key, value
+
+
+class Histogram(Metric):
+    """Распределение длительностей по корзинам (накопительно, как в Prometheus)"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Для каждой комбинации меток: [число попаданий в корзины..., сумма, количество]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Замерить длительность блока with"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def timed(self, **labels):
+        """Декоратор: замерять длительность каждого вызова функции"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start, **labels)
+            return wrapper
+        return decorator
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return int(state[-1]) if state else 0
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, list(state)) for key, state in self._values.items())
+        names = self.labelnames + ("le",)
+        for key, state in values:
+            cumulative = 0
+            for bound, hits in zip(self.buckets, state):
+                cumulative += hits
+                yield "_bucket", names, key + (_format_value(bound),), cumulative
+            yield "_bucket", names, key + ("+Inf",), state[-1]
+            yield "_sum", self.labelnames, key, state[-2]
+            yield "_count", self.labelnames, key, state[-1]
+
+
+class CallbackMetric(Metric):
+    """Метрика, значения которой берутся из функции при каждом сборе.
+
+    collect возвращает {значения меток: значение}; ошибка сбора не
+    ломает /metrics - метрика просто пропускается.
+    """
+
+    def __init__(self, name: str, documentation: str, metric_type: str,
+                 collect: Callable[[], Dict[LabelValues, float]], labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.type = metric_type
+        self._collect = collect
+
+    def samples(self):
+        try:
+            values = self._collect()
+        except Exception:
+            return
+        for key, value in sorted(values.items()):
+            if value is not None:
+                yield "", self.labelnames, key, value
+
+
+# Общая для файловых и SQLite репозиториев: объявлена здесь, чтобы
+# sqlite_repositories не импортировал ее из repositories по кругу
+QUERY_SECONDS = Histogram("repository_query_duration_seconds",
+                          "Выборки из репозиториев по индексам (или SQL)", ("collection", "method"))
+
+
+def render_metrics() -> str:
+    """Все зарегистрированные метрики в текстовом формате Prometheus"""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
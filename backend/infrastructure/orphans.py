@@ -0,0 +1,64 @@
+"""
+Поиск и удаление оценок-сирот: оценок, чей студент или курс удален.
+
+Удаление студента или курса через API удаляет и их оценки, но данные,
+накопленные до этого (или оставшиеся после сбоя между двумя записями),
+могут содержать сирот. Они попадают в каждый проход по оценкам и в
+статистику отчетов. Команда удаляет их одной записью; GPA студентов,
+потерявших оценки удаленных курсов, пересчитывается:
+
+    python -m infrastructure.orphans --data-dir /путь/к/данным [--dry-run]
+
+Запись идет под блокировкой файлов данных, поэтому команду можно
+запускать при работающем API: воркеры подгрузят изменения сами.
+"""
+import argparse
+import os
+from typing import Any, List
+
+from domain.models import Grade
+
+
+def find_orphans(grades: Any, students: Any, courses: Any) -> List[Grade]:
+    """Оценки, ссылающиеся на несуществующего студента или курс"""
+    all_grades = grades.get_all()
+    missing_students = {student_id for student_id in {grade.student_id for grade in all_grades}
+                        if students.get_by_id(student_id) is None}
+    missing_courses = {course_id for course_id in {grade.course_id for grade in all_grades}
+                       if courses.get_by_id(course_id) is None}
+    return [grade for grade in all_grades
+            if grade.student_id in missing_students or grade.course_id in missing_courses]
+
+
+def sweep_orphans(grades: Any, students: Any, courses: Any, dry_run: bool = False) -> List[Grade]:
+    """Удалить оценки-сироты одной записью, вернуть их список"""
+    orphans = find_orphans(grades, students, courses)
+    if orphans and not dry_run:
+        grades.delete_many([grade.grade_id for grade in orphans])
+    return orphans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Удаление оценок удаленных студентов и курсов")
+    parser.add_argument("--data-dir", default=".", help="Каталог с файлами данных (students.json, ...)")
+    parser.add_argument("--dry-run", action="store_true", help="Только показать, что будет удалено")
+    args = parser.parse_args()
+
+    os.chdir(args.data_dir)
+    # Импорт после смены каталога: репозитории открывают файлы по относительным путям.
+    # grade_stats подписывает статистику и синхронизацию GPA на оценки при их загрузке
+    from infrastructure.repositories import course_repo, flush_repositories, grade_repo, student_repo
+    from infrastructure.stats import grade_stats
+
+    grade_stats.load()
+
+    orphans = sweep_orphans(grade_repo, student_repo, course_repo, dry_run=args.dry_run)
+    flush_repositories()
+    without_student = sum(1 for grade in orphans if student_repo.get_by_id(grade.student_id) is None)
+    action = "найдено" if args.dry_run else "удалено"
+    print(f"Оценок-сирот {action}: {len(orphans)} (без студента: {without_student}, "
+          f"без курса: {len(orphans) - without_student})")
+
+
+if __name__ == "__main__":
+    main()
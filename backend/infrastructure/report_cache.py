@@ -0,0 +1,117 @@
+"""
+Кэш ответов отчетов /reports/*.
+
+Дашборды опрашивают сводки раз в несколько секунд, а данные меняются
+редко. Ответ хранится по ключу (отчет, параметры запроса) вместе со
+счетчиками изменений репозиториев на момент расчета; если с тех пор
+была хоть одна мутация (или данные перечитаны после записи другого
+воркера), запись считается устаревшей и отчет считается заново.
+
+Перед чтением счетчиков подгружаются изменения других воркеров
+(файлы данных или таблица generations SQLite), поэтому чужая запись
+тоже делает записи кэша устаревшими.
+
+Счетчики читаются до расчета: отчет, посчитанный одновременно с
+мутацией, сохраняется со старыми счетчиками и следующим запросом не
+используется. Размер ограничен REPORT_CACHE_SIZE, вытесняются давно не
+запрошенные записи (LRU).
+"""
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from infrastructure import config
+from infrastructure.metrics import CallbackMetric, Histogram
+from infrastructure.repositories import shared_data_generation
+
+
+REPORT_SECONDS = Histogram("report_compute_duration_seconds", "Расчет отчетов (без попаданий в кэш)", ("report",))
+
+
+class ReportCache:
+    """LRU кэш результатов отчетов с инвалидацией по счетчику изменений"""
+
+    def __init__(self, max_size: int, generation: Callable[[], Hashable] = shared_data_generation):
+        self.max_size = max_size
+        self._generation = generation
+        self._entries: "OrderedDict[Tuple, Tuple[Hashable, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, name: str, params: Tuple, compute: Callable[[], Any]) -> Any:
+        """Вернуть сохраненный отчет или посчитать и сохранить его"""
+        if self.max_size <= 0:
+            with REPORT_SECONDS.time(report=name):
+                return compute()
+        key = (name, params)
+        generation = self._generation()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            if entry is not None:
+                del self._entries[key]
+                self.invalidations += 1
+
+        with REPORT_SECONDS.time(report=name):
+            result = compute()
+        with self._lock:
+            self._entries[key] = (generation, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def cached(self, name: str):
+        """Декоратор: кэшировать функцию отчета по значениям аргументов"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args):
+                return self.get_or_compute(name, args, lambda: func(*args))
+            return wrapper
+        return decorator
+
+    def clear(self):
+        """Удалить все записи (счетчики попаданий сохраняются)"""
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Попадания, промахи и заполненность кэша"""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / requests, 4) if requests else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+report_cache = ReportCache(config.REPORT_CACHE_SIZE)
+
+
+
+def _cache_values(key: str) -> Callable[[], Dict[Tuple, Any]]:
+    return lambda: {(): report_cache.metrics()[key]}
+
+
+for _key, _name, _type, _documentation in (
+    ("hits", "report_cache_hits_total", "counter", "Ответы отчетов из кэша"),
+    ("misses", "report_cache_misses_total", "counter", "Отчеты, посчитанные заново"),
+    ("evictions", "report_cache_evictions_total", "counter", "Записи, вытесненные по LRU"),
+    ("invalidations", "report_cache_invalidations_total", "counter", "Записи, устаревшие после мутаций"),
+    ("size", "report_cache_size", "gauge", "Записей в кэше отчетов"),
+):
+    CallbackMetric(_name, _documentation, _type, _cache_values(_key))
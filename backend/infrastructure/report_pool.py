@@ -0,0 +1,127 @@
+"""
+Полный пересчет статистики оценок в пуле процессов.
+
+aggregate_grades работает под GIL, то есть на одном ядре. На больших
+наборах оценки делятся на шарды по хешу ID студента, каждый шард
+агрегируется в отдельном процессе, и частичные накопители объединяются:
+студенты и пары студент-курс между шардами не пересекаются, курсы и
+общий итог складываются через ScoreAccumulator.merge.
+
+Пул включается только от PARALLEL_AGGREGATION_THRESHOLD оценок и при
+REPORT_PROCESSES >= 2: на малых наборах передача данных между
+процессами дороже самого расчета.
+"""
+import multiprocessing
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from domain.aggregation import GradeAggregates, ScoreAccumulator, aggregate_grades
+from domain.models import Grade
+from infrastructure import config
+
+
+class _ShardGrade(NamedTuple):
+    """Оценка внутри шарда: только поля, нужные агрегации"""
+    student_id: str
+    course_id: str
+    score: float
+
+
+# Шард для процесса пула: ID студентов, ID курсов и баллы (столбцами)
+_Shard = Tuple[List[str], List[str], List[float]]
+
+# Накопитель при передаче между процессами: (count, total, min, max, buckets)
+_PackedAccumulator = Tuple[int, float, Optional[float], Optional[float], List[int]]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _pack(groups: Dict) -> Dict:
+    return {key: (acc.count, acc.total, acc.min, acc.max, acc.buckets) for key, acc in groups.items()}
+
+
+def _unpack(packed: _PackedAccumulator) -> ScoreAccumulator:
+    acc = ScoreAccumulator()
+    acc.count, acc.total, acc.min, acc.max, acc.buckets = packed
+    return acc
+
+
+def _aggregate_shard(student_ids: List[str], course_ids: List[str], scores: List[float],
+                     by_student: bool, by_course: bool, by_student_course: bool):
+    """Агрегировать один шард (выполняется в процессе пула)"""
+    grades = list(map(_ShardGrade, student_ids, course_ids, scores))
+    result = aggregate_grades(grades, by_student, by_course, by_student_course)
+    overall = result.overall
+    return ((overall.count, overall.total, overall.min, overall.max, overall.buckets),
+            _pack(result.by_student), _pack(result.by_course), _pack(result.by_student_course))
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn: воркер API многопоточный, fork такого процесса небезопасен
+            _pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_report_pool():
+    """Остановить пул процессов (при остановке воркера API)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def shard_of(student_id: str, shards: int) -> int:
+    """Номер шарда студента (стабилен между процессами, в отличие от hash())"""
+    return zlib.crc32(student_id.encode("utf-8")) % shards
+
+
+def aggregate_grades_parallel(grades: Iterable[Grade], by_student: bool = True,
+                              by_course: bool = True, by_student_course: bool = False,
+                              workers: Optional[int] = None,
+                              threshold: Optional[int] = None) -> GradeAggregates:
+    """aggregate_grades, распределенный по пулу процессов для больших наборов"""
+    grades = list(grades)
+    workers = config.REPORT_PROCESSES if workers is None else workers
+    threshold = config.PARALLEL_AGGREGATION_THRESHOLD if threshold is None else threshold
+    if workers < 2 or len(grades) < threshold:
+        return aggregate_grades(grades, by_student, by_course, by_student_course)
+
+    shards: List[_Shard] = [([], [], []) for _ in range(workers)]
+    shard_by_student: Dict[str, _Shard] = {}
+    for grade in grades:
+        shard = shard_by_student.get(grade.student_id)
+        if shard is None:
+            shard = shard_by_student[grade.student_id] = shards[shard_of(grade.student_id, workers)]
+        shard[0].append(grade.student_id)
+        shard[1].append(grade.course_id)
+        shard[2].append(grade.score)
+
+    pool = _get_pool(workers)
+    futures = [pool.submit(_aggregate_shard, *shard, by_student, by_course, by_student_course)
+               for shard in shards if shard[0]]
+
+    result = GradeAggregates()
+    for future in futures:
+        overall, students, courses, pairs = future.result()
+        result.overall.merge(_unpack(overall))
+        # Студенты (и их пары с курсами) целиком лежат в одном шарде
+        result.by_student.update((key, _unpack(packed)) for key, packed in students.items())
+        result.by_student_course.update((key, _unpack(packed)) for key, packed in pairs.items())
+        for key, packed in courses.items():
+            acc = result.by_course.get(key)
+            if acc is None:
+                result.by_course[key] = _unpack(packed)
+            else:
+                acc.merge(_unpack(packed))
+    return result
@@ -1,67 +1,199 @@
 
-import json
-import os
-from typing import List, Optional, Dict, Any
-from domain.models import Student, Course, Grade
+import bisect
+import functools
+import logging
+import threading
+from itertools import islice, repeat
+from operator import attrgetter
+from typing import Callable, Iterable, List, NamedTuple, Optional, Dict, Any, Tuple
+from domain.models import Student, Course, Grade, letter_grade_for
+from domain.exceptions import DuplicateKeyError
 from datetime import datetime
 
+from infrastructure import config
+from infrastructure.indexes import SortedIndex
+from infrastructure.lazy import Lazy
+from infrastructure.metrics import QUERY_SECONDS, CallbackMetric, Counter
+from infrastructure.storage import PersistenceError, create_storage
+
+
+DUPLICATE_KEYS = Counter("repository_duplicate_keys_total",
+                         "Записи с повторяющимся email или кодом в загруженных данных", ("collection",))
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_key(value: str) -> str:
+    """Нормализовать уникальный ключ (email, код курса) для сравнения"""
+    return value.strip().casefold()
+
+
+def bumps_generation(method):
+    """Увеличить счетчик изменений репозитория после мутации (и после
+    неудачной: кэши, построенные по данным до нее, больше не используются)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.generation += 1
+    return wrapper
+
+
+def synchronized(method):
+    """Выполнить мутацию под блокировкой хранилища, подгрузив перед этим
+    изменения других процессов: проверки уникальности видят свежие данные,
+    а запись не затирает чужие изменения"""
+    counted = bumps_generation(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock, self.storage.lock:
+            self.refresh()
+            return counted(self, *args, **kwargs)
+    return wrapper
+
 
 class StudentRepository:
-    def __init__(self, file_path: str = "students.json"):
+    def __init__(self, file_path: str = "students.json", storage=None):
         self.file_path = file_path
+        self.storage = storage or create_storage(file_path, 'student_id')
+        # Мутации из разных потоков идут по очереди. Чтения не блокируются:
+        # они обходят копии словарей (list(d), sorted(d) атомарны под GIL)
+        # и пропускают записи, удаленные между чтением индекса и словаря
+        self._lock = threading.RLock()
         self.students: Dict[str, Student] = {}
+        # Счетчик изменений: растет при каждой мутации и перечитывании файла
+        self.generation = 0
+        
+        # Отсортированные ID для keyset-пагинации
+        self._ids = SortedIndex()
+        
+        # Уникальный индекс: нормализованный email -> student_id
+        self._by_email: Dict[str, str] = {}
+        
+        # Рейтинг по GPA: отсортированный список (-gpa, порядок добавления, student_id)
+        self._gpa_ranking: List[Tuple[float, int, str]] = []
+        self._ranking_keys: Dict[str, Tuple[float, int, str]] = {}
+        self._next_rank_seq = 0
         self._load_from_file()
     
     def _load_from_file(self):
         """Загрузить студентов из файла"""
-        if os.path.exists(self.file_path):
-            try:
-                with open(self.file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    for student_data in data:
-                       
-                        created_at_str = student_data['created_at']
-                        if isinstance(created_at_str, str):
-                            try:
-                                created_at = datetime.fromisoformat(created_at_str)
-                            except (ValueError, AttributeError):
-                                created_at = datetime.now()
-                        else:
-                            created_at = datetime.now()
-                        
-                        student = Student(
-                            name=student_data['name'],
-                            email=student_data['email'],
-                            student_id=student_data['student_id']
-                        )
-                        student.created_at = created_at
-                        student.gpa = student_data.get('gpa')
-                        self.students[student.student_id] = student
-            except Exception as e:
-                print(f"Ошибка загрузки студентов: {e}")
-             
-                self.students = {}
-    
-    def _save_to_file(self):
-        """Сохранить студентов в файл"""
+        self.students = {}
         try:
-            data = []
-            for student in self.students.values():
+            for student_data in self.storage.load():
                
-                created_at_str = student.created_at.isoformat() if hasattr(student.created_at, 'isoformat') else datetime.now().isoformat()
+                created_at_str = student_data['created_at']
+                if isinstance(created_at_str, str):
+                    try:
+                        created_at = datetime.fromisoformat(created_at_str)
+                    except (ValueError, AttributeError):
+                        created_at = datetime.now()
+                else:
+                    created_at = datetime.now()
                 
-                data.append({
-                    'student_id': student.student_id,
-                    'name': student.name,
-                    'email': student.email,
-                    'created_at': created_at_str,
-                    'gpa': student.gpa
-                })
-            
-            with open(self.file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+                student = Student(
+                    name=student_data['name'],
+                    email=student_data['email'],
+                    student_id=student_data['student_id']
+                )
+                student.created_at = created_at
+                student.gpa = student_data.get('gpa')
+                self.students[student.student_id] = student
         except Exception as e:
-            print(f"Ошибка сохранения студентов: {e}")
+            raise PersistenceError(f"Ошибка загрузки студентов: {e}") from e
+        self._ids = SortedIndex(self.students)
+        self._rebuild_email_index()
+        self._rebuild_gpa_ranking()
+    
+    def refresh(self) -> bool:
+        """Перечитать студентов, если их изменил другой процесс"""
+        if not self.storage.is_stale():
+            return False
+        with self._lock, self.storage.lock:
+            if not self.storage.is_stale():
+                return False
+            self._load_from_file()
+            self.generation += 1
+            return True
+    
+    def _rebuild_email_index(self):
+        """Перестроить индекс email по основному словарю"""
+        self._by_email = {}
+        for student in self.students.values():
+            key = normalize_key(student.email)
+            if key in self._by_email:
+                DUPLICATE_KEYS.inc(collection="students")
+                logger.warning("Дублирующийся email в данных студентов: %s", student.email)
+                continue
+            self._by_email[key] = student.student_id
+    
+    def _rebuild_gpa_ranking(self):
+        """Перестроить рейтинг по GPA по основному словарю"""
+        self._gpa_ranking = []
+        self._ranking_keys = {}
+        self._next_rank_seq = 0
+        for student in self.students.values():
+            self._rank(student)
+    
+    def _rank(self, student: Student):
+        """Поставить студента в рейтинг по GPA (студенты без GPA идут с нулем)"""
+        previous = self._ranking_keys.get(student.student_id)
+        if previous is not None:
+            seq = previous[1]
+            self._unrank(student.student_id)
+        else:
+            seq = self._next_rank_seq
+            self._next_rank_seq += 1
+        key = (-(student.gpa or 0), seq, student.student_id)
+        bisect.insort(self._gpa_ranking, key)
+        self._ranking_keys[student.student_id] = key
+    
+    def _unrank(self, student_id: str):
+        """Убрать студента из рейтинга по GPA"""
+        key = self._ranking_keys.pop(student_id, None)
+        if key is not None:
+            del self._gpa_ranking[bisect.bisect_left(self._gpa_ranking, key)]
+    
+    def _check_email_free(self, email: str, student_id: str):
+        """Убедиться, что email не занят другим студентом"""
+        owner = self._by_email.get(normalize_key(email))
+        if owner is not None and owner != student_id:
+            raise DuplicateKeyError('email', email)
+    
+    def _to_record(self, student: Student) -> Dict[str, Any]:
+        """Преобразовать студента в запись для хранилища"""
+        created_at_str = student.created_at.isoformat() if hasattr(student.created_at, 'isoformat') else datetime.now().isoformat()
+        
+        return {
+            'student_id': student.student_id,
+            'name': student.name,
+            'email': student.email,
+            'created_at': created_at_str,
+            'gpa': student.gpa
+        }
+    
+    def _snapshot(self) -> List[Dict[str, Any]]:
+        return [self._to_record(student) for student in self.students.values()]
+    
+    def _record_change(self, student_id: str, student: Optional[Student]):
+        """Сохранить изменение одного студента (None - удаление)"""
+        try:
+            record = self._to_record(student) if student else None
+            self.storage.record_change(student_id, record, self._snapshot)
+        except Exception as e:
+            self.storage.invalidate()
+            raise PersistenceError(f"Ошибка сохранения студентов: {e}") from e
+    
+    def _record_changes(self, students: List[Student]):
+        """Сохранить изменения нескольких студентов одной записью"""
+        try:
+            changes = [(student.student_id, self._to_record(student)) for student in students]
+            self.storage.record_changes(changes, self._snapshot)
+        except Exception as e:
+            self.storage.invalidate()
+            raise PersistenceError(f"Ошибка сохранения студентов: {e}") from e
     
     def get_all(self) -> List[Student]:
         """Получить всех студентов"""
@@ -71,78 +203,229 @@ class StudentRepository:
         """Получить студента по ID"""
         return self.students.get(student_id)
     
+    @QUERY_SECONDS.timed(collection="students", method="get_many")
+    def get_many(self, student_ids: Iterable[str]) -> List[Student]:
+        """Получить студентов по списку ID (в порядке списка, без повторов и ненайденных)"""
+        students = (self.students.get(student_id) for student_id in dict.fromkeys(student_ids))
+        return [student for student in students if student is not None]
+    
     def get_by_email(self, email: str) -> Optional[Student]:
-        """Получить студента по email"""
-        for student in self.students.values():
-            if student.email == email:
-                return student
-        return None
+        """Получить студента по email (без учета регистра)"""
+        student_id = self._by_email.get(normalize_key(email))
+        return self.students.get(student_id) if student_id else None
+    
+    def count(self) -> int:
+        """Количество студентов"""
+        return len(self.students)
+    
+    def list_page(self, limit: int, after: Optional[str] = None) -> List[Student]:
+        """Страница студентов, упорядоченных по ID, начиная после курсора after"""
+        students = (self.students.get(student_id) for student_id in self._ids.iter_after(after))
+        return list(islice((student for student in students if student is not None), limit))
     
+    def top_by_gpa(self, limit: int) -> List[Student]:
+        """Получить limit студентов с наибольшим GPA (O(limit) по рейтингу)"""
+        students = (self.students.get(student_id) for _, _, student_id in self._gpa_ranking[:limit])
+        return [student for student in students if student is not None]
+    
+    @synchronized
     def add(self, student: Student) -> Student:
-        """Добавить нового студента"""
+        """Добавить нового студента (DuplicateKeyError, если email занят)"""
+        self._check_email_free(student.email, student.student_id)
+        previous = self.students.get(student.student_id)
+        if previous is not None:
+            self._by_email.pop(normalize_key(previous.email), None)
+        else:
+            self._ids.add(student.student_id)
         self.students[student.student_id] = student
-        self._save_to_file()
+        self._by_email[normalize_key(student.email)] = student.student_id
+        self._rank(student)
+        self._record_change(student.student_id, student)
         return student
     
+    @synchronized
+    def add_many(self, students: List[Student]) -> List[Student]:
+        """Добавить пачку студентов одной записью в хранилище.
+        
+        Уникальность email проверяется для всей пачки до изменений:
+        при DuplicateKeyError не добавляется ни один студент.
+        """
+        batch_emails: Dict[str, str] = {}
+        for student in students:
+            self._check_email_free(student.email, student.student_id)
+            owner = batch_emails.setdefault(normalize_key(student.email), student.student_id)
+            if owner != student.student_id:
+                raise DuplicateKeyError('email', student.email)
+        
+        new_ids = []
+        for student in students:
+            previous = self.students.get(student.student_id)
+            if previous is not None:
+                self._by_email.pop(normalize_key(previous.email), None)
+                self._unrank(student.student_id)
+            else:
+                new_ids.append(student.student_id)
+            self.students[student.student_id] = student
+            self._by_email[normalize_key(student.email)] = student.student_id
+            # Ключи рейтинга дописываются в конец и сортируются один раз
+            key = (-(student.gpa or 0), self._next_rank_seq, student.student_id)
+            self._next_rank_seq += 1
+            self._gpa_ranking.append(key)
+            self._ranking_keys[student.student_id] = key
+        self._gpa_ranking.sort()
+        self._ids.update(new_ids)
+        self._record_changes(students)
+        return students
+    
+    @synchronized
     def update(self, student_id: str, **kwargs) -> Optional[Student]:
-        """Обновить данные студента"""
+        """Обновить данные студента (DuplicateKeyError, если email занят)"""
         student = self.students.get(student_id)
         if student:
+            new_email = kwargs.get('email')
+            if new_email is not None:
+                self._check_email_free(new_email, student_id)
+                self._by_email.pop(normalize_key(student.email), None)
+                self._by_email[normalize_key(new_email)] = student_id
             for key, value in kwargs.items():
                 if value is not None and hasattr(student, key):
                     setattr(student, key, value)
-            self._save_to_file()
+            if kwargs.get('gpa') is not None:
+                self._rank(student)
+            self._record_change(student_id, student)
         return student
     
+    def update_gpas(self, gpas: Dict[str, Optional[float]]) -> int:
+        """Обновить GPA нескольких студентов одной записью, вернуть число изменений.
+        
+        Если ни один GPA не изменился, счетчик изменений и хранилище не
+        трогаются: кэши отчетов и ETag остаются действительными.
+        """
+        with self._lock, self.storage.lock:
+            self.refresh()
+            changes = []
+            for student_id, gpa in gpas.items():
+                if gpa is not None:
+                    gpa = min(max(gpa, 0.0), 5.0)
+                student = self.students.get(student_id)
+                if student is not None and student.gpa != gpa:
+                    changes.append((student, gpa))
+            if not changes:
+                return 0
+            return self._apply_gpas(changes)
+    
+    @bumps_generation
+    def _apply_gpas(self, changes: List[Tuple[Student, Optional[float]]]) -> int:
+        """Записать изменившиеся GPA (вызывается под блокировками update_gpas)"""
+        for student, gpa in changes:
+            if gpa is None:
+                student.gpa = None
+            else:
+                student.update_gpa(gpa)
+            self._rank(student)
+        self._record_changes([student for student, _ in changes])
+        return len(changes)
+    
+    @synchronized
     def delete(self, student_id: str) -> bool:
         """Удалить студента"""
-        if student_id in self.students:
-            del self.students[student_id]
-            self._save_to_file()
+        student = self.students.pop(student_id, None)
+        if student is not None:
+            self._by_email.pop(normalize_key(student.email), None)
+            self._ids.remove(student_id)
+            self._unrank(student_id)
+            self._record_change(student_id, None)
             return True
         return False
 
 
 class CourseRepository:
-    def __init__(self, file_path: str = "courses.json"):
+    def __init__(self, file_path: str = "courses.json", storage=None):
         self.file_path = file_path
+        self.storage = storage or create_storage(file_path, 'course_id')
+        # Мутации из разных потоков идут по очереди. Чтения не блокируются:
+        # они обходят копии словарей (list(d), sorted(d) атомарны под GIL)
+        # и пропускают записи, удаленные между чтением индекса и словаря
+        self._lock = threading.RLock()
         self.courses: Dict[str, Course] = {}
+        # Счетчик изменений: растет при каждой мутации и перечитывании файла
+        self.generation = 0
+        
+        # Отсортированные ID для keyset-пагинации
+        self._ids = SortedIndex()
+        
+        # Уникальный индекс: нормализованный код курса -> course_id
+        self._by_code: Dict[str, str] = {}
         self._load_from_file()
     
     def _load_from_file(self):
         """Загрузить курсы из файла"""
-        if os.path.exists(self.file_path):
-            try:
-                with open(self.file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    for course_data in data:
-                        course = Course(
-                            code=course_data['code'],
-                            name=course_data['name'],
-                            credits=course_data['credits'],
-                            course_id=course_data['course_id']
-                        )
-                        self.courses[course.course_id] = course
-            except Exception as e:
-                print(f"Ошибка загрузки курсов: {e}")
-                self.courses = {}
-    
-    def _save_to_file(self):
-        """Сохранить курсы в файл"""
+        self.courses = {}
         try:
-            data = []
-            for course in self.courses.values():
-                data.append({
-                    'course_id': course.course_id,
-                    'code': course.code,
-                    'name': course.name,
-                    'credits': course.credits
-                })
-            
-            with open(self.file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            for course_data in self.storage.load():
+                course = Course(
+                    code=course_data['code'],
+                    name=course_data['name'],
+                    credits=course_data['credits'],
+                    course_id=course_data['course_id']
+                )
+                self.courses[course.course_id] = course
+        except Exception as e:
+            raise PersistenceError(f"Ошибка загрузки курсов: {e}") from e
+        self._ids = SortedIndex(self.courses)
+        self._rebuild_code_index()
+    
+    def refresh(self) -> bool:
+        """Перечитать курсы, если их изменил другой процесс"""
+        if not self.storage.is_stale():
+            return False
+        with self._lock, self.storage.lock:
+            if not self.storage.is_stale():
+                return False
+            self._load_from_file()
+            self.generation += 1
+            return True
+    
+    def _rebuild_code_index(self):
+        """Перестроить индекс кодов курсов по основному словарю"""
+        self._by_code = {}
+        for course in self.courses.values():
+            key = normalize_key(course.code)
+            if key in self._by_code:
+                DUPLICATE_KEYS.inc(collection="courses")
+                logger.warning("Дублирующийся код в данных курсов: %s", course.code)
+                continue
+            self._by_code[key] = course.course_id
+    
+    def _to_record(self, course: Course) -> Dict[str, Any]:
+        """Преобразовать курс в запись для хранилища"""
+        return {
+            'course_id': course.course_id,
+            'code': course.code,
+            'name': course.name,
+            'credits': course.credits
+        }
+    
+    def _snapshot(self) -> List[Dict[str, Any]]:
+        return [self._to_record(course) for course in self.courses.values()]
+    
+    def _record_change(self, course_id: str, course: Optional[Course]):
+        """Сохранить изменение одного курса (None - удаление)"""
+        try:
+            record = self._to_record(course) if course else None
+            self.storage.record_change(course_id, record, self._snapshot)
+        except Exception as e:
+            self.storage.invalidate()
+            raise PersistenceError(f"Ошибка сохранения курсов: {e}") from e
+    
+    def _record_changes(self, courses: List[Course]):
+        """Сохранить изменения нескольких курсов одной записью"""
+        try:
+            changes = [(course.course_id, self._to_record(course)) for course in courses]
+            self.storage.record_changes(changes, self._snapshot)
         except Exception as e:
-            print(f"Ошибка сохранения курсов: {e}")
+            self.storage.invalidate()
+            raise PersistenceError(f"Ошибка сохранения курсов: {e}") from e
     
     def get_all(self) -> List[Course]:
         """Получить все курсы"""
@@ -152,88 +435,379 @@ class CourseRepository:
         """Получить курс по ID"""
         return self.courses.get(course_id)
     
+    @QUERY_SECONDS.timed(collection="courses", method="get_many")
+    def get_many(self, course_ids: Iterable[str]) -> List[Course]:
+        """Получить курсы по списку ID (в порядке списка, без повторов и ненайденных)"""
+        courses = (self.courses.get(course_id) for course_id in dict.fromkeys(course_ids))
+        return [course for course in courses if course is not None]
+    
     def get_by_code(self, code: str) -> Optional[Course]:
-        """Получить курс по коду"""
-        for course in self.courses.values():
-            if course.code == code:
-                return course
-        return None
+        """Получить курс по коду (без учета регистра)"""
+        course_id = self._by_code.get(normalize_key(code))
+        return self.courses.get(course_id) if course_id else None
     
+    def count(self) -> int:
+        """Количество курсов"""
+        return len(self.courses)
+    
+    def list_page(self, limit: int, after: Optional[str] = None) -> List[Course]:
+        """Страница курсов, упорядоченных по ID, начиная после курсора after"""
+        courses = (self.courses.get(course_id) for course_id in self._ids.iter_after(after))
+        return list(islice((course for course in courses if course is not None), limit))
+    
+    @synchronized
     def add(self, course: Course) -> Course:
-        """Добавить новый курс"""
+        """Добавить новый курс (DuplicateKeyError, если код занят)"""
+        key = normalize_key(course.code)
+        owner = self._by_code.get(key)
+        if owner is not None and owner != course.course_id:
+            raise DuplicateKeyError('code', course.code)
+        previous = self.courses.get(course.course_id)
+        if previous is not None:
+            self._by_code.pop(normalize_key(previous.code), None)
+        else:
+            self._ids.add(course.course_id)
         self.courses[course.course_id] = course
-        self._save_to_file()
+        self._by_code[key] = course.course_id
+        self._record_change(course.course_id, course)
         return course
     
+    @synchronized
+    def add_many(self, courses: List[Course]) -> List[Course]:
+        """Добавить пачку курсов одной записью в хранилище.
+        
+        Уникальность кодов проверяется для всей пачки до изменений:
+        при DuplicateKeyError не добавляется ни один курс.
+        """
+        batch_codes: Dict[str, str] = {}
+        for course in courses:
+            key = normalize_key(course.code)
+            owner = self._by_code.get(key)
+            if owner is not None and owner != course.course_id:
+                raise DuplicateKeyError('code', course.code)
+            if batch_codes.setdefault(key, course.course_id) != course.course_id:
+                raise DuplicateKeyError('code', course.code)
+        
+        new_ids = []
+        for course in courses:
+            previous = self.courses.get(course.course_id)
+            if previous is not None:
+                self._by_code.pop(normalize_key(previous.code), None)
+            else:
+                new_ids.append(course.course_id)
+            self.courses[course.course_id] = course
+            self._by_code[normalize_key(course.code)] = course.course_id
+        self._ids.update(new_ids)
+        self._record_changes(courses)
+        return courses
+    
+    @synchronized
     def delete(self, course_id: str) -> bool:
         """Удалить курс"""
-        if course_id in self.courses:
-            del self.courses[course_id]
-            self._save_to_file()
+        course = self.courses.pop(course_id, None)
+        if course is not None:
+            self._by_code.pop(normalize_key(course.code), None)
+            self._ids.remove(course_id)
+            self._record_change(course_id, None)
             return True
         return False
 
 
 
-student_repo = StudentRepository()
-course_repo = CourseRepository()
+
+class GradeEvent(NamedTuple):
+    """Изменение оценки для подписчиков репозитория"""
+    kind: str                   # 'added' | 'updated' | 'deleted'
+    grade: Grade
+    old_score: Optional[float] = None
+
+
+GradeListener = Callable[[List[GradeEvent]], None]
+
+
+def _in_range(value: Any, low: Optional[Any], high: Optional[Any]) -> bool:
+    return (low is None or value >= low) and (high is None or value <= high)
+
+
+def _grade_matches(grade: Grade, student_id: Optional[str], course_id: Optional[str],
+                   min_score: Optional[float], max_score: Optional[float],
+                   date_from: Optional[datetime], date_to: Optional[datetime]) -> bool:
+    """Подходит ли оценка под все фильтры"""
+    return (
+        (not student_id or grade.student_id == student_id)
+        and (not course_id or grade.course_id == course_id)
+        and _in_range(grade.score, min_score, max_score)
+        and _in_range(grade.date, date_from, date_to)
+    )
+
+
+def _has_ranges(filters: Tuple) -> bool:
+    """Есть ли среди фильтров (student_id, course_id, min_score, max_score,
+    date_from, date_to) диапазон по баллу или дате"""
+    return any(value is not None for value in filters[2:])
+
+
+def _filter_grades(grades: List[Grade], filters: Tuple) -> List[Grade]:
+    """Отобрать оценки под фильтры: по одному проходу на каждый заданный фильтр"""
+    student_id, course_id, min_score, max_score, date_from, date_to = filters
+    if student_id:
+        grades = [grade for grade in grades if grade.student_id == student_id]
+    if course_id:
+        grades = [grade for grade in grades if grade.course_id == course_id]
+    if min_score is not None:
+        grades = [grade for grade in grades if grade.score >= min_score]
+    if max_score is not None:
+        grades = [grade for grade in grades if grade.score <= max_score]
+    if date_from is not None:
+        grades = [grade for grade in grades if grade.date >= date_from]
+    if date_to is not None:
+        grades = [grade for grade in grades if grade.date <= date_to]
+    return grades
+
+
+# Порядок результатов find: по дате выставления, при равных датах - по ID
+_GRADE_ORDER = attrgetter('date', 'grade_id')
+
+
+# Оценка из среза индекса обходится дороже, чем проверка при переборе
+# (поиск по ID в словаре, сортировка результата), поэтому индекс по баллу
+# или дате используется, только если срез меньше этой доли перебора
+_RANGE_INDEX_MAX_SHARE = 0.1
+
+
+def _range_beats_scan(range_size: int, scanned: int) -> bool:
+    """Выгоднее ли взять оценки из среза индекса, чем перебрать scanned оценок"""
+    return range_size < scanned * _RANGE_INDEX_MAX_SHARE
+
+
+def _range_page_beats_scan(range_size: int, limit: int, total: int) -> bool:
+    """Страница из среза: проверить все k оценок среза дешевле, чем идти
+    по оценкам в порядке ID, пока не наберется limit подходящих
+    (в среднем limit * total / k оценок)"""
+    return range_size * range_size < limit * total
+
+
+def _diff_events(previous: Dict[str, Grade], current: Dict[str, Grade]) -> List[GradeEvent]:
+    """События, переводящие оценки previous в current"""
+    events = [GradeEvent('deleted', grade) for grade_id, grade in previous.items() if grade_id not in current]
+    for grade_id, grade in current.items():
+        old = previous.get(grade_id)
+        if old is None:
+            events.append(GradeEvent('added', grade))
+        elif (old.student_id, old.course_id) != (grade.student_id, grade.course_id):
+            events.extend((GradeEvent('deleted', old), GradeEvent('added', grade)))
+        elif old.score != grade.score:
+            events.append(GradeEvent('updated', grade, old.score))
+    return events
+
+
 class GradeRepository:
-    def __init__(self, file_path: str = "grades.json"):
+    def __init__(self, file_path: str = "grades.json", storage=None):
         self.file_path = file_path
+        self.storage = storage or create_storage(file_path, 'grade_id')
+        # Мутации из разных потоков идут по очереди. Чтения не блокируются:
+        # они обходят копии словарей (list(d), sorted(d) атомарны под GIL)
+        # и пропускают записи, удаленные между чтением индекса и словаря
+        self._lock = threading.RLock()
         self.grades: Dict[str, Grade] = {}
+        
+        # Отсортированные ID для keyset-пагинации
+        self._ids = SortedIndex()
+        
+        # Вторичные индексы: ключ -> {grade_id: Grade} (сохраняют порядок добавления)
+        self._by_student: Dict[str, Dict[str, Grade]] = {}
+        self._by_course: Dict[str, Dict[str, Grade]] = {}
+        self._by_student_course: Dict[Tuple[str, str], Dict[str, Grade]] = {}
+        
+        # Диапазонные индексы: отсортированные (балл, ID) и (дата, ID)
+        self._by_score = SortedIndex()
+        self._by_date = SortedIndex()
+        
+        # Счетчик изменений и подписчики на изменения оценок
+        self.generation = 0
+        self._listeners: List[GradeListener] = []
         self._load_from_file()
     
     def _load_from_file(self):
         """Загрузить оценки из файла"""
-        if os.path.exists(self.file_path):
-            try:
-                with open(self.file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    for grade_data in data:
-                        
-                        date_str = grade_data['date']
-                        if isinstance(date_str, str):
-                            try:
-                                date = datetime.fromisoformat(date_str)
-                            except (ValueError, AttributeError):
-                                date = datetime.now()
-                        else:
-                            date = datetime.now()
-                        
-                        grade = Grade(
-                            student_id=grade_data['student_id'],
-                            course_id=grade_data['course_id'],
-                            score=grade_data['score'],
-                            grade_id=grade_data['grade_id']
-                        )
-                        grade.date = date
-                        grade.letter_grade = grade_data.get('letter_grade', 'F')
-                        self.grades[grade.grade_id] = grade
-            except Exception as e:
-                print(f"Ошибка загрузки оценок: {e}")
-                self.grades = {}
-    
-    def _save_to_file(self):
-        """Сохранить оценки в файл"""
+        self.grades = {}
         try:
-            data = []
-            for grade in self.grades.values():
+            for grade_data in self.storage.load():
                 
-                date_str = grade.date.isoformat() if hasattr(grade.date, 'isoformat') else datetime.now().isoformat()
+                date_str = grade_data['date']
+                if isinstance(date_str, str):
+                    try:
+                        date = datetime.fromisoformat(date_str)
+                    except (ValueError, AttributeError):
+                        date = datetime.now()
+                else:
+                    date = datetime.now()
                 
-                data.append({
-                    'grade_id': grade.grade_id,
-                    'student_id': grade.student_id,
-                    'course_id': grade.course_id,
-                    'score': grade.score,
-                    'letter_grade': grade.letter_grade,
-                    'date': date_str
-                })
-            
-            with open(self.file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+                grade = Grade(
+                    student_id=grade_data['student_id'],
+                    course_id=grade_data['course_id'],
+                    score=grade_data['score'],
+                    grade_id=grade_data['grade_id']
+                )
+                grade.date = date
+                grade.letter_grade = grade_data.get('letter_grade', 'F')
+                self.grades[grade.grade_id] = grade
+        except Exception as e:
+            raise PersistenceError(f"Ошибка загрузки оценок: {e}") from e
+        self._rebuild_indexes()
+    
+    def refresh(self) -> bool:
+        """Перечитать оценки, если их изменил другой процесс.
+        
+        Подписчики получают разницу со старым содержимым как обычные события.
+        """
+        if not self.storage.is_stale():
+            return False
+        with self._lock, self.storage.lock:
+            if not self.storage.is_stale():
+                return False
+            previous = self.grades
+            self._load_from_file()
+            self._notify(_diff_events(previous, self.grades))
+            return True
+    
+    def _index_grade(self, grade: Grade):
+        """Добавить оценку во вторичные индексы"""
+        self._by_student.setdefault(grade.student_id, {})[grade.grade_id] = grade
+        self._by_course.setdefault(grade.course_id, {})[grade.grade_id] = grade
+        key = (grade.student_id, grade.course_id)
+        self._by_student_course.setdefault(key, {})[grade.grade_id] = grade
+    
+    def _unindex_grade(self, grade: Grade):
+        """Удалить оценку из вторичных индексов"""
+        indexes: Tuple[Tuple[Dict[Any, Dict[str, Grade]], Any], ...] = (
+            (self._by_student, grade.student_id),
+            (self._by_course, grade.course_id),
+            (self._by_student_course, (grade.student_id, grade.course_id)),
+        )
+        for index, key in indexes:
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(grade.grade_id, None)
+                if not bucket:
+                    del index[key]
+    
+    def _index_range(self, grade: Grade):
+        """Добавить оценку в индексы по баллу и дате"""
+        self._by_score.add((grade.score, grade.grade_id))
+        self._by_date.add((grade.date, grade.grade_id))
+    
+    def _unindex_range(self, grade: Grade):
+        """Удалить оценку из индексов по баллу и дате"""
+        self._by_score.remove((grade.score, grade.grade_id))
+        self._by_date.remove((grade.date, grade.grade_id))
+    
+    def _rebuild_indexes(self):
+        """Перестроить вторичные индексы по основному словарю"""
+        self._ids = SortedIndex(self.grades)
+        self._by_score = SortedIndex((grade.score, grade.grade_id) for grade in self.grades.values())
+        self._by_date = SortedIndex((grade.date, grade.grade_id) for grade in self.grades.values())
+        self._by_student = {}
+        self._by_course = {}
+        self._by_student_course = {}
+        for grade in self.grades.values():
+            self._index_grade(grade)
+    
+    def add_listener(self, listener: GradeListener):
+        """Подписаться на изменения оценок (вызывается после каждой мутации)"""
+        self._listeners.append(listener)
+    
+    def _notify(self, events: List[GradeEvent]):
+        """Оповестить подписчиков об изменениях.
+        
+        Если подписчик упал, мутация не записывается, а данные в памяти
+        помечаются устаревшими: следующий refresh (перед запросом или перед
+        записью) вернет состояние хранилища и пришлет подписчикам разницу.
+        Счетчик изменений растет после подписчиков: кэш отчетов и ETag не
+        увидят новый счетчик вместе со старой статистикой.
+        """
+        try:
+            for listener in self._listeners:
+                listener(events)
+        except Exception:
+            self.storage.invalidate()
+            raise
+        finally:
+            self.generation += 1
+    
+    def check_indexes(self, rebuild: bool = True) -> bool:
+        """Проверить согласованность индексов с основным словарем.
+        
+        Возвращает True, если индексы были согласованы. При rebuild=True
+        рассогласованные индексы перестраиваются.
+        """
+        with self._lock:
+            return self._check_indexes(rebuild)
+    
+    def _check_indexes(self, rebuild: bool) -> bool:
+        expected: Dict[str, Dict[Any, set]] = {'student': {}, 'course': {}, 'student_course': {}}
+        for grade in self.grades.values():
+            expected['student'].setdefault(grade.student_id, set()).add(grade.grade_id)
+            expected['course'].setdefault(grade.course_id, set()).add(grade.grade_id)
+            key = (grade.student_id, grade.course_id)
+            expected['student_course'].setdefault(key, set()).add(grade.grade_id)
+        
+        actual: Dict[str, Dict[Any, Dict[str, Grade]]] = {
+            'student': self._by_student,
+            'course': self._by_course,
+            'student_course': self._by_student_course,
+        }
+        consistent = all(
+            {key: set(bucket) for key, bucket in actual[name].items()} == expected[name]
+            for name in expected
+        ) and list(self._ids) == sorted(self.grades) \
+            and list(self._by_score) == sorted((grade.score, grade.grade_id) for grade in self.grades.values()) \
+            and list(self._by_date) == sorted((grade.date, grade.grade_id) for grade in self.grades.values())
+        if not consistent and rebuild:
+            self._rebuild_indexes()
+        return consistent
+    
+    def _to_record(self, grade: Grade) -> Dict[str, Any]:
+        """Преобразовать оценку в запись для хранилища"""
+        date_str = grade.date.isoformat() if hasattr(grade.date, 'isoformat') else datetime.now().isoformat()
+        
+        return {
+            'grade_id': grade.grade_id,
+            'student_id': grade.student_id,
+            'course_id': grade.course_id,
+            'score': grade.score,
+            'letter_grade': grade.letter_grade,
+            'date': date_str
+        }
+    
+    def _snapshot(self) -> List[Dict[str, Any]]:
+        return [self._to_record(grade) for grade in self.grades.values()]
+    
+    def _record_change(self, grade_id: str, grade: Optional[Grade]):
+        """Сохранить изменение одной оценки (None - удаление)"""
+        try:
+            record = self._to_record(grade) if grade else None
+            self.storage.record_change(grade_id, record, self._snapshot)
+        except Exception as e:
+            self.storage.invalidate()
+            raise PersistenceError(f"Ошибка сохранения оценок: {e}") from e
+    
+    def _record_changes(self, grades: List[Grade]):
+        """Сохранить изменения нескольких оценок одной записью"""
+        try:
+            changes = [(grade.grade_id, self._to_record(grade)) for grade in grades]
+            self.storage.record_changes(changes, self._snapshot)
+        except Exception as e:
+            self.storage.invalidate()
+            raise PersistenceError(f"Ошибка сохранения оценок: {e}") from e
+    
+    def _record_deletions(self, grade_ids: List[str]):
+        """Сохранить удаление нескольких оценок одной записью"""
+        try:
+            self.storage.record_changes([(grade_id, None) for grade_id in grade_ids], self._snapshot)
         except Exception as e:
-            print(f"Ошибка сохранения оценок: {e}")
+            self.storage.invalidate()
+            raise PersistenceError(f"Ошибка сохранения оценок: {e}") from e
     
     def get_all(self) -> List[Grade]:
         """Получить все оценки"""
@@ -245,52 +819,223 @@ class GradeRepository:
     
     def get_by_student(self, student_id: str) -> List[Grade]:
         """Получить оценки студента"""
-        return [grade for grade in self.grades.values() if grade.student_id == student_id]
+        return list(self._by_student.get(student_id, {}).values())
     
     def get_by_course(self, course_id: str) -> List[Grade]:
         """Получить оценки по курсу"""
-        return [grade for grade in self.grades.values() if grade.course_id == course_id]
+        return list(self._by_course.get(course_id, {}).values())
     
     def get_by_student_and_course(self, student_id: str, course_id: str) -> List[Grade]:
         """Получить оценки студента по курсу"""
-        return [grade for grade in self.grades.values() 
-                if grade.student_id == student_id and grade.course_id == course_id]
+        return list(self._by_student_course.get((student_id, course_id), {}).values())
+    
+    @QUERY_SECONDS.timed(collection="grades", method="find")
+    def find(self, student_id: Optional[str] = None, course_id: Optional[str] = None,
+             min_score: Optional[float] = None, max_score: Optional[float] = None,
+             date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> List[Grade]:
+        """Получить оценки с фильтрами по студенту, курсу, баллу и дате (через индексы).
+        
+        Оценки всегда идут в порядке (дата, ID), какой бы индекс ни дал
+        кандидатов: один и тот же запрос не меняет порядок при изменении данных.
+        """
+        filters = (student_id, course_id, min_score, max_score, date_from, date_to)
+        source, size = self._narrowest_range(filters)
+        bucket = self._candidates(student_id, course_id)
+        if source is not None and _range_beats_scan(size, len(self.grades if bucket is None else bucket)):
+            grades = self._matching(self._range_ids(source, filters), filters)
+            if source != 'date':
+                grades.sort(key=_GRADE_ORDER)
+            return grades
+        if bucket is None:
+            # Индекс по дате уже упорядочен по (дата, ID)
+            grades = [self.grades[grade_id] for _, grade_id in self._by_date]
+        else:
+            grades = sorted(bucket.values(), key=_GRADE_ORDER)
+        return _filter_grades(grades, filters) if _has_ranges(filters) else grades
+    
+    def _candidates(self, student_id: Optional[str], course_id: Optional[str]) -> Optional[Dict[str, Grade]]:
+        """Корзина индекса для фильтра по студенту/курсу (None - без фильтра)"""
+        if student_id and course_id:
+            return self._by_student_course.get((student_id, course_id), {})
+        if student_id:
+            return self._by_student.get(student_id, {})
+        if course_id:
+            return self._by_course.get(course_id, {})
+        return None
+    
+    def _narrowest_range(self, filters: Tuple) -> Tuple[Optional[str], int]:
+        """Самый узкий из срезов индексов по баллу ('score') и дате ('date') и
+        его размер - O(log N) без копирования; (None, 0) - диапазонов нет"""
+        _, _, min_score, max_score, date_from, date_to = filters
+        options = []
+        if min_score is not None or max_score is not None:
+            options.append((self._by_score.range_size(min_score, max_score), 'score'))
+        if date_from is not None or date_to is not None:
+            options.append((self._by_date.range_size(date_from, date_to), 'date'))
+        if not options:
+            return None, 0
+        size, source = min(options)
+        return source, size
+    
+    def _range_ids(self, source: str, filters: Tuple) -> List[str]:
+        """ID оценок из среза индекса по баллу или дате"""
+        _, _, min_score, max_score, date_from, date_to = filters
+        if source == 'score':
+            return [grade_id for _, grade_id in self._by_score.range(min_score, max_score)]
+        return [grade_id for _, grade_id in self._by_date.range(date_from, date_to)]
+    
+    def _matching(self, grade_ids: Iterable[str], filters: Tuple) -> List[Grade]:
+        """Оценки из кандидатов, подходящие под все фильтры (пересечение индексов)"""
+        grades = [grade for grade in map(self.grades.get, grade_ids) if grade is not None]
+        return _filter_grades(grades, filters)
+    
+    @QUERY_SECONDS.timed(collection="grades", method="count")
+    def count(self, student_id: Optional[str] = None, course_id: Optional[str] = None,
+              min_score: Optional[float] = None, max_score: Optional[float] = None,
+              date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> int:
+        """Количество оценок, подходящих под фильтры"""
+        filters = (student_id, course_id, min_score, max_score, date_from, date_to)
+        source, size = self._narrowest_range(filters)
+        if source is not None and not student_id and not course_id:
+            other_range = (date_from, date_to) if source == 'score' else (min_score, max_score)
+            if other_range == (None, None):
+                # Единственный фильтр - этот диапазон: ответ дает размер среза
+                return size
+        bucket = self._candidates(student_id, course_id)
+        grades = self.grades if bucket is None else bucket
+        if source is not None and _range_beats_scan(size, len(grades)):
+            return len(self._matching(self._range_ids(source, filters), filters))
+        if not _has_ranges(filters):
+            return len(grades)
+        return len(_filter_grades(list(grades.values()), filters))
     
+    @QUERY_SECONDS.timed(collection="grades", method="list_page")
+    def list_page(self, limit: int, after: Optional[str] = None,
+                  student_id: Optional[str] = None, course_id: Optional[str] = None,
+                  min_score: Optional[float] = None, max_score: Optional[float] = None,
+                  date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> List[Grade]:
+        """Страница оценок, упорядоченных по ID, начиная после курсора after"""
+        filters = (student_id, course_id, min_score, max_score, date_from, date_to)
+        source, size = self._narrowest_range(filters)
+        bucket = self._candidates(student_id, course_id)
+        if source is not None and (size < len(bucket) if bucket is not None
+                                   else _range_page_beats_scan(size, limit, len(self.grades))):
+            grade_ids = self._range_ids(source, filters)
+        elif bucket is not None:
+            grade_ids = list(bucket)
+        else:
+            candidates: Iterable[Optional[Grade]] = (self.grades.get(grade_id) for grade_id in self._ids.iter_after(after))
+            return list(islice((grade for grade in candidates
+                                if grade is not None and _grade_matches(grade, *filters)), limit))
+        grade_ids.sort()
+        if after is not None:
+            grade_ids = grade_ids[bisect.bisect_right(grade_ids, after):]
+        candidates = (self.grades.get(grade_id) for grade_id in grade_ids)
+        return list(islice((grade for grade in candidates
+                            if grade is not None and _grade_matches(grade, *filters)), limit))
+    
+    @synchronized
     def add(self, grade: Grade) -> Grade:
         """Добавить новую оценку"""
+        events = []
+        previous = self.grades.get(grade.grade_id)
+        if previous is not None:
+            self._unindex_grade(previous)
+            self._unindex_range(previous)
+            events.append(GradeEvent('deleted', previous))
+        else:
+            self._ids.add(grade.grade_id)
         self.grades[grade.grade_id] = grade
-        self._save_to_file()
+        self._index_grade(grade)
+        self._index_range(grade)
+        events.append(GradeEvent('added', grade))
+        # Подписчики оповещаются до записи: если не удастся она или один из
+        # подписчиков, хранилище помечается устаревшим, и повторная загрузка
+        # пришлет им разницу относительно уже учтенного состояния
+        self._notify(events)
+        self._record_change(grade.grade_id, grade)
         return grade
     
+    @synchronized
+    def add_many(self, grades: List[Grade]) -> List[Grade]:
+        """Добавить пачку оценок: одна запись в хранилище и одно оповещение"""
+        events = []
+        new_ids = []
+        for grade in grades:
+            previous = self.grades.get(grade.grade_id)
+            if previous is not None:
+                self._unindex_grade(previous)
+                self._unindex_range(previous)
+                events.append(GradeEvent('deleted', previous))
+            else:
+                new_ids.append(grade.grade_id)
+            self.grades[grade.grade_id] = grade
+            self._index_grade(grade)
+            events.append(GradeEvent('added', grade))
+        self._ids.update(new_ids)
+        added = {grade.grade_id: grade for grade in grades}.values()
+        self._by_score.update((grade.score, grade.grade_id) for grade in added)
+        self._by_date.update((grade.date, grade.grade_id) for grade in added)
+        if events:
+            self._notify(events)
+        self._record_changes(grades)
+        return grades
+    
+    @synchronized
     def update(self, grade_id: str, score: float) -> Optional[Grade]:
         """Обновить оценку"""
         grade = self.grades.get(grade_id)
         if grade:
+            old_score = grade.score
+            self._by_score.remove((old_score, grade_id))
             grade.score = score
+            self._by_score.add((score, grade_id))
             
             # Обновляем буквенную оценку
-            if score >= 90:
-                grade.letter_grade = '5'
-            elif score >= 80:
-                grade.letter_grade = '4'
-            elif score >= 70:
-                grade.letter_grade = '3'
-            elif score >= 60:
-                grade.letter_grade = '2'
-            else:
-                grade.letter_grade = '1'
-                
-            self._save_to_file()
+            grade.letter_grade = letter_grade_for(score)
+            
+            self._notify([GradeEvent('updated', grade, old_score)])
+            self._record_change(grade_id, grade)
         return grade
     
+    @synchronized
     def delete(self, grade_id: str) -> bool:
         """Удалить оценку"""
-        if grade_id in self.grades:
-            del self.grades[grade_id]
-            self._save_to_file()
+        grade = self.grades.pop(grade_id, None)
+        if grade is not None:
+            self._ids.remove(grade_id)
+            self._unindex_grade(grade)
+            self._unindex_range(grade)
+            self._notify([GradeEvent('deleted', grade)])
+            self._record_change(grade_id, None)
             return True
         return False
     
+    @synchronized
+    def delete_many(self, grade_ids: Iterable[str]) -> int:
+        """Удалить пачку оценок: одна запись в хранилище и одно оповещение"""
+        deleted = [grade for grade in map(self.grades.pop, grade_ids, repeat(None)) if grade is not None]
+        if not deleted:
+            return 0
+        for grade in deleted:
+            self._unindex_grade(grade)
+        self._ids.remove_many(grade.grade_id for grade in deleted)
+        self._by_score.remove_many((grade.score, grade.grade_id) for grade in deleted)
+        self._by_date.remove_many((grade.date, grade.grade_id) for grade in deleted)
+        self._notify([GradeEvent('deleted', grade) for grade in deleted])
+        self._record_deletions([grade.grade_id for grade in deleted])
+        return len(deleted)
+    
+    @synchronized
+    def delete_by_student(self, student_id: str) -> int:
+        """Удалить все оценки студента (по индексу, O(k) для k оценок)"""
+        return self.delete_many(list(self._by_student.get(student_id, {})))
+    
+    @synchronized
+    def delete_by_course(self, course_id: str) -> int:
+        """Удалить все оценки по курсу (по индексу, O(k) для k оценок)"""
+        return self.delete_many(list(self._by_course.get(course_id, {})))
+    
     def calculate_student_gpa(self, student_id: str) -> Optional[float]:
         """Рассчитать GPA студента"""
         student_grades = self.get_by_student(student_id)
@@ -301,4 +1046,72 @@ class GradeRepository:
         total = sum(grade.score for grade in student_grades)
         return round(total / len(student_grades) / 20, 2) 
 
-grade_repo = GradeRepository()
+
+# Выбор реализации репозиториев (REPOSITORY_BACKEND). Импорт SQLite-версии
+# стоит в конце модуля: она использует GradeEvent и normalize_key отсюда.
+# Репозитории создаются при первом обращении (или фоновой загрузкой
+# из main.py), а не при импорте модуля.
+if config.REPOSITORY_BACKEND == "sqlite":
+    from infrastructure.sqlite_repositories import SqliteDatabase, SqliteStudentRepository, \
+        SqliteCourseRepository, SqliteGradeRepository
+
+    _database = Lazy("database", lambda: SqliteDatabase(config.SQLITE_PATH))
+    student_repo = Lazy("students", lambda: SqliteStudentRepository(_database.load()))
+    course_repo = Lazy("courses", lambda: SqliteCourseRepository(_database.load()))
+    grade_repo = Lazy("grades", lambda: SqliteGradeRepository(_database.load()))
+elif config.REPOSITORY_BACKEND == "json":
+    student_repo = Lazy("students", StudentRepository)
+    course_repo = Lazy("courses", CourseRepository)
+    grade_repo = Lazy("grades", GradeRepository)
+else:
+    raise ValueError(f"Неизвестная реализация репозиториев: {config.REPOSITORY_BACKEND}")
+
+
+def refresh_repositories():
+    """Подгрузить изменения других воркеров в уже загруженные репозитории"""
+    for repo in (student_repo, course_repo, grade_repo):
+        if repo.loaded:
+            repo.refresh()
+
+
+def flush_repositories():
+    """Дописать отложенные изменения загруженных репозиториев (при остановке воркера)"""
+    for repo in (student_repo, course_repo, grade_repo):
+        if repo.loaded and hasattr(repo, 'storage'):
+            repo.storage.flush()
+
+
+def data_generation() -> Tuple[int, int, int]:
+    """Счетчики изменений студентов, курсов и оценок: меняются при любой мутации"""
+    return student_repo.generation, course_repo.generation, grade_repo.generation
+
+
+def shared_data_generation() -> Tuple[int, int, int]:
+    """data_generation после подгрузки изменений других воркеров: ключ для
+    кэшей, которые должны устаревать и от чужих записей (JSON или SQLite)"""
+    refresh_repositories()
+    return data_generation()
+
+
+def storage_metrics() -> Dict[str, Any]:
+    """Метрики отложенной записи по репозиториям, где она включена"""
+    return {
+        repo.name: repo.storage.metrics()
+        for repo in (student_repo, course_repo, grade_repo)
+        if repo.loaded and hasattr(getattr(repo, 'storage', None), 'metrics')
+    }
+
+
+def _write_behind_values(key: str) -> Callable[[], Dict[Tuple[str, ...], Any]]:
+    return lambda: {(name,): metrics[key] for name, metrics in storage_metrics().items()}
+
+
+for _key, _name, _type, _documentation in (
+    ("pending_changes", "write_behind_pending_changes", "gauge", "Изменения в очереди отложенной записи"),
+    ("oldest_pending_seconds", "write_behind_oldest_pending_seconds", "gauge",
+     "Возраст самого старого несохраненного изменения"),
+    ("flushes", "write_behind_flushes_total", "counter", "Записи очереди во вложенное хранилище"),
+    ("flushed_changes", "write_behind_flushed_changes_total", "counter", "Изменения, записанные из очереди"),
+    ("errors", "write_behind_errors_total", "counter", "Ошибки фоновой записи очереди"),
+):
+    CallbackMetric(_name, _documentation, _type, _write_behind_values(_key), ("collection",))
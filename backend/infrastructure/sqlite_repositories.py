@@ -0,0 +1,636 @@
+"""
+Репозитории на SQLite с тем же интерфейсом, что и JSON-репозитории
+из infrastructure/repositories.py.
+
+- данные не загружаются в память целиком, запись - O(log N) по индексам;
+- WAL: читатели не блокируются писателем;
+- по одному соединению на поток в каждом процессе-воркере;
+- запись идет под блокировкой репозитория в транзакции BEGIN IMMEDIATE
+  и увеличивает номер поколения коллекции в таблице generations: по нему
+  воркер замечает изменения других воркеров (refresh) и пересчитывает
+  то, что держит в памяти (статистику оценок, счетчики для ETag и кэша);
+- все запросы - параметризованные константы, sqlite3 кэширует
+  подготовленные выражения на соединении (cached_statements).
+"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from domain.exceptions import DuplicateKeyError
+from domain.models import Course, Grade, Student, letter_grade_for
+from infrastructure.metrics import QUERY_SECONDS
+from infrastructure.repositories import GradeEvent, GradeListener, bumps_generation, normalize_key
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    student_id TEXT PRIMARY KEY,
+    name       TEXT NOT NULL,
+    email      TEXT NOT NULL,
+    email_key  TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL,
+    gpa        REAL
+);
+CREATE INDEX IF NOT EXISTS ix_students_gpa ON students (COALESCE(gpa, 0) DESC);
+
+CREATE TABLE IF NOT EXISTS courses (
+    course_id TEXT PRIMARY KEY,
+    code      TEXT NOT NULL,
+    code_key  TEXT NOT NULL UNIQUE,
+    name      TEXT NOT NULL,
+    credits   INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS grades (
+    grade_id     TEXT PRIMARY KEY,
+    student_id   TEXT NOT NULL,
+    course_id    TEXT NOT NULL,
+    score        REAL NOT NULL,
+    letter_grade TEXT NOT NULL,
+    date         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_grades_student ON grades (student_id);
+CREATE INDEX IF NOT EXISTS ix_grades_course ON grades (course_id);
+CREATE INDEX IF NOT EXISTS ix_grades_student_course ON grades (student_id, course_id);
+CREATE INDEX IF NOT EXISTS ix_grades_score ON grades (score);
+CREATE INDEX IF NOT EXISTS ix_grades_date ON grades (date);
+
+CREATE TABLE IF NOT EXISTS generations (
+    collection TEXT PRIMARY KEY,
+    value      INTEGER NOT NULL
+);
+"""
+
+_SELECT_GENERATION = "SELECT value FROM generations WHERE collection = ?"
+_BUMP_GENERATION = (
+    "INSERT INTO generations (collection, value) VALUES (?, 1) "
+    "ON CONFLICT(collection) DO UPDATE SET value = value + 1"
+)
+
+
+class SqliteDatabase:
+    """Файл базы и пул соединений: одно соединение на поток процесса"""
+
+    def __init__(self, path: str, cached_statements: int = 256):
+        self.path = path
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self.connection().executescript(SCHEMA)
+
+    def connection(self) -> sqlite3.Connection:
+        """Соединение текущего потока (после fork открывается заново)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, cached_statements=self.cached_statements)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+
+def _parse_datetime(value: Any) -> datetime:
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return datetime.now()
+
+
+def _unique_violation(error: sqlite3.IntegrityError, column: str) -> bool:
+    return "UNIQUE" in str(error) and column in str(error)
+
+
+class _SqliteCollection:
+    """Общая часть SQLite-репозиториев: сериализованная запись и номер поколения.
+
+    Запись выполняется под блокировкой репозитория (потоки процесса) в
+    транзакции BEGIN IMMEDIATE (другие процессы) и в той же транзакции
+    увеличивает номер поколения коллекции. Номер в базе, отличный от
+    последнего записанного или прочитанного этим процессом, значит, что
+    коллекцию изменил другой воркер.
+    """
+    collection = ""
+
+    def __init__(self, database: SqliteDatabase):
+        self.database = database
+        self.generation = 0
+        self._lock = threading.RLock()
+        self._seen = self._stored_generation(database.connection())
+
+    def _stored_generation(self, conn: sqlite3.Connection) -> int:
+        row = conn.execute(_SELECT_GENERATION, (self.collection,)).fetchone()
+        return row[0] if row else 0
+
+    def refresh(self) -> bool:
+        """Учесть изменения других процессов (одно чтение строки generations)"""
+        if self._stored_generation(self.database.connection()) == self._seen:
+            return False
+        with self._lock:
+            stored = self._stored_generation(self.database.connection())
+            if stored == self._seen:
+                return False
+            self._seen = stored
+            self._reload()
+            self.generation += 1
+            return True
+
+    def _reload(self):
+        """Пересчитать данные в памяти после изменений другого процесса"""
+
+    @contextmanager
+    def _transaction(self):
+        """Транзакция записи: чужие изменения учитываются до нее, поколение растет в ней"""
+        with self._lock:
+            conn = self.database.connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                stored = self._stored_generation(conn)
+                if stored != self._seen:
+                    # Пока транзакция открыта, база не изменится: пересчет видит итоговое состояние
+                    self._seen = stored
+                    self._reload()
+                    self.generation += 1
+                before = conn.total_changes
+                yield conn
+                # Запись без изменений (удаление несуществующего) не заставляет других пересчитывать данные
+                changed = conn.total_changes != before
+                if changed:
+                    conn.execute(_BUMP_GENERATION, (self.collection,))
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            if changed:
+                self._seen += 1
+
+
+class SqliteStudentRepository(_SqliteCollection):
+    collection = "students"
+    _COLUMNS = "student_id, name, email, created_at, gpa"
+    _SELECT_ALL = f"SELECT {_COLUMNS} FROM students ORDER BY rowid"
+    _SELECT_BY_ID = f"SELECT {_COLUMNS} FROM students WHERE student_id = ?"
+    _SELECT_BY_EMAIL = f"SELECT {_COLUMNS} FROM students WHERE email_key = ?"
+    # Список ID передается одним JSON параметром: текст запроса не зависит от их числа
+    _SELECT_MANY = f"SELECT {_COLUMNS} FROM students WHERE student_id IN (SELECT value FROM json_each(?))"
+    _SELECT_TOP = f"SELECT {_COLUMNS} FROM students ORDER BY COALESCE(gpa, 0) DESC, rowid LIMIT ?"
+    _SELECT_PAGE = f"SELECT {_COLUMNS} FROM students WHERE student_id > ? ORDER BY student_id LIMIT ?"
+    _COUNT = "SELECT COUNT(*) FROM students"
+    _UPSERT = (
+        "INSERT INTO students (student_id, name, email, email_key, created_at, gpa) "
+        "VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(student_id) DO UPDATE SET name = excluded.name, email = excluded.email, "
+        "email_key = excluded.email_key, created_at = excluded.created_at, gpa = excluded.gpa"
+    )
+    _SELECT_GPAS = "SELECT student_id, gpa FROM students WHERE student_id IN (SELECT value FROM json_each(?))"
+    _UPDATE_GPA = "UPDATE students SET gpa = ? WHERE student_id = ? AND gpa IS NOT ?"
+    _DELETE = "DELETE FROM students WHERE student_id = ?"
+
+    @staticmethod
+    def _from_row(row: Tuple) -> Student:
+        student = Student(name=row[1], email=row[2], student_id=row[0])
+        student.created_at = _parse_datetime(row[3])
+        student.gpa = row[4]
+        return student
+
+    @staticmethod
+    def _params(student: Student) -> Tuple:
+        return (student.student_id, student.name, student.email, normalize_key(student.email),
+                student.created_at.isoformat(), student.gpa)
+
+    def _write(self, student: Student):
+        try:
+            with self._transaction() as conn:
+                conn.execute(self._UPSERT, self._params(student))
+        except sqlite3.IntegrityError as e:
+            if _unique_violation(e, 'email_key'):
+                raise DuplicateKeyError('email', student.email)
+            raise
+
+    def _conflicting_email(self, students: List[Student]) -> str:
+        """Найти email пачки, занятый другим студентом (в базе или в самой пачке)"""
+        owners: Dict[str, str] = {}
+        for student in students:
+            key = normalize_key(student.email)
+            owner = self.get_by_email(student.email)
+            if owner is not None and owner.student_id != student.student_id:
+                return student.email
+            if owners.setdefault(key, student.student_id) != student.student_id:
+                return student.email
+        return ""
+
+    def get_all(self) -> List[Student]:
+        """Получить всех студентов"""
+        rows = self.database.connection().execute(self._SELECT_ALL)
+        return [self._from_row(row) for row in rows]
+
+    def get_by_id(self, student_id: str) -> Optional[Student]:
+        """Получить студента по ID"""
+        row = self.database.connection().execute(self._SELECT_BY_ID, (student_id,)).fetchone()
+        return self._from_row(row) if row else None
+
+    @QUERY_SECONDS.timed(collection="students", method="get_many")
+    def get_many(self, student_ids: Iterable[str]) -> List[Student]:
+        """Получить студентов по списку ID (в порядке списка, без повторов и ненайденных)"""
+        student_ids = list(dict.fromkeys(student_ids))
+        rows = self.database.connection().execute(self._SELECT_MANY, (json.dumps(student_ids),))
+        found = {row[0]: self._from_row(row) for row in rows}
+        return [found[student_id] for student_id in student_ids if student_id in found]
+
+    def get_by_email(self, email: str) -> Optional[Student]:
+        """Получить студента по email (без учета регистра)"""
+        row = self.database.connection().execute(self._SELECT_BY_EMAIL, (normalize_key(email),)).fetchone()
+        return self._from_row(row) if row else None
+
+    def count(self) -> int:
+        """Количество студентов"""
+        return self.database.connection().execute(self._COUNT).fetchone()[0]
+
+    def list_page(self, limit: int, after: Optional[str] = None) -> List[Student]:
+        """Страница студентов, упорядоченных по ID, начиная после курсора after"""
+        rows = self.database.connection().execute(self._SELECT_PAGE, (after or "", limit))
+        return [self._from_row(row) for row in rows]
+
+    def top_by_gpa(self, limit: int) -> List[Student]:
+        """Получить limit студентов с наибольшим GPA (по индексу ix_students_gpa)"""
+        rows = self.database.connection().execute(self._SELECT_TOP, (limit,))
+        return [self._from_row(row) for row in rows]
+
+    @bumps_generation
+    def add(self, student: Student) -> Student:
+        """Добавить нового студента (DuplicateKeyError, если email занят)"""
+        self._write(student)
+        return student
+
+    @bumps_generation
+    def add_many(self, students: List[Student]) -> List[Student]:
+        """Добавить пачку студентов одной транзакцией (DuplicateKeyError - откат всей пачки)"""
+        try:
+            with self._transaction() as conn:
+                conn.executemany(self._UPSERT, [self._params(student) for student in students])
+        except sqlite3.IntegrityError as e:
+            if _unique_violation(e, 'email_key'):
+                raise DuplicateKeyError('email', self._conflicting_email(students))
+            raise
+        return students
+
+    @bumps_generation
+    def update(self, student_id: str, **kwargs) -> Optional[Student]:
+        """Обновить данные студента (DuplicateKeyError, если email занят)"""
+        with self._lock:
+            student = self.get_by_id(student_id)
+            if student:
+                for key, value in kwargs.items():
+                    if value is not None and hasattr(student, key):
+                        setattr(student, key, value)
+                self._write(student)
+            return student
+
+    def update_gpas(self, gpas: Dict[str, Optional[float]]) -> int:
+        """Обновить GPA нескольких студентов одной транзакцией, вернуть число изменений.
+        Если ни один GPA не изменился, транзакция записи не открывается и
+        счетчик изменений не растет."""
+        params = []
+        for student_id, gpa in gpas.items():
+            if gpa is not None:
+                gpa = min(max(gpa, 0.0), 5.0)
+            params.append((gpa, student_id, gpa))
+        current = dict(self.database.connection().execute(self._SELECT_GPAS, (json.dumps(list(gpas)),)))
+        if all(student_id not in current or current[student_id] == gpa for gpa, student_id, _ in params):
+            return 0
+        return self._write_gpas(params)
+
+    @bumps_generation
+    def _write_gpas(self, params: List[Tuple]) -> int:
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(self._UPDATE_GPA, params)
+            return conn.total_changes - before
+
+    @bumps_generation
+    def delete(self, student_id: str) -> bool:
+        """Удалить студента"""
+        with self._transaction() as conn:
+            return conn.execute(self._DELETE, (student_id,)).rowcount > 0
+
+
+class SqliteCourseRepository(_SqliteCollection):
+    collection = "courses"
+    _COLUMNS = "course_id, code, name, credits"
+    _SELECT_ALL = f"SELECT {_COLUMNS} FROM courses ORDER BY rowid"
+    _SELECT_BY_ID = f"SELECT {_COLUMNS} FROM courses WHERE course_id = ?"
+    _SELECT_BY_CODE = f"SELECT {_COLUMNS} FROM courses WHERE code_key = ?"
+    _SELECT_MANY = f"SELECT {_COLUMNS} FROM courses WHERE course_id IN (SELECT value FROM json_each(?))"
+    _SELECT_PAGE = f"SELECT {_COLUMNS} FROM courses WHERE course_id > ? ORDER BY course_id LIMIT ?"
+    _COUNT = "SELECT COUNT(*) FROM courses"
+    _UPSERT = (
+        "INSERT INTO courses (course_id, code, code_key, name, credits) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(course_id) DO UPDATE SET code = excluded.code, code_key = excluded.code_key, "
+        "name = excluded.name, credits = excluded.credits"
+    )
+    _DELETE = "DELETE FROM courses WHERE course_id = ?"
+
+    @staticmethod
+    def _from_row(row: Tuple) -> Course:
+        return Course(code=row[1], name=row[2], credits=row[3], course_id=row[0])
+
+    def get_all(self) -> List[Course]:
+        """Получить все курсы"""
+        rows = self.database.connection().execute(self._SELECT_ALL)
+        return [self._from_row(row) for row in rows]
+
+    def get_by_id(self, course_id: str) -> Optional[Course]:
+        """Получить курс по ID"""
+        row = self.database.connection().execute(self._SELECT_BY_ID, (course_id,)).fetchone()
+        return self._from_row(row) if row else None
+
+    @QUERY_SECONDS.timed(collection="courses", method="get_many")
+    def get_many(self, course_ids: Iterable[str]) -> List[Course]:
+        """Получить курсы по списку ID (в порядке списка, без повторов и ненайденных)"""
+        course_ids = list(dict.fromkeys(course_ids))
+        rows = self.database.connection().execute(self._SELECT_MANY, (json.dumps(course_ids),))
+        found = {row[0]: self._from_row(row) for row in rows}
+        return [found[course_id] for course_id in course_ids if course_id in found]
+
+    def get_by_code(self, code: str) -> Optional[Course]:
+        """Получить курс по коду (без учета регистра)"""
+        row = self.database.connection().execute(self._SELECT_BY_CODE, (normalize_key(code),)).fetchone()
+        return self._from_row(row) if row else None
+
+    def count(self) -> int:
+        """Количество курсов"""
+        return self.database.connection().execute(self._COUNT).fetchone()[0]
+
+    def list_page(self, limit: int, after: Optional[str] = None) -> List[Course]:
+        """Страница курсов, упорядоченных по ID, начиная после курсора after"""
+        rows = self.database.connection().execute(self._SELECT_PAGE, (after or "", limit))
+        return [self._from_row(row) for row in rows]
+
+    @staticmethod
+    def _params(course: Course) -> Tuple:
+        return (course.course_id, course.code, normalize_key(course.code), course.name, course.credits)
+
+    @bumps_generation
+    def add(self, course: Course) -> Course:
+        """Добавить новый курс (DuplicateKeyError, если код занят)"""
+        try:
+            with self._transaction() as conn:
+                conn.execute(self._UPSERT, self._params(course))
+        except sqlite3.IntegrityError as e:
+            if _unique_violation(e, 'code_key'):
+                raise DuplicateKeyError('code', course.code)
+            raise
+        return course
+
+    @bumps_generation
+    def add_many(self, courses: List[Course]) -> List[Course]:
+        """Добавить пачку курсов одной транзакцией (DuplicateKeyError - откат всей пачки)"""
+        try:
+            with self._transaction() as conn:
+                conn.executemany(self._UPSERT, [self._params(course) for course in courses])
+        except sqlite3.IntegrityError as e:
+            if _unique_violation(e, 'code_key'):
+                codes: Dict[str, str] = {}
+                for course in courses:
+                    owner = self.get_by_code(course.code)
+                    if (owner is not None and owner.course_id != course.course_id) or \
+                            codes.setdefault(normalize_key(course.code), course.course_id) != course.course_id:
+                        raise DuplicateKeyError('code', course.code)
+                raise DuplicateKeyError('code', "")
+            raise
+        return courses
+
+    @bumps_generation
+    def delete(self, course_id: str) -> bool:
+        """Удалить курс"""
+        with self._transaction() as conn:
+            return conn.execute(self._DELETE, (course_id,)).rowcount > 0
+
+
+class SqliteGradeRepository(_SqliteCollection):
+    collection = "grades"
+    _COLUMNS = "grade_id, student_id, course_id, score, letter_grade, date"
+    _SELECT_ALL = f"SELECT {_COLUMNS} FROM grades ORDER BY rowid"
+    _SELECT_BY_ID = f"SELECT {_COLUMNS} FROM grades WHERE grade_id = ?"
+    _SELECT_BY_STUDENT = f"SELECT {_COLUMNS} FROM grades WHERE student_id = ? ORDER BY rowid"
+    _SELECT_BY_COURSE = f"SELECT {_COLUMNS} FROM grades WHERE course_id = ? ORDER BY rowid"
+    _SELECT_BY_STUDENT_COURSE = (
+        f"SELECT {_COLUMNS} FROM grades WHERE student_id = ? AND course_id = ? ORDER BY rowid"
+    )
+    _UPSERT = (
+        "INSERT INTO grades (grade_id, student_id, course_id, score, letter_grade, date) "
+        "VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(grade_id) DO UPDATE SET student_id = excluded.student_id, "
+        "course_id = excluded.course_id, score = excluded.score, "
+        "letter_grade = excluded.letter_grade, date = excluded.date"
+    )
+    _INSERT = (
+        "INSERT INTO grades (grade_id, student_id, course_id, score, letter_grade, date) "
+        "VALUES (?, ?, ?, ?, ?, ?)"
+    )
+    _UPDATE_SCORE = "UPDATE grades SET score = ?, letter_grade = ? WHERE grade_id = ?"
+    _DELETE = "DELETE FROM grades WHERE grade_id = ?"
+    _AVG_BY_STUDENT = "SELECT AVG(score) FROM grades WHERE student_id = ?"
+
+    def __init__(self, database: SqliteDatabase):
+        self._listeners: List[GradeListener] = []
+        self._reload_listeners: List[Callable[[], None]] = []
+        super().__init__(database)
+
+    def add_reload_listener(self, listener: Callable[[], None]):
+        """Подписаться на изменения оценок другими процессами (событий по ним нет)"""
+        self._reload_listeners.append(listener)
+
+    def _reload(self):
+        for listener in self._reload_listeners:
+            listener()
+
+    @staticmethod
+    def _from_row(row: Tuple) -> Grade:
+        grade = Grade(student_id=row[1], course_id=row[2], score=row[3], grade_id=row[0])
+        grade.letter_grade = row[4]
+        grade.date = _parse_datetime(row[5])
+        return grade
+
+    def _select(self, sql: str, params: Tuple = ()) -> List[Grade]:
+        return [self._from_row(row) for row in self.database.connection().execute(sql, params)]
+
+    def add_listener(self, listener: GradeListener):
+        """Подписаться на изменения оценок (вызывается после каждой мутации)"""
+        self._listeners.append(listener)
+
+    def _notify(self, events: List[GradeEvent]):
+        """Оповестить подписчиков об изменениях. Счетчик изменений растет
+        после подписчиков: кэш отчетов и ETag не увидят новый счетчик вместе
+        со старой статистикой."""
+        try:
+            for listener in self._listeners:
+                listener(events)
+        finally:
+            self.generation += 1
+
+    def check_indexes(self, rebuild: bool = True) -> bool:
+        """Проверить целостность базы и индексов (REINDEX при rebuild=True)"""
+        conn = self.database.connection()
+        consistent = conn.execute("PRAGMA quick_check").fetchone()[0] == "ok"
+        if not consistent and rebuild:
+            conn.execute("REINDEX grades")
+        return consistent
+
+    def get_all(self) -> List[Grade]:
+        """Получить все оценки"""
+        return self._select(self._SELECT_ALL)
+
+    def get_by_id(self, grade_id: str) -> Optional[Grade]:
+        """Получить оценку по ID"""
+        grades = self._select(self._SELECT_BY_ID, (grade_id,))
+        return grades[0] if grades else None
+
+    def get_by_student(self, student_id: str) -> List[Grade]:
+        """Получить оценки студента"""
+        return self._select(self._SELECT_BY_STUDENT, (student_id,))
+
+    def get_by_course(self, course_id: str) -> List[Grade]:
+        """Получить оценки по курсу"""
+        return self._select(self._SELECT_BY_COURSE, (course_id,))
+
+    def get_by_student_and_course(self, student_id: str, course_id: str) -> List[Grade]:
+        """Получить оценки студента по курсу"""
+        return self._select(self._SELECT_BY_STUDENT_COURSE, (student_id, course_id))
+
+    @QUERY_SECONDS.timed(collection="grades", method="find")
+    def find(self, student_id: Optional[str] = None, course_id: Optional[str] = None,
+             min_score: Optional[float] = None, max_score: Optional[float] = None,
+             date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> List[Grade]:
+        """Получить оценки с фильтрами по студенту, курсу, баллу и дате (через индексы).
+        Порядок - (дата, ID), как у файлового репозитория."""
+        conditions, params = self._filters(student_id, course_id, min_score, max_score, date_from, date_to)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f"SELECT {self._COLUMNS} FROM grades{where} ORDER BY date, grade_id"
+        return self._select(sql, tuple(params))
+
+    @staticmethod
+    def _filters(student_id: Optional[str], course_id: Optional[str],
+                 min_score: Optional[float], max_score: Optional[float],
+                 date_from: Optional[datetime] = None,
+                 date_to: Optional[datetime] = None) -> Tuple[List[str], List[Any]]:
+        """Условия WHERE и параметры для фильтров (набор условий фиксирован,
+        поэтому число разных текстов запросов в кэше выражений ограничено).
+        Даты хранятся в ISO формате, поэтому сравниваются как строки."""
+        conditions, params = [], []
+        for condition, value in (("student_id = ?", student_id), ("course_id = ?", course_id),
+                                 ("score >= ?", min_score), ("score <= ?", max_score),
+                                 ("date >= ?", date_from and date_from.isoformat()),
+                                 ("date <= ?", date_to and date_to.isoformat())):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        return conditions, params
+
+    @QUERY_SECONDS.timed(collection="grades", method="count")
+    def count(self, student_id: Optional[str] = None, course_id: Optional[str] = None,
+              min_score: Optional[float] = None, max_score: Optional[float] = None,
+              date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> int:
+        """Количество оценок, подходящих под фильтры"""
+        conditions, params = self._filters(student_id, course_id, min_score, max_score, date_from, date_to)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self.database.connection().execute(f"SELECT COUNT(*) FROM grades{where}", params).fetchone()[0]
+
+    @QUERY_SECONDS.timed(collection="grades", method="list_page")
+    def list_page(self, limit: int, after: Optional[str] = None,
+                  student_id: Optional[str] = None, course_id: Optional[str] = None,
+                  min_score: Optional[float] = None, max_score: Optional[float] = None,
+                  date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> List[Grade]:
+        """Страница оценок, упорядоченных по ID, начиная после курсора after"""
+        conditions, params = self._filters(student_id, course_id, min_score, max_score, date_from, date_to)
+        conditions.insert(0, "grade_id > ?")
+        params.insert(0, after or "")
+        sql = f"SELECT {self._COLUMNS} FROM grades WHERE {' AND '.join(conditions)} ORDER BY grade_id LIMIT ?"
+        return self._select(sql, tuple(params) + (limit,))
+
+    @staticmethod
+    def _params(grade: Grade) -> Tuple:
+        return (grade.grade_id, grade.student_id, grade.course_id, grade.score,
+                grade.letter_grade, grade.date.isoformat())
+
+    def add(self, grade: Grade) -> Grade:
+        """Добавить новую оценку"""
+        # Чтение, запись и оповещение - одна сериализованная секция: два
+        # параллельных вызова не пошлют подписчикам событие об одной оценке дважды
+        with self._lock:
+            with self._transaction() as conn:
+                events = []
+                previous = self.get_by_id(grade.grade_id)
+                if previous is not None:
+                    events.append(GradeEvent('deleted', previous))
+                conn.execute(self._UPSERT, self._params(grade))
+                events.append(GradeEvent('added', grade))
+            self._notify(events)
+            return grade
+
+    def add_many(self, grades: List[Grade]) -> List[Grade]:
+        """Добавить пачку новых оценок одной транзакцией и одним оповещением.
+
+        В отличие от add, существующий grade_id не заменяется: IntegrityError
+        откатывает всю пачку.
+        """
+        with self._lock:
+            with self._transaction() as conn:
+                conn.executemany(self._INSERT, [self._params(grade) for grade in grades])
+            if grades:
+                self._notify([GradeEvent('added', grade) for grade in grades])
+            return grades
+
+    def update(self, grade_id: str, score: float) -> Optional[Grade]:
+        """Обновить оценку"""
+        with self._lock:
+            with self._transaction() as conn:
+                grade = self.get_by_id(grade_id)
+                if grade is None:
+                    return None
+                old_score = grade.score
+                grade.score = score
+                grade.letter_grade = letter_grade_for(score)
+                conn.execute(self._UPDATE_SCORE, (score, grade.letter_grade, grade_id))
+            self._notify([GradeEvent('updated', grade, old_score)])
+            return grade
+
+    def delete(self, grade_id: str) -> bool:
+        """Удалить оценку"""
+        return self.delete_many([grade_id]) > 0
+
+    def delete_many(self, grade_ids: List[str]) -> int:
+        """Удалить пачку оценок одной транзакцией и одним оповещением"""
+        return self._delete_grades(lambda: [grade for grade in map(self.get_by_id, dict.fromkeys(grade_ids))
+                                            if grade is not None])
+
+    def delete_by_student(self, student_id: str) -> int:
+        """Удалить все оценки студента"""
+        return self._delete_grades(lambda: self.get_by_student(student_id))
+
+    def delete_by_course(self, course_id: str) -> int:
+        """Удалить все оценки по курсу"""
+        return self._delete_grades(lambda: self.get_by_course(course_id))
+
+    def _delete_grades(self, select: Callable[[], List[Grade]]) -> int:
+        """Удалить оценки, выбранные select внутри той же транзакции"""
+        with self._lock:
+            with self._transaction() as conn:
+                grades = select()
+                conn.executemany(self._DELETE, [(grade.grade_id,) for grade in grades])
+            if grades:
+                self._notify([GradeEvent('deleted', grade) for grade in grades])
+            return len(grades)
+
+    def calculate_student_gpa(self, student_id: str) -> Optional[float]:
+        """Рассчитать GPA студента"""
+        average = self.database.connection().execute(self._AVG_BY_STUDENT, (student_id,)).fetchone()[0]
+        if average is None:
+            return None
+        return round(average / 20, 2)
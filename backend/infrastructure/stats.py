@@ -0,0 +1,240 @@
+"""
+Материализованная статистика по оценкам.
+
+Слушает изменения GradeRepository и обновляет накопители (все оценки,
+по студентам, по курсам и по паре студент-курс) за O(1) на мутацию,
+поэтому отчеты не проходят по сырым оценкам. По тем же событиям
+поддерживается сохраненный GPA студентов.
+"""
+import logging
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from domain.aggregation import GradeAggregates, ScoreAccumulator
+from domain.score_statistics import ScoreSummary, describe_scores
+from infrastructure import config
+from infrastructure.lazy import Lazy
+from infrastructure.metrics import Counter
+from infrastructure.report_cache import REPORT_SECONDS
+from infrastructure.report_pool import aggregate_grades_parallel
+from infrastructure.repositories import (
+    GradeEvent, GradeRepository, StudentRepository, grade_repo, student_repo
+)
+
+STATS_MISMATCHES = Counter("grade_stats_mismatches_total",
+                           "Расхождения материализованной статистики с полным пересчетом (STATS_VERIFY)")
+
+logger = logging.getLogger(__name__)
+
+# Допустимое расхождение сумм из-за накопленной ошибки округления
+_TOTAL_TOLERANCE = 1e-6
+
+# Сколько выборок с медианой и перцентилями держать в кэше между изменениями оценок
+_SUMMARY_CACHE_SIZE = 1024
+
+
+class MaterializedStats:
+    """Инкрементально поддерживаемая статистика по оценкам.
+
+    События мутаций, полный пересчет и досчет min/max идут под одной
+    блокировкой. Порядок захвата - блокировка репозитория, затем эта
+    (события приходят из мутаций под блокировкой репозитория), поэтому
+    под ней репозиторий только читается.
+    """
+
+    def __init__(self, repo: GradeRepository, verify_on_change: bool = False):
+        self.repo = repo
+        self.verify_on_change = verify_on_change
+        self._lock = threading.RLock()
+        self._stats = GradeAggregates()
+        # Перцентили не поддерживаются инкрементально: кэш до следующего изменения
+        self._summaries: Dict[Tuple[Optional[str], Optional[str]], ScoreSummary] = {}
+        self._summaries_generation = -1
+        self.rebuild()
+        repo.add_listener(self._on_grade_events)
+        # SQLite: изменения других воркеров приходят не событиями, а полным пересчетом
+        if hasattr(repo, 'add_reload_listener'):
+            repo.add_reload_listener(self.rebuild)
+
+    @REPORT_SECONDS.timed(report="grade_stats_rebuild")
+    def rebuild(self):
+        """Полностью пересчитать статистику по текущим оценкам"""
+        with self._lock:
+            self._stats = aggregate_grades_parallel(self.repo.get_all(), by_student_course=True)
+
+    def _on_grade_events(self, events: List[GradeEvent]):
+        with self._lock:
+            for event in events:
+                grade = event.grade
+                if event.kind == 'added':
+                    self._apply(grade.student_id, grade.course_id, add=grade.score)
+                elif event.kind == 'deleted':
+                    self._apply(grade.student_id, grade.course_id, remove=grade.score)
+                else:
+                    self._apply(grade.student_id, grade.course_id,
+                                remove=event.old_score, add=grade.score)
+
+            if self.verify_on_change:
+                differences = self.verify()
+                if differences:
+                    STATS_MISMATCHES.inc()
+                    logger.warning("Расхождение материализованной статистики: %s", differences)
+                    self.rebuild()
+
+    def _apply(self, student_id: str, course_id: str,
+               remove: Optional[float] = None, add: Optional[float] = None):
+        stats = self._stats
+        # Ключ группы: ID студента, ID курса или пара (студент, курс)
+        targets: Tuple[Tuple[Optional[Dict[Any, ScoreAccumulator]], Hashable], ...] = (
+            (None, None),
+            (stats.by_student, student_id),
+            (stats.by_course, course_id),
+            (stats.by_student_course, (student_id, course_id)),
+        )
+        for groups, key in targets:
+            if groups is None:
+                acc = stats.overall
+            else:
+                acc = groups.get(key)
+                if acc is None:
+                    acc = groups[key] = ScoreAccumulator()
+            if remove is not None:
+                acc.remove(remove)
+            if add is not None:
+                acc.add(add)
+            if groups is not None and not acc.count:
+                del groups[key]
+
+    def _fresh(self, acc: ScoreAccumulator, grades) -> ScoreAccumulator:
+        """Пересчитать min/max, если удален крайний балл.
+
+        Под блокировкой: пока оценки перебираются, событие другого потока
+        не изменит накопитель и не пометит его устаревшим заново.
+        """
+        if acc.extremes_stale:
+            with self._lock:
+                if acc.extremes_stale:
+                    acc.reset_extremes(grade.score for grade in grades())
+        return acc
+
+    @property
+    def overall(self) -> ScoreAccumulator:
+        return self._fresh(self._stats.overall, self.repo.get_all)
+
+    def student(self, student_id: str) -> ScoreAccumulator:
+        """Статистика студента"""
+        return self._fresh(self._stats.student(student_id),
+                           lambda: self.repo.get_by_student(student_id))
+
+    def course(self, course_id: str) -> ScoreAccumulator:
+        """Статистика курса"""
+        return self._fresh(self._stats.course(course_id),
+                           lambda: self.repo.get_by_course(course_id))
+
+    def pair(self, student_id: str, course_id: str) -> ScoreAccumulator:
+        """Статистика студента по курсу"""
+        return self._fresh(self._stats.pair(student_id, course_id),
+                           lambda: self.repo.get_by_student_and_course(student_id, course_id))
+
+    def select(self, student_id: Optional[str] = None,
+               course_id: Optional[str] = None) -> ScoreAccumulator:
+        """Статистика с фильтром по студенту и/или курсу"""
+        if student_id and course_id:
+            return self.pair(student_id, course_id)
+        if student_id:
+            return self.student(student_id)
+        if course_id:
+            return self.course(course_id)
+        return self.overall
+
+    def describe(self, student_id: Optional[str] = None,
+                 course_id: Optional[str] = None) -> ScoreSummary:
+        """Медиана, перцентили и стандартное отклонение с фильтром по студенту и/или курсу"""
+        with self._lock:
+            generation = self.repo.generation
+            if self._summaries_generation != generation or len(self._summaries) >= _SUMMARY_CACHE_SIZE:
+                self._summaries = {}
+                self._summaries_generation = generation
+            # Расчет идет без блокировки; результат попадает в кэш своего поколения,
+            # который после изменения оценок будет отброшен целиком
+            summaries = self._summaries
+        key = (student_id, course_id)
+        summary = summaries.get(key)
+        if summary is None:
+            scores = [grade.score for grade in self.repo.find(student_id=student_id, course_id=course_id)]
+            summary = summaries[key] = describe_scores(scores)
+        return summary
+
+    def verify(self) -> List[str]:
+        """Сравнить инкрементальное состояние с полным пересчетом.
+
+        Возвращает список расхождений (пустой, если состояние верно).
+        """
+        with self._lock:
+            expected = aggregate_grades_parallel(self.repo.get_all(), by_student_course=True)
+            differences = _diff_accumulator("overall", self._stats.overall, expected.overall)
+            for name in ("by_student", "by_course", "by_student_course"):
+                differences.extend(_diff_groups(name, getattr(self._stats, name), getattr(expected, name)))
+        return differences
+
+
+def _diff_groups(name: str, actual: Dict, expected: Dict) -> List[str]:
+    differences = []
+    for key in set(actual) | set(expected):
+        differences.extend(_diff_accumulator(
+            f"{name}[{key}]", actual.get(key) or ScoreAccumulator(), expected.get(key) or ScoreAccumulator()
+        ))
+    return differences
+
+
+def _diff_accumulator(name: str, actual: ScoreAccumulator, expected: ScoreAccumulator) -> List[str]:
+    checks: List[Tuple[str, object, object]] = [
+        ("count", actual.count, expected.count),
+        ("buckets", actual.buckets, expected.buckets),
+    ]
+    if not actual.extremes_stale:
+        checks.append(("min", actual.min, expected.min))
+        checks.append(("max", actual.max, expected.max))
+
+    differences = [f"{name}.{field}: {got} != {want}" for field, got, want in checks if got != want]
+    if abs(actual.total - expected.total) > _TOTAL_TOLERANCE:
+        differences.append(f"{name}.total: {actual.total} != {expected.total}")
+    return differences
+
+
+class StudentGpaSync:
+    """Пересчитывает сохраненный GPA студентов при изменении их оценок"""
+
+    def __init__(self, stats: MaterializedStats, students: StudentRepository):
+        self.stats = stats
+        self.students = students
+        # Подписка после MaterializedStats: к этому моменту накопители уже обновлены
+        stats.repo.add_listener(self._on_grade_events)
+
+    def gpa_for(self, student_id: str) -> Optional[float]:
+        """GPA студента по текущим оценкам (None, если оценок нет)"""
+        acc = self.stats.student(student_id)
+        return acc.gpa if acc.count else None
+
+    def _on_grade_events(self, events: List[GradeEvent]):
+        student_ids = {event.grade.student_id for event in events}
+        self.students.update_gpas({student_id: self.gpa_for(student_id) for student_id in student_ids})
+
+    def sync_all(self) -> int:
+        """Привести GPA всех студентов в соответствие с оценками"""
+        return self.students.update_gpas(
+            {student.student_id: self.gpa_for(student.student_id) for student in self.students.get_all()}
+        )
+
+
+def _create_grade_stats() -> MaterializedStats:
+    stats = MaterializedStats(grade_repo.load(), verify_on_change=config.STATS_VERIFY)
+    StudentGpaSync(stats, student_repo.load()).sync_all()
+    return stats
+
+
+grade_stats = Lazy("grade_stats", _create_grade_stats)
+
+# Статистика и GPA должны видеть все изменения оценок, поэтому создаются
+# вместе с репозиторием оценок, даже если отчеты еще не запрашивались
+grade_repo.after_load(lambda repo: grade_stats.load())
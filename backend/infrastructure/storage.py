@@ -0,0 +1,609 @@
+"""
+Хранилища для репозиториев.
+
+JsonFileStorage        - вся коллекция в одном JSON файле, перезапись при каждом изменении.
+JournalStorage         - JSON снимок + журнал изменений (по одной строке на мутацию),
+                         журнал периодически сворачивается в снимок в фоновом потоке.
+BinarySnapshotStorage  - как JournalStorage, но снимок в бинарном колоночном формате.
+WriteBehindStorage     - обертка над любым из них: изменения копятся в памяти и
+                         сбрасываются фоновым потоком пачками (WRITE_BEHIND).
+
+Снимки пишутся во временный файл, который после fsync атомарно заменяет
+прежний: сбой посреди записи не портит данные. Все записи идут под
+межпроцессной блокировкой (FileLock) и увеличивают номер поколения,
+по которому репозитории других воркеров узнают, что данные устарели.
+"""
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from infrastructure import config
+from infrastructure.binary_snapshot import read_binary_snapshot, snapshot_path_for, write_binary_snapshot
+from infrastructure.file_lock import FileLock
+from infrastructure.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+Record = Dict[str, Any]
+Snapshot = Callable[[], List[Record]]
+Change = Tuple[str, Optional[Record]]
+
+
+class PersistenceError(RuntimeError):
+    """Данные не удалось прочитать или сохранить"""
+
+
+STORAGE_SECONDS = Histogram("storage_operation_duration_seconds",
+                            "Длительность чтения и записи файлов данных", ("collection", "operation"))
+STORAGE_WRITTEN_BYTES = Counter("storage_written_bytes_total",
+                                "Записано байт в файлы данных", ("collection", "operation"))
+STORAGE_ERRORS = Counter("storage_errors_total",
+                         "Ошибки чтения и записи файлов данных", ("collection", "operation"))
+
+
+def collection_of(file_path: str) -> str:
+    """Имя коллекции по пути файла данных (grades.json, grades.snap -> grades)"""
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+@contextmanager
+def _measured(file_path: str, operation: str):
+    """Замерить операцию хранилища и посчитать ее ошибки"""
+    collection = collection_of(file_path)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STORAGE_ERRORS.inc(collection=collection, operation=operation)
+        raise
+    finally:
+        STORAGE_SECONDS.observe(time.perf_counter() - start, collection=collection, operation=operation)
+
+
+def _count_written(file_path: str, operation: str, size: int):
+    STORAGE_WRITTEN_BYTES.inc(size, collection=collection_of(file_path), operation=operation)
+
+
+def _fsync(path: str):
+    """Сбросить на диск файл или каталог (если позволяет платформа)"""
+    if not config.STORAGE_FSYNC:
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        # Каталоги нельзя открыть на Windows
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_temporary(tmp_path: str, write: Callable[[str], None]):
+    """Подготовить временный файл: write(tmp) + fsync (при сбое файл удаляется)"""
+    try:
+        write(tmp_path)
+        _fsync(tmp_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def replace_file(tmp_path: str, file_path: str):
+    """Атомарно заменить файл подготовленным временным"""
+    os.replace(tmp_path, file_path)
+    _fsync(os.path.dirname(os.path.abspath(file_path)))
+
+
+def atomic_write(file_path: str, write: Callable[[str], None]):
+    """Записать файл через временный: write(tmp) + fsync + rename.
+
+    При сбое на любом шаге прежний файл остается нетронутым.
+    """
+    tmp_path = file_path + ".tmp"
+    write_temporary(tmp_path, write)
+    replace_file(tmp_path, file_path)
+
+
+def _write_json_snapshot(file_path: str, records: Iterable[Record]):
+    """Записать снимок коллекции в JSON файл (по одной записи на строку).
+
+    json.dump с indent работает на чистом Python; построчная запись
+    компактных записей идет через C-кодировщик и в разы быстрее.
+    """
+    lines = [json.dumps(record, ensure_ascii=False) for record in records]
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write("[\n" + ",\n".join(lines) + "\n]\n" if lines else "[]\n")
+
+
+def _read_json_snapshot(file_path: str) -> List[Record]:
+    """Прочитать снимок коллекции из JSON файла"""
+    if not os.path.exists(file_path):
+        return []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _ends_with_torn_line(f) -> bool:
+    """Заканчивается ли открытый файл журнала недописанной строкой"""
+    size = f.seek(0, os.SEEK_END)
+    if size == 0:
+        return False
+    f.seek(size - 1)
+    return f.read(1) != b"\n"
+
+
+def _read_checked(read: Callable[[str], List[Record]], file_path: str) -> List[Record]:
+    """Прочитать снимок; поврежденный файл - PersistenceError, а не пустая коллекция"""
+    try:
+        return read(file_path)
+    except (ValueError, struct.error) as e:
+        raise PersistenceError(f"Файл {file_path} поврежден: {e}") from e
+
+
+class SharedFileStorage:
+    """Общая часть файловых хранилищ: блокировка и номер поколения данных"""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.lock = FileLock(file_path + ".lock")
+        # Поколение, которое видел этот процесс при последней загрузке или записи
+        self.generation: Optional[int] = None
+
+    def is_stale(self) -> bool:
+        """Изменил ли данные другой процесс после последней загрузки или записи"""
+        return self.lock.generation() != self.generation
+
+    def invalidate(self):
+        """Считать данные в памяти устаревшими (например, после неудачной записи)"""
+        self.generation = None
+
+    def _loaded(self):
+        self.generation = self.lock.generation()
+
+    def _written(self):
+        self.generation = self.lock.bump()
+
+
+class JsonFileStorage(SharedFileStorage):
+    """Хранение всей коллекции в одном JSON файле"""
+
+    def load(self) -> List[Record]:
+        """Загрузить все записи"""
+        with self.lock, _measured(self.file_path, "load"):
+            records = _read_checked(_read_json_snapshot, self.file_path)
+            self._loaded()
+        return records
+
+    def save_all(self, records: Iterable[Record]):
+        """Сохранить всю коллекцию"""
+        with self.lock:
+            self._save_all_locked(records)
+
+    def _save_all_locked(self, records: Iterable[Record]):
+        """Записать коллекцию (блокировку держит вызывающий)"""
+        with _measured(self.file_path, "save"):
+            atomic_write(self.file_path, lambda path: _write_json_snapshot(path, records))
+        _count_written(self.file_path, "save", os.path.getsize(self.file_path))
+        self._written()
+
+    def record_change(self, key: str, record: Optional[Record], snapshot: Snapshot):
+        """Зафиксировать изменение одной записи (record=None - удаление)"""
+        self.save_all(snapshot())
+
+    def record_changes(self, changes: List[Change], snapshot: Snapshot):
+        """Зафиксировать пачку изменений одной записью файла"""
+        if changes:
+            self.save_all(snapshot())
+
+    def flush(self):
+        """Дождаться завершения фоновых операций (для JSON их нет)"""
+
+
+class JournalStorage(SharedFileStorage):
+    """JSON снимок + журнал изменений с фоновой компактизацией"""
+
+    def __init__(self, file_path: str, key_field: str,
+                 compact_threshold: int = config.JOURNAL_COMPACT_THRESHOLD):
+        super().__init__(file_path)
+        self.log_path = file_path + ".log"
+        self.rotated_log_path = file_path + ".log.1"
+        self.key_field = key_field
+        self.compact_threshold = compact_threshold
+        self._log_entries = 0
+        self._compaction: Optional[threading.Thread] = None
+
+    def load(self) -> List[Record]:
+        """Загрузить снимок и проиграть поверх него журнал"""
+        with self.lock, _measured(self.file_path, "load"):
+            records: Dict[str, Record] = {}
+            for record in _read_checked(self._read_snapshot_file, self.file_path):
+                records[record[self.key_field]] = record
+
+            # Ротированный журнал остается, если компактизация не успела завершиться
+            self._log_entries = 0
+            for path in (self.rotated_log_path, self.log_path):
+                self._log_entries += self._replay(path, records)
+            self._loaded()
+        return list(records.values())
+
+    def _replay(self, path: str, records: Dict[str, Record]) -> int:
+        """Применить записи журнала к коллекции, вернуть их количество.
+
+        Недописанная последняя строка (сбой посреди записи) отрезается от
+        файла, иначе следующая запись продолжила бы ее, и при загрузке
+        эта строка вместе со всеми следующими изменениями была бы потеряна.
+        """
+        if not os.path.exists(path):
+            return 0
+
+        applied = 0
+        complete = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                complete += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Обрывок строки, за которым уже дописаны новые записи
+                    continue
+                if entry['op'] == 'put':
+                    record = entry['record']
+                    records[record[self.key_field]] = record
+                else:
+                    records.pop(entry['key'], None)
+                applied += 1
+        if complete < os.path.getsize(path):
+            os.truncate(path, complete)
+        return applied
+
+    def save_all(self, records: Iterable[Record]):
+        """Сохранить всю коллекцию в снимок и очистить журнал.
+
+        Компактизация ожидается до взятия блокировки: файл она заменяет
+        тоже под блокировкой, и ожидание под ней не закончилось бы никогда.
+        """
+        self.flush()
+        with self.lock:
+            self._save_all_locked(records)
+
+    def _save_all_locked(self, records: Iterable[Record]):
+        """Записать снимок и очистить журнал (блокировку держит вызывающий).
+
+        Компактизация, начатая после flush, свой снимок отбросит: вместе
+        с журналом удаляется и ротированный журнал, по которому она
+        проверяет, что ее снимок еще нужен.
+        """
+        with _measured(self.file_path, "save"):
+            self._write_snapshot(records)
+        _count_written(self.file_path, "save", os.path.getsize(self.file_path))
+        for path in (self.log_path, self.rotated_log_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._log_entries = 0
+        self._written()
+
+    def record_change(self, key: str, record: Optional[Record], snapshot: Snapshot):
+        """Дописать изменение в журнал (record=None - удаление)"""
+        self.record_changes([(key, record)], snapshot)
+
+    def record_changes(self, changes: List[Change], snapshot: Snapshot):
+        """Дописать пачку изменений в журнал одной записью"""
+        if not changes:
+            return
+        lines = []
+        for key, record in changes:
+            if record is not None:
+                entry = {'op': 'put', 'record': record}
+            else:
+                entry = {'op': 'delete', 'key': key}
+            lines.append(json.dumps(entry, ensure_ascii=False) + "\n")
+
+        payload = "".join(lines).encode('utf-8')
+
+        with self.lock:
+            with _measured(self.file_path, "append"), open(self.log_path, 'a+b') as f:
+                # Другой воркер мог упасть посреди записи (поколение он не
+                # увеличил, и журнал никто не перечитает): обрывок его строки
+                # закрывается переводом строки, и при загрузке пропускается
+                if _ends_with_torn_line(f):
+                    payload = b"\n" + payload
+                f.write(payload)
+                f.flush()
+                if config.STORAGE_FSYNC:
+                    os.fsync(f.fileno())
+            _count_written(self.file_path, "append", len(payload))
+            self._log_entries += len(lines)
+            self._written()
+
+            if self._log_entries >= self.compact_threshold and not self._is_compacting():
+                self._start_compaction(snapshot())
+
+    def _is_compacting(self) -> bool:
+        """Идет ли компактизация (ротированный журнал может оставить и другой процесс)"""
+        if self._compaction is not None and self._compaction.is_alive():
+            return True
+        return os.path.exists(self.rotated_log_path)
+
+    def _start_compaction(self, records: List[Record]):
+        """Ротировать журнал и свернуть его в снимок в фоновом потоке.
+
+        Снимок records снят под блокировкой и уже содержит все изменения
+        из ротированного журнала, поэтому новые записи идут в свежий журнал.
+        """
+        os.replace(self.log_path, self.rotated_log_path)
+        self._log_entries = 0
+        self._compaction = threading.Thread(
+            target=self._compact, args=(records,), name="journal-compaction", daemon=True
+        )
+        self._compaction.start()
+
+    def _compact(self, records: List[Record]):
+        # Снимок пишется без блокировки, под ней только замена файла
+        tmp_path = self.file_path + ".compact.tmp"
+        try:
+            with _measured(self.file_path, "compaction"):
+                write_temporary(tmp_path, lambda path: self._write_snapshot_file(path, records))
+                size = os.path.getsize(tmp_path)
+                with self.lock:
+                    # Пока писался снимок, save_all мог записать более новый
+                    if os.path.exists(self.rotated_log_path):
+                        replace_file(tmp_path, self.file_path)
+                        os.remove(self.rotated_log_path)
+                    else:
+                        os.remove(tmp_path)
+            _count_written(self.file_path, "compaction", size)
+        except Exception:
+            # Журнал остается ротированным и будет свернут следующей записью снимка
+            logger.exception("Ошибка компактизации журнала %s", self.log_path)
+
+    def _read_snapshot_file(self, path: str) -> List[Record]:
+        return _read_json_snapshot(path)
+
+    def _write_snapshot(self, records: Iterable[Record]):
+        atomic_write(self.file_path, lambda path: self._write_snapshot_file(path, records))
+
+    def _write_snapshot_file(self, path: str, records: Iterable[Record]):
+        _write_json_snapshot(path, records)
+
+    def flush(self):
+        """Дождаться завершения фоновой компактизации"""
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join()
+
+
+class BinarySnapshotStorage(JournalStorage):
+    """Бинарный колоночный снимок (students.snap) + журнал изменений.
+
+    Если бинарного снимка еще нет, при первой загрузке данные берутся
+    из JSON файла коллекции и его журнала; JSON файлы не удаляются.
+    """
+
+    def __init__(self, file_path: str, key_field: str,
+                 compact_threshold: int = config.JOURNAL_COMPACT_THRESHOLD):
+        self.json_path = file_path
+        super().__init__(snapshot_path_for(file_path), key_field, compact_threshold)
+
+    def load(self) -> List[Record]:
+        with self.lock:
+            source = JournalStorage(self.json_path, self.key_field)
+            if not os.path.exists(self.file_path) and not os.path.exists(self.log_path) \
+                    and (os.path.exists(source.file_path) or os.path.exists(source.log_path)):
+                records = source.load()
+                self._write_snapshot(records)
+                self._written()
+                return records
+            return super().load()
+
+    def _read_snapshot_file(self, path: str) -> List[Record]:
+        return read_binary_snapshot(path)
+
+    def _write_snapshot_file(self, path: str, records: Iterable[Record]):
+        write_binary_snapshot(path, list(records))
+
+
+class WriteBehindStorage:
+    """Отложенная запись поверх другого хранилища.
+
+    Изменения копятся в памяти (по последней версии каждой записи) и
+    сбрасываются во вложенное хранилище фоновым потоком - через interval
+    секунд после первого несохраненного изменения или сразу, когда их
+    набирается max_pending. Ошибки записи не доходят до вызывающего:
+    изменения остаются в очереди и повторяются, а ошибка попадает в метрики.
+    """
+
+    def __init__(self, inner, key_field: str, interval: float, max_pending: int):
+        self.inner = inner
+        self.key_field = key_field
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending: Dict[str, Optional[Record]] = {}
+        self._pending_changes = 0
+        self._first_change: Optional[float] = None
+        self._snapshot: Optional[Snapshot] = None
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+        # Метрики
+        self.flushes = 0
+        self.flushed_changes = 0
+        self.last_flush_latency: Optional[float] = None
+        self.max_flush_latency = 0.0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def file_path(self) -> str:
+        return self.inner.file_path
+
+    @property
+    def lock(self) -> FileLock:
+        return self.inner.lock
+
+    def is_stale(self) -> bool:
+        return self.inner.is_stale()
+
+    def invalidate(self):
+        self.inner.invalidate()
+
+    def load(self) -> List[Record]:
+        """Загрузить записи (свои несохраненные изменения сначала дописываются)"""
+        with self.inner.lock:
+            self._flush_pending()
+            return self.inner.load()
+
+    def save_all(self, records: Iterable[Record]):
+        """Сохранить всю коллекцию сразу (очередь изменений больше не нужна).
+
+        Фоновые операции хранилища ожидаются до взятия блокировки (им она
+        тоже нужна), а под ней очередь очищается вместе с записью коллекции.
+        """
+        self.inner.flush()
+        with self.inner.lock:
+            with self._condition:
+                self._take_pending()
+            self.inner._save_all_locked(records)
+
+    def record_change(self, key: str, record: Optional[Record], snapshot: Snapshot):
+        """Поставить изменение одной записи в очередь (record=None - удаление)"""
+        self.record_changes([(key, record)], snapshot)
+
+    def record_changes(self, changes: List[Change], snapshot: Snapshot):
+        """Поставить пачку изменений в очередь"""
+        if not changes:
+            return
+        with self._condition:
+            for key, record in changes:
+                self._pending[key] = record
+            self._pending_changes += len(changes)
+            self._snapshot = snapshot
+            if self._first_change is None:
+                self._first_change = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def flush(self):
+        """Записать очередь изменений сейчас и дождаться фоновых операций хранилища"""
+        self._flush_pending()
+        self.inner.flush()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Метрики отложенной записи"""
+        with self._condition:
+            pending, pending_changes = len(self._pending), self._pending_changes
+            oldest = time.monotonic() - self._first_change if self._first_change is not None else 0.0
+        return {
+            "pending_records": pending,
+            "pending_changes": pending_changes,
+            "oldest_pending_seconds": round(oldest, 3),
+            "flushes": self.flushes,
+            "flushed_changes": self.flushed_changes,
+            "last_flush_latency_seconds": self.last_flush_latency,
+            "max_flush_latency_seconds": round(self.max_flush_latency, 3),
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+    def _due(self) -> Optional[float]:
+        """Сколько ждать до сброса очереди (0 - пора, None - очередь пуста)"""
+        if self._first_change is None:
+            return None
+        if self._pending_changes >= self.max_pending:
+            return 0.0
+        return max(self._first_change + self.interval - time.monotonic(), 0.0)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                wait = self._due()
+                while wait is None or wait > 0:
+                    self._condition.wait(wait)
+                    wait = self._due()
+            if not self._flush_pending():
+                # Хранилище недоступно: повторяем не чаще раза в interval
+                time.sleep(self.interval)
+
+    def _take_pending(self):
+        taken = (list(self._pending.items()), self._pending_changes, self._first_change, self._snapshot)
+        self._pending, self._pending_changes, self._first_change = {}, 0, None
+        return taken
+
+    def _flush_pending(self) -> bool:
+        """Дописать очередь во вложенное хранилище, вернуть False при ошибке"""
+        with self.inner.lock:
+            with self._condition:
+                changes, count, first_change, snapshot = self._take_pending()
+            if not changes:
+                return True
+            try:
+                # Пока изменения ждали, файл мог изменить другой процесс: снимок
+                # собирается из файла, а данные в памяти помечаются устаревшими
+                stale = self.inner.is_stale()
+                if stale:
+                    snapshot = lambda: self._merged(changes)
+                self.inner.record_changes(changes, snapshot)
+                if stale:
+                    self.inner.invalidate()
+            except Exception as e:
+                with self._condition:
+                    for key, record in changes:
+                        self._pending.setdefault(key, record)
+                    self._pending_changes += count
+                    if self._first_change is None or first_change < self._first_change:
+                        self._first_change = first_change
+                    self._snapshot = self._snapshot or snapshot
+                self.errors += 1
+                self.last_error = str(e)
+                # Без трассировки: при недоступном хранилище сброс повторяется каждые interval секунд
+                logger.error("Ошибка отложенной записи %s (изменений в очереди: %d): %s",
+                             self.file_path, count, e)
+                return False
+
+        latency = time.monotonic() - first_change
+        self.flushes += 1
+        self.flushed_changes += count
+        self.last_flush_latency = round(latency, 3)
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+        return True
+
+    def _merged(self, changes: List[Change]) -> List[Record]:
+        """Записи из файла с примененными изменениями очереди"""
+        records = {record[self.key_field]: record for record in self.inner.load()}
+        for key, record in changes:
+            if record is None:
+                records.pop(key, None)
+            else:
+                records[key] = record
+        return list(records.values())
+
+
+def _create_file_storage(file_path: str, key_field: str):
+    if config.STORAGE_MODE == "journal":
+        return JournalStorage(file_path, key_field)
+    if config.STORAGE_MODE == "binary":
+        return BinarySnapshotStorage(file_path, key_field)
+    if config.STORAGE_MODE == "json":
+        return JsonFileStorage(file_path)
+    raise ValueError(f"Неизвестный режим хранения: {config.STORAGE_MODE}")
+
+
+def create_storage(file_path: str, key_field: str):
+    """Создать хранилище согласно STORAGE_MODE (и WRITE_BEHIND для коллекции файла)"""
+    storage = _create_file_storage(file_path, key_field)
+    collection = collection_of(file_path)
+    if collection in config.WRITE_BEHIND or "all" in config.WRITE_BEHIND:
+        return WriteBehindStorage(storage, key_field,
+                                  interval=config.WRITE_BEHIND_INTERVAL_MS / 1000,
+                                  max_pending=config.WRITE_BEHIND_MAX_PENDING)
+    return storage
@@ -1,18 +1,55 @@
 """
 Student Manager API - Backend
 """
+import time
+from contextlib import asynccontextmanager
+
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+
+from api import students, courses, grades, reports, export
+from api.conditional import ETAG_HEADER, current_etag, etag_matches, is_conditional, not_modified, set_etag
+from api.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from infrastructure import config
+from infrastructure.lazy import Warmup
+from infrastructure.metrics import CONTENT_TYPE, Histogram, render_metrics
+from infrastructure.report_cache import report_cache
+from infrastructure.report_pool import shutdown_report_pool
+from infrastructure.repositories import (
+    course_repo, flush_repositories, grade_repo, refresh_repositories, storage_metrics, student_repo
+)
+from infrastructure.stats import grade_stats
+from infrastructure.storage import PersistenceError
+
+# Порядок загрузки: статистика оценок строится вместе с репозиторием оценок
+warmup = Warmup([student_repo, course_repo, grade_repo, grade_stats])
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Длительность обработки HTTP-запросов",
+                            ("method", "route", "status"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.STARTUP_LOAD == "background":
+        warmup.start()
+    elif config.STARTUP_LOAD == "eager":
+        await run_in_threadpool(warmup.run)
+    yield
+    # Отложенные изменения (WRITE_BEHIND) должны попасть на диск до выхода
+    await run_in_threadpool(flush_repositories)
+    await run_in_threadpool(shutdown_report_pool)
 
-from api import students, courses, grades, reports
 
 app = FastAPI(
     title="Student Manager API",
     description="API для управления студентами и оценками",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Подключаем CORS
@@ -22,13 +59,61 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, ETAG_HEADER],
 )
 
+# Объявлен раньше refresh_data, поэтому выполняется после подгрузки чужих изменений
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    """ETag по счетчикам изменений и 304 на совпадающий If-None-Match"""
+    if not is_conditional(request):
+        return await call_next(request)
+    # Счетчики читаются до ответа: мутация во время запроса даст новый ETag следующему
+    etag = current_etag()
+    if etag is not None and etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    response = await call_next(request)
+    if etag is not None and response.status_code == 200:
+        set_etag(response, etag)
+    return response
+
+
+@app.middleware("http")
+async def refresh_data(request: Request, call_next):
+    """Перед запросом подгрузить данные, измененные другими воркерами"""
+    try:
+        await run_in_threadpool(refresh_repositories)
+    except PersistenceError as e:
+        return JSONResponse({"detail": str(e)}, status_code=503)
+    return await call_next(request)
+
+
+# Объявлен последним, поэтому выполняется первым и учитывает время остальных middleware
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    """Гистограмма задержек по шаблону маршрута (/students/{student_id}), а не по URL"""
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method,
+                                route=route.path if route is not None else "unmatched", status=status_code)
+
+
+@app.exception_handler(PersistenceError)
+async def persistence_error_handler(request: Request, exc: PersistenceError):
+    return JSONResponse({"detail": str(exc)}, status_code=503)
+
 # Подключаем роутеры
 app.include_router(students.router)
 app.include_router(courses.router)
 app.include_router(grades.router)
 app.include_router(reports.router)
+app.include_router(export.router)
 
 @app.get("/")
 def root():
@@ -41,7 +126,21 @@ def root():
 
 @app.get("/health")
 def health():
-    return {"status": "healthy", "service": "student-manager"}
+    """Готовность сервиса: 503, пока данные загружаются в фоне"""
+    body = {"status": "healthy", "service": "student-manager", "data": warmup.status()}
+    write_behind = storage_metrics()
+    if write_behind:
+        body["write_behind"] = write_behind
+    body["report_cache"] = report_cache.metrics()
+    if not warmup.ready:
+        body["status"] = "loading" if warmup.state == "loading" else "unhealthy"
+        return JSONResponse(body, status_code=503)
+    return body
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Метрики процесса в текстовом формате Prometheus"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+Тесты для агрегации оценок
+"""
+import random
+
+import pytest
+
+from domain.aggregation import GRADE_BUCKETS, ScoreAccumulator, aggregate_grades, bucket_index
+from domain.models import Grade
+from domain.score_statistics import describe_scores
+
+
+def test_bucket_boundaries():
+    """Тест: границы корзин A-F"""
+    assert [GRADE_BUCKETS[bucket_index(s)] for s in (100, 90, 89.9, 80, 70, 60, 59.9, 0)] == \
+        ["A", "A", "B", "B", "C", "D", "F", "F"]
+
+
+def test_aggregate_grades_single_pass():
+    """Тест: накопители по студентам и курсам совпадают с прямым подсчетом"""
+    grades = [
+        Grade("s1", "c1", 95),
+        Grade("s1", "c2", 72),
+        Grade("s2", "c1", 58),
+        Grade("s2", "c1", 81),
+    ]
+    stats = aggregate_grades(grades)
+
+    assert stats.overall.count == 4
+    assert stats.overall.min == 58 and stats.overall.max == 95
+    assert stats.student("s1").average == (95 + 72) / 2
+    assert stats.student("s1").gpa == round((95 + 72) / 2 / 20, 2)
+    assert stats.course("c1").distribution() == {"A": 1, "B": 1, "C": 0, "D": 0, "F": 1}
+    assert stats.student("missing").count == 0
+    assert stats.student("missing").gpa == 0
+
+
+def test_accumulator_merge():
+    """Тест: объединение частичных накопителей"""
+    left, right, both = ScoreAccumulator(), ScoreAccumulator(), ScoreAccumulator()
+    for score in (10, 95):
+        left.add(score)
+        both.add(score)
+    for score in (65, 85):
+        right.add(score)
+        both.add(score)
+    left.merge(right)
+    left.merge(ScoreAccumulator())
+
+    assert (left.count, left.total, left.min, left.max, left.buckets) == \
+        (both.count, both.total, both.min, both.max, both.buckets)
+
+
+def test_describe_scores_python():
+    """Тест: медиана, перцентили и стандартное отклонение без NumPy"""
+    summary = describe_scores([40, 10, 30, 20], use_numpy=False)
+
+    assert summary.median == 25
+    assert summary.percentiles["p25"] == 17.5
+    assert summary.percentiles["p90"] == 37
+    assert summary.std_dev == pytest.approx(11.1803, abs=1e-4)
+    assert describe_scores([]).median is None
+
+
+def test_numpy_backend_matches_python():
+    """Тест: векторизованные агрегация и статистика совпадают с реализацией на Python"""
+    pytest.importorskip("numpy")
+    rnd = random.Random(7)
+    grades = [Grade(f"s{rnd.randrange(40)}", f"c{rnd.randrange(6)}", rnd.choice([rnd.uniform(0, 100), 60, 90]))
+              for _ in range(2000)]
+
+    expected = aggregate_grades(grades, by_student_course=True, use_numpy=False)
+    actual = aggregate_grades(grades, by_student_course=True, use_numpy=True)
+    for name in ("by_student", "by_course", "by_student_course"):
+        want, got = getattr(expected, name), getattr(actual, name)
+        assert set(got) == set(want)
+        for key, acc in want.items():
+            assert (got[key].count, got[key].min, got[key].max, got[key].buckets) == \
+                (acc.count, acc.min, acc.max, acc.buckets)
+            assert got[key].total == pytest.approx(acc.total)
+    assert actual.overall.buckets == expected.overall.buckets
+
+    scores = [grade.score for grade in grades]
+    python, vectorized = describe_scores(scores, use_numpy=False), describe_scores(scores, use_numpy=True)
+    assert vectorized.median == pytest.approx(python.median)
+    assert vectorized.std_dev == pytest.approx(python.std_dev)
+    assert vectorized.percentiles == pytest.approx(python.percentiles)
+
+
+def test_parallel_aggregation_matches_sequential():
+    """Тест: агрегация по шардам в пуле процессов совпадает с последовательной"""
+    from infrastructure.report_pool import aggregate_grades_parallel, shutdown_report_pool
+
+    rnd = random.Random(11)
+    grades = [Grade(f"s{rnd.randrange(50)}", f"c{rnd.randrange(7)}", rnd.uniform(0, 100)) for _ in range(3000)]
+
+    expected = aggregate_grades(grades, by_student_course=True)
+    try:
+        actual = aggregate_grades_parallel(grades, by_student_course=True, workers=2, threshold=0)
+    finally:
+        shutdown_report_pool()
+    for name in ("by_student", "by_course", "by_student_course"):
+        want, got = getattr(expected, name), getattr(actual, name)
+        assert set(got) == set(want)
+        for key, acc in want.items():
+            assert (got[key].count, got[key].min, got[key].max, got[key].buckets) == \
+                (acc.count, acc.min, acc.max, acc.buckets)
+            assert got[key].total == pytest.approx(acc.total)
+    assert actual.overall.count == expected.overall.count
+    assert actual.overall.total == pytest.approx(expected.overall.total)
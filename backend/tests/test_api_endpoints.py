@@ -0,0 +1,285 @@
+"""
+Тесты API (файлы данных пишутся во временный каталог)
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with TestClient(app) as client:
+        yield client
+
+
+def test_students_cursor_pagination(client):
+    """Тест: постраничный обход студентов по курсору из X-Next-Cursor"""
+    for i in range(5):
+        client.post("/students/", json={"name": f"Студент {i}", "email": f"page{i}@example.com"})
+
+    full = client.get("/students/").json()
+    seen, after = [], None
+    while True:
+        params = {"limit": 2, "include_total": True}
+        if after:
+            params["after"] = after
+        response = client.get("/students/", params=params)
+        assert response.status_code == 200
+        assert int(response.headers["X-Total-Count"]) == len(full)
+        seen.extend(s["student_id"] for s in response.json())
+        after = response.headers.get("X-Next-Cursor")
+        if not after:
+            break
+
+    assert seen == sorted(s["student_id"] for s in full)
+
+
+def test_export_grades_streams_all_pages(client, monkeypatch):
+    """Тест: выгрузка NDJSON/CSV проходит все страницы и совпадает с /grades/"""
+    import csv
+    import io
+    import json
+    from api import export
+
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+    student = client.post("/students/", json={"name": "Выгрузка", "email": "export@example.com"}).json()
+    course = client.post("/courses/", json={"name": "Выгрузка", "code": "EXP-1", "credits": 3}).json()
+    for score in (55, 70, 85, 95, 100):
+        client.post("/grades/", json={
+            "student_id": student["student_id"], "course_id": course["course_id"], "score": score
+        })
+
+    expected = {g["grade_id"] for g in client.get("/grades/", params={"student_id": student["student_id"]}).json()}
+
+    response = client.get("/export/grades.ndjson", params={"student_id": student["student_id"]})
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert {row["grade_id"] for row in rows} == expected
+
+    response = client.get("/export/grades.csv", params={"student_id": student["student_id"]})
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert {row["grade_id"] for row in rows} == expected
+
+    response = client.get("/export/reports/courses.csv")
+    rows = [row for row in csv.DictReader(io.StringIO(response.text)) if row["course_id"] == course["course_id"]]
+    assert rows[0]["grades_count"] == "5"
+
+    # Фильтры по дате те же, что у /grades/ (включая дату с часовым поясом)
+    from datetime import datetime
+    from domain.models import Grade
+    from infrastructure.repositories import grade_repo
+    dated = [Grade(student["student_id"], course["course_id"], score) for score in (65, 75)]
+    for grade in dated:
+        grade.date = datetime(2024, 3, 1, 12, 0)
+    grade_repo.add_many(dated)
+    marked = [grade.grade_id for grade in dated]
+    window = {"student_id": student["student_id"], "date_from": "2024-03-01T00:00:00",
+              "date_to": datetime(2024, 3, 2).astimezone().isoformat()}
+    assert {g["grade_id"] for g in client.get("/grades/", params=window).json()} == set(marked)
+    rows = [json.loads(line) for line in client.get("/export/grades.ndjson", params=window).text.splitlines()]
+    assert {row["grade_id"] for row in rows} == set(marked)
+    rows = list(csv.DictReader(io.StringIO(client.get("/export/grades.csv", params=window).text)))
+    assert {row["grade_id"] for row in rows} == set(marked)
+
+
+def test_bulk_import_reports_row_errors(client):
+    """Тест: массовый импорт сохраняет верные строки и возвращает ошибки по номерам строк"""
+    response = client.post("/students/bulk", json=[
+        {"name": "Первый", "email": "bulk1@example.com"},
+        {"name": "Без email"},
+        {"name": "Второй", "email": "BULK1@example.com"},
+    ])
+    result = response.json()
+    assert result["created"] == 1
+    assert [error["row"] for error in result["errors"]] == [2, 3]
+    student_id = result["ids"][0]
+
+    course = client.post("/courses/bulk", json=[{"code": "BULK-1", "name": "Импорт", "credits": 3}]).json()
+    course_id = course["ids"][0]
+
+    csv_body = "student_id,course_id,score\n" + "".join(
+        f"{student_id},{course_id},{score}\n" for score in (60, 70, 80)
+    ) + f"missing,{course_id},90\n"
+    response = client.post("/grades/bulk", content=csv_body, headers={"Content-Type": "text/csv"})
+    result = response.json()
+    assert result["created"] == 3
+    assert result["errors"][0]["row"] == 4
+
+    ndjson_body = f'{{"student_id": "{student_id}", "course_id": "{course_id}", "score": 90}}\n{{"score": 1}}\n'
+    response = client.post("/grades/bulk", params={"atomic": True},
+                           files={"file": ("grades.ndjson", ndjson_body, "application/octet-stream")})
+    assert response.json()["created"] == 0
+    assert len(client.get("/grades/", params={"student_id": student_id}).json()) == 3
+
+
+def test_health_reports_loaded_data(client):
+    """Тест: /health отвечает 200 после фоновой загрузки и сообщает ее прогресс"""
+    from main import warmup
+
+    warmup.wait()
+    response = client.get("/health")
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data["state"] in ("ready", "idle")
+    assert data["loaded"] == data["total"] or data["state"] == "idle"
+
+
+def test_report_cache_follows_mutations(client):
+    """Тест: кэшированная статистика обновляется после добавления оценки"""
+    student = client.post("/students/", json={"name": "Кэш", "email": "cache@example.com"}).json()
+    course = client.post("/courses/", json={"code": "CACHE1", "name": "Кэш", "credits": 3}).json()
+    params = {"student_id": student["student_id"]}
+    assert client.get("/reports/grades/statistics", params=params).json()["total_grades"] == 0
+
+    hits = client.get("/health").json()["report_cache"]["hits"]
+    assert client.get("/reports/grades/statistics", params=params).json()["total_grades"] == 0
+    assert client.get("/health").json()["report_cache"]["hits"] == hits + 1
+
+    client.post("/grades/", json={"student_id": student["student_id"], "course_id": course["course_id"],
+                                  "score": 90})
+    assert client.get("/reports/grades/statistics", params=params).json()["total_grades"] == 1
+
+
+def test_conditional_get_returns_304_until_mutation(client):
+    """Тест: повторный GET с If-None-Match получает 304, после мутации - новые данные"""
+    client.post("/courses/", json={"code": "ETAG1", "name": "ETag", "credits": 2})
+    first = client.get("/courses/")
+    etag = first.headers["ETag"]
+
+    cached = client.get("/courses/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    summary_etag = client.get("/reports/courses/summary").headers["ETag"]
+    assert client.get("/reports/courses/summary", headers={"If-None-Match": summary_etag}).status_code == 304
+
+    client.post("/courses/", json={"code": "ETAG2", "name": "ETag 2", "credits": 2})
+    fresh = client.get("/courses/", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["ETag"] != etag
+    assert len(fresh.json()) == len(first.json()) + 1
+
+
+def test_delete_student_and_course_cascade_to_grades(client):
+    """Тест: удаление студента или курса удаляет их оценки"""
+    ids = [client.post("/students/", json={"name": f"Каскад {i}", "email": f"cascade{i}@example.com"}).json()["student_id"]
+           for i in range(2)]
+    courses = [client.post("/courses/", json={"code": f"CASC{i}", "name": "Каскад", "credits": 3}).json()["course_id"]
+               for i in range(2)]
+    for student_id in ids:
+        for course_id in courses:
+            client.post("/grades/", json={"student_id": student_id, "course_id": course_id, "score": 80})
+
+    assert client.delete(f"/students/{ids[0]}").status_code == 204
+    assert client.get("/grades/", params={"student_id": ids[0]}).json() == []
+    assert client.delete(f"/courses/{courses[0]}").status_code == 204
+    remaining = client.get("/grades/", params={"student_id": ids[1]}).json()
+    assert [grade["course_id"] for grade in remaining] == [courses[1]]
+    assert client.get(f"/reports/student/{ids[1]}/progress").json()["courses_completed"] == 1
+
+
+def test_batch_lookup_and_grade_expand(client):
+    """Тест: пакетное получение студентов/курсов и оценки с expand=student,course"""
+    students = [client.post("/students/", json={"name": f"Пакет {i}", "email": f"batch{i}@example.com"}).json()
+                for i in range(3)]
+    course = client.post("/courses/", json={"code": "BATCH1", "name": "Пакеты", "credits": 3}).json()
+    for student in students:
+        client.post("/grades/", json={"student_id": student["student_id"], "course_id": course["course_id"],
+                                      "score": 75})
+
+    ids = [students[2]["student_id"], "missing", students[0]["student_id"], students[2]["student_id"]]
+    found = client.post("/students/batch", json={"ids": ids}).json()
+    assert [s["student_id"] for s in found] == [students[2]["student_id"], students[0]["student_id"]]
+    assert client.post("/courses/batch", json={"ids": [course["course_id"]]}).json()[0]["code"] == "BATCH1"
+    assert client.post("/students/batch", json={"ids": ["x"] * 1001}).status_code == 422
+
+    plain = client.get("/grades/", params={"course_id": course["course_id"]}).json()
+    assert "student" not in plain[0] and "course" not in plain[0]
+    expanded = client.get("/grades/", params={"course_id": course["course_id"], "expand": "student,course"}).json()
+    assert [g["grade_id"] for g in expanded] == [g["grade_id"] for g in plain]
+    names = {s["student_id"]: s["name"] for s in students}
+    assert all(g["student"]["name"] == names[g["student_id"]] and g["course"]["name"] == "Пакеты" for g in expanded)
+    assert client.get("/grades/", params={"expand": "teacher"}).status_code == 400
+
+
+def test_list_fields_projection_matches_models(client):
+    """Тест: быстрая сериализация списков совпадает с моделями ответа, fields оставляет только нужные поля"""
+    from fastapi.encoders import jsonable_encoder
+    from domain.schemas import CourseResponse, GradeResponse, StudentResponse
+    from infrastructure.repositories import course_repo, grade_repo, student_repo
+
+    student = client.post("/students/", json={"name": "Проекция", "email": "fields@example.com"}).json()
+    course = client.post("/courses/", json={"code": "FLD1", "name": "Поля", "credits": 2}).json()
+    for score in (59, 90.5):
+        client.post("/grades/", json={"student_id": student["student_id"], "course_id": course["course_id"],
+                                      "score": score})
+
+    for url, repo, model in (("/students/", student_repo, StudentResponse), ("/courses/", course_repo, CourseResponse),
+                             ("/grades/", grade_repo, GradeResponse)):
+        expected = jsonable_encoder([model.from_orm(record) for record in repo.get_all()])
+        assert client.get(url).json() == expected
+
+    students = client.get("/students/", params={"fields": "student_id,name"}).json()
+    assert students == [{"student_id": s.student_id, "name": s.name} for s in student_repo.get_all()]
+    grades = client.get("/grades/", params={"fields": "score", "expand": "course", "limit": 1,
+                                            "student_id": student["student_id"]})
+    assert grades.headers["X-Next-Cursor"]
+    assert list(grades.json()[0]) == ["score", "course"] and grades.json()[0]["course"]["code"] == "FLD1"
+    assert client.get("/courses/", params={"fields": "code,teacher"}).status_code == 400
+
+
+def test_metrics_expose_request_and_storage_timings(client):
+    """Тест: /metrics в формате Prometheus - задержки по шаблону маршрута, запись файлов и расчет отчетов"""
+    student = client.post("/students/", json={"name": "Метрики", "email": "metrics@example.com"}).json()
+    client.get(f"/students/{student['student_id']}")
+    client.get("/students/missing")
+    client.get("/reports/grades/statistics")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+
+    assert samples['http_request_duration_seconds_count{method="GET",route="/students/{student_id}",status="404"}'] >= 1
+    assert samples['http_request_duration_seconds_bucket{method="GET",route="/students/{student_id}",status="200",le="+Inf"}'] >= 1
+    assert not any('route="/students/missing"' in name for name in samples)
+    assert samples['storage_written_bytes_total{collection="students",operation="save"}'] > 0
+    assert samples['storage_operation_duration_seconds_count{collection="students",operation="load"}'] >= 1
+    assert samples['report_compute_duration_seconds_count{report="grades_statistics"}'] >= 1
+    assert "report_cache_misses_total" in samples
+
+
+def test_etag_changes_after_write_of_another_sqlite_worker(tmp_path, monkeypatch):
+    """Тест: ETag меняется после записи другого воркера в общую базу SQLite"""
+    from api import conditional
+    from domain.models import Course
+    from infrastructure import repositories
+    from infrastructure.lazy import Lazy
+    from infrastructure.sqlite_repositories import (
+        SqliteCourseRepository, SqliteDatabase, SqliteGradeRepository, SqliteStudentRepository
+    )
+
+    path = str(tmp_path / "shared.db")
+    database = SqliteDatabase(path)
+    repos = {
+        "student_repo": Lazy("students", lambda: SqliteStudentRepository(database)),
+        "course_repo": Lazy("courses", lambda: SqliteCourseRepository(database)),
+        "grade_repo": Lazy("grades", lambda: SqliteGradeRepository(database)),
+    }
+    for name, repo in repos.items():
+        repo.load()
+        monkeypatch.setattr(repositories, name, repo)
+        monkeypatch.setattr(conditional, name, repo)
+
+    etag = conditional.current_etag()
+    assert conditional.current_etag() == etag
+    SqliteCourseRepository(SqliteDatabase(path)).add(Course("OTHER1", "Чужой воркер", 3))
+    # Как в middleware refresh_data, которое выполняется до conditional_get
+    repositories.refresh_repositories()
+    assert not conditional.etag_matches(etag, conditional.current_etag())
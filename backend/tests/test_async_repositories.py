@@ -0,0 +1,61 @@
+"""
+Тесты для асинхронного интерфейса репозиториев
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from domain.exceptions import DuplicateKeyError
+from domain.models import Grade, Student
+from infrastructure.async_repositories import AsyncRepository, run_report
+from infrastructure.lazy import Lazy
+from infrastructure.repositories import GradeRepository, StudentRepository
+from infrastructure.storage import JsonFileStorage
+
+
+def test_async_repository_runs_calls_off_the_event_loop(tmp_path):
+    """Тест: загрузка и методы репозитория выполняются не в потоке цикла событий"""
+    threads = []
+
+    def create():
+        threads.append(threading.get_ident())
+        path = str(tmp_path / "students.json")
+        return StudentRepository(path, storage=JsonFileStorage(path))
+
+    repo = AsyncRepository(Lazy("students", create))
+
+    async def scenario():
+        student = await repo.add(Student("Иван", "ivan@example.com"))
+        with pytest.raises(DuplicateKeyError):
+            await repo.add(Student("Другой", "IVAN@example.com"))
+        return student, await repo.get_by_id(student.student_id)
+
+    student, found = asyncio.run(scenario())
+    assert found is student
+    assert threads and threads[0] != threading.get_ident()
+
+
+def test_slow_report_does_not_block_reads(tmp_path):
+    """Тест: пока считается тяжелый отчет, чтения продолжают обслуживаться"""
+    path = str(tmp_path / "grades.json")
+    grades = GradeRepository(path, storage=JsonFileStorage(path))
+    grades.add(Grade("s1", "c1", 80))
+    repo = AsyncRepository(grades)
+
+    def slow_report():
+        time.sleep(0.3)
+        return "report"
+
+    async def scenario():
+        report = asyncio.create_task(run_report(slow_report))
+        start = time.perf_counter()
+        for _ in range(5):
+            assert len(await repo.list_page(10)) == 1
+        reads_time = time.perf_counter() - start
+        return await report, reads_time
+
+    result, reads_time = asyncio.run(scenario())
+    assert result == "report"
+    assert reads_time < 0.2
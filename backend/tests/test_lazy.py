@@ -0,0 +1,58 @@
+"""
+Тесты для отложенной загрузки
+"""
+import threading
+
+from infrastructure.lazy import Lazy, Warmup
+
+
+def test_lazy_creates_once_on_first_access():
+    """Тест: объект создается один раз при первом обращении, в том числе из нескольких потоков"""
+    created = []
+    lazy = Lazy("items", lambda: created.append(1) or {"a": 1})
+    assert not lazy.loaded and created == []
+
+    threads = [threading.Thread(target=lambda: lazy.get("a")) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert lazy.loaded
+    assert lazy.get("a") == 1
+    assert created == [1]
+
+
+def test_after_load_sees_instance_before_publication():
+    """Тест: обработчик after_load может обращаться к создаваемому объекту и зависимым объектам"""
+    repo = Lazy("repo", lambda: {"grades": 3})
+    stats = Lazy("stats", lambda: {"count": repo.load()["grades"]})
+    repo.after_load(lambda _: stats.load())
+
+    assert stats.get("count") == 3
+    assert repo.loaded
+
+    repo2 = Lazy("repo2", lambda: {"grades": 5})
+    stats2 = Lazy("stats2", lambda: {"count": repo2.load()["grades"]})
+    repo2.after_load(lambda _: stats2.load())
+    assert repo2.get("grades") == 5
+    assert stats2.loaded and stats2.get("count") == 5
+
+
+def test_warmup_reports_progress_and_failures():
+    """Тест: прогресс фоновой загрузки и ошибка загрузки"""
+    ok = Lazy("ok", dict)
+    warmup = Warmup([ok])
+    assert warmup.ready and warmup.status()["loaded"] == 0
+    warmup.start()
+    warmup.wait()
+    assert warmup.state == "ready"
+    assert warmup.status()["components"] == {"ok": "loaded"}
+
+    def fail():
+        raise OSError("нет файла")
+
+    broken = Warmup([Lazy("broken", fail)])
+    broken.run()
+    assert not broken.ready
+    assert broken.status()["error"] == "нет файла"
@@ -0,0 +1,23 @@
+"""
+Тесты для метрик в формате Prometheus
+"""
+from infrastructure.metrics import Counter, Histogram, render_metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Тест: корзины гистограммы накопительные, метки экранируются, счетчики суммируются по меткам"""
+    histogram = Histogram("test_duration_seconds", "Тестовая гистограмма", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, route='/a"b')
+    counter = Counter("test_events_total", "Тестовый счетчик", ("kind",))
+    counter.inc(kind="x")
+    counter.inc(2, kind="x")
+
+    text = render_metrics()
+    assert "# TYPE test_duration_seconds histogram" in text
+    assert 'test_duration_seconds_bucket{route="/a\\"b",le="0.1"} 1\n' in text
+    assert 'test_duration_seconds_bucket{route="/a\\"b",le="1.0"} 3\n' in text
+    assert 'test_duration_seconds_bucket{route="/a\\"b",le="+Inf"} 4\n' in text
+    assert 'test_duration_seconds_count{route="/a\\"b"} 4\n' in text
+    assert 'test_events_total{kind="x"} 3\n' in text
+    assert histogram.count(route='/a"b') == 4
@@ -0,0 +1,68 @@
+"""
+Тесты для кэша отчетов
+"""
+from infrastructure.report_cache import ReportCache
+
+
+def test_report_cache_invalidated_by_generation():
+    """Тест: повторный запрос берется из кэша, после мутации отчет считается заново"""
+    generation = [0]
+    cache = ReportCache(8, generation=lambda: generation[0])
+    calls = []
+
+    @cache.cached("report")
+    def report(value):
+        calls.append(value)
+        return {"value": value, "calls": len(calls)}
+
+    assert report(1) == report(1) == {"value": 1, "calls": 1}
+    assert report(2)["calls"] == 2
+    generation[0] += 1
+    assert report(1)["calls"] == 3
+
+    metrics = cache.metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["invalidations"]) == (1, 3, 1)
+    assert metrics["size"] == 2
+
+
+def test_report_cache_evicts_least_recently_used():
+    """Тест: при переполнении вытесняется давно не запрошенный отчет"""
+    cache = ReportCache(2, generation=lambda: 0)
+    calls = []
+
+    def compute(key):
+        calls.append(key)
+        return key
+
+    for key in ("a", "b", "a", "c", "a", "b"):
+        cache.get_or_compute("report", (key,), lambda: compute(key))
+
+    assert calls == ["a", "b", "c", "b"]
+    assert cache.metrics()["evictions"] == 2
+
+
+def test_report_cache_sees_writes_of_another_sqlite_worker(tmp_path, monkeypatch):
+    """Тест: запись другого воркера в общую базу SQLite делает отчет устаревшим"""
+    from domain.models import Grade
+    from infrastructure import repositories
+    from infrastructure.lazy import Lazy
+    from infrastructure.sqlite_repositories import (
+        SqliteCourseRepository, SqliteDatabase, SqliteGradeRepository, SqliteStudentRepository
+    )
+
+    path = str(tmp_path / "shared.db")
+    database = SqliteDatabase(path)
+    grades = Lazy("grades", lambda: SqliteGradeRepository(database))
+    monkeypatch.setattr(repositories, "student_repo", Lazy("students", lambda: SqliteStudentRepository(database)))
+    monkeypatch.setattr(repositories, "course_repo", Lazy("courses", lambda: SqliteCourseRepository(database)))
+    monkeypatch.setattr(repositories, "grade_repo", grades)
+    for repo in (repositories.student_repo, repositories.course_repo, grades):
+        repo.load()
+    other_worker = SqliteGradeRepository(SqliteDatabase(path))
+
+    cache = ReportCache(8)
+    count = lambda: cache.get_or_compute("count", (), grades.count)
+    grades.add(Grade("s1", "c1", 80))
+    assert count() == count() == 1
+    other_worker.add(Grade("s2", "c1", 90))
+    assert count() == 2
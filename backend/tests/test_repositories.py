@@ -0,0 +1,350 @@
+"""
+Тесты для репозиториев
+"""
+import logging
+import random
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from domain.exceptions import DuplicateKeyError
+from domain.models import Course, Grade, Student
+from infrastructure.repositories import DUPLICATE_KEYS, CourseRepository, GradeRepository, StudentRepository
+from infrastructure.storage import JournalStorage
+
+
+def make_grade_repo(tmp_path):
+    return GradeRepository(str(tmp_path / "grades.json"))
+
+
+def test_grade_indexes_follow_mutations(tmp_path):
+    """Тест: индексы по студенту и курсу обновляются при add/delete"""
+    repo = make_grade_repo(tmp_path)
+    g1 = repo.add(Grade("s1", "c1", 80))
+    g2 = repo.add(Grade("s1", "c2", 70))
+    g3 = repo.add(Grade("s2", "c1", 90))
+
+    assert repo.get_by_student("s1") == [g1, g2]
+    assert repo.get_by_course("c1") == [g1, g3]
+    assert repo.get_by_student_and_course("s1", "c2") == [g2]
+    assert repo.find(student_id="s2", course_id="c1") == [g3]
+
+    repo.delete(g1.grade_id)
+    assert repo.get_by_student("s1") == [g2]
+    assert repo.get_by_course("c1") == [g3]
+    assert repo.get_by_student_and_course("s1", "c1") == []
+    assert repo.check_indexes()
+
+
+def test_grade_indexes_rebuilt_on_load(tmp_path):
+    """Тест: индексы строятся при загрузке из файла"""
+    repo = make_grade_repo(tmp_path)
+    grade = repo.add(Grade("s1", "c1", 80))
+
+    reloaded = make_grade_repo(tmp_path)
+    assert [g.grade_id for g in reloaded.get_by_student("s1")] == [grade.grade_id]
+
+
+def test_check_indexes_repairs_drift(tmp_path):
+    """Тест: проверка согласованности находит и чинит расхождение индексов"""
+    repo = make_grade_repo(tmp_path)
+    grade = repo.add(Grade("s1", "c1", 80))
+    del repo._by_course["c1"]
+
+    assert repo.check_indexes() is False
+    assert repo.get_by_course("c1") == [grade]
+    assert repo.check_indexes() is True
+
+
+def test_email_index_is_unique_and_case_insensitive(tmp_path):
+    """Тест: email уникален без учета регистра"""
+    repo = StudentRepository(str(tmp_path / "students.json"))
+    ivan = repo.add(Student("Иван", "Ivan@Example.com"))
+
+    assert repo.get_by_email("ivan@example.com") is ivan
+    with pytest.raises(DuplicateKeyError):
+        repo.add(Student("Другой Иван", "IVAN@example.com"))
+
+    maria = repo.add(Student("Мария", "maria@example.com"))
+    with pytest.raises(DuplicateKeyError):
+        repo.update(maria.student_id, email="ivan@example.com")
+    assert maria.email == "maria@example.com"
+
+    repo.update(ivan.student_id, email="ivan.new@example.com")
+    assert repo.get_by_email("ivan@example.com") is None
+    assert repo.get_by_email("IVAN.NEW@example.com") is ivan
+
+    repo.delete(ivan.student_id)
+    assert repo.get_by_email("ivan.new@example.com") is None
+
+
+def test_duplicate_email_in_file_is_logged_and_counted(tmp_path, caplog):
+    """Тест: повторяющийся email в файле данных пишется в журнал и в метрику, а не в stdout"""
+    file_path = str(tmp_path / "students.json")
+    repo = StudentRepository(file_path)
+    first = repo.add(Student("Иван", "ivan@example.com"))
+    second = Student("Иван 2", "IVAN@example.com")
+    repo.storage.save_all(repo._snapshot() + [repo._to_record(second)])
+    before = DUPLICATE_KEYS.value(collection="students")
+
+    with caplog.at_level(logging.WARNING, logger="infrastructure.repositories"):
+        reloaded = StudentRepository(file_path)
+
+    assert reloaded.count() == 2
+    assert reloaded.get_by_email("ivan@example.com").student_id == first.student_id
+    assert DUPLICATE_KEYS.value(collection="students") == before + 1
+    assert "IVAN@example.com" in caplog.text
+
+
+def test_course_code_index_is_unique(tmp_path):
+    """Тест: код курса уникален без учета регистра"""
+    repo = CourseRepository(str(tmp_path / "courses.json"))
+    course = repo.add(Course("CS101", "Программирование", 4))
+
+    assert repo.get_by_code("cs101") is course
+    with pytest.raises(DuplicateKeyError):
+        repo.add(Course("cs101", "Другой курс", 3))
+
+    repo.delete(course.course_id)
+    repo.add(Course("cs101", "Другой курс", 3))
+
+
+def test_grade_keyset_pagination(tmp_path):
+    """Тест: страницы оценок по курсору обходят всю коллекцию ровно один раз"""
+    repo = make_grade_repo(tmp_path)
+    for i in range(25):
+        repo.add(Grade(f"s{i % 3}", f"c{i % 2}", i * 4))
+
+    seen, after = [], None
+    while True:
+        page = repo.list_page(10, after)
+        seen.extend(g.grade_id for g in page)
+        if len(page) < 10:
+            break
+        after = page[-1].grade_id
+    assert seen == sorted(repo.grades)
+
+    filtered = repo.list_page(100, student_id="s1", min_score=20, max_score=80)
+    assert [g.grade_id for g in filtered] == sorted(
+        g.grade_id for g in repo.get_by_student("s1") if 20 <= g.score <= 80
+    )
+    assert repo.count(student_id="s1", min_score=20, max_score=80) == len(filtered)
+    assert repo.list_page(5, after=filtered[0].grade_id, student_id="s1", min_score=20, max_score=80) == filtered[1:6]
+
+    repo.delete(seen[0])
+    assert repo.list_page(1)[0].grade_id == seen[1]
+
+
+def test_grade_range_indexes_match_full_scan(tmp_path):
+    """Тест: выборки по диапазонам балла и даты совпадают с полным перебором"""
+    repo = make_grade_repo(tmp_path)
+    rnd = random.Random(5)
+    start = datetime(2024, 1, 1)
+    grades = []
+    for i in range(400):
+        grade = Grade(f"s{rnd.randrange(20)}", f"c{rnd.randrange(5)}", rnd.choice([rnd.uniform(0, 100), 50, 75]))
+        grade.date = start + timedelta(hours=rnd.randrange(24 * 60))
+        grades.append(grade)
+    repo.add_many(grades[:300])
+    for grade in grades[300:]:
+        repo.add(grade)
+    for grade in grades[:40]:
+        repo.update(grade.grade_id, rnd.uniform(0, 100))
+    for grade in grades[40:60]:
+        repo.delete(grade.grade_id)
+    assert repo.check_indexes(rebuild=False)
+
+    cases = [
+        dict(min_score=50, max_score=75),
+        dict(min_score=99.5),
+        dict(date_from=start + timedelta(days=10), date_to=start + timedelta(days=12)),
+        dict(student_id="s3", min_score=40, date_to=start + timedelta(days=30)),
+        dict(course_id="c1", max_score=20, date_from=start + timedelta(days=5)),
+        dict(min_score=10, max_score=90, date_from=start + timedelta(days=59, hours=20)),
+        dict(student_id="s3"),
+        dict(),
+    ]
+    in_order = sorted(repo.get_all(), key=lambda grade: (grade.date, grade.grade_id))
+    for filters in cases:
+        expected = sorted(
+            grade.grade_id for grade in repo.get_all()
+            if grade.student_id == filters.get("student_id", grade.student_id)
+            and grade.course_id == filters.get("course_id", grade.course_id)
+            and filters.get("min_score", 0) <= grade.score <= filters.get("max_score", 100)
+            and filters.get("date_from", start) <= grade.date <= filters.get("date_to", datetime.max)
+        )
+        assert sorted(grade.grade_id for grade in repo.find(**filters)) == expected
+        # Порядок find не зависит от того, какой индекс дал кандидатов
+        assert repo.find(**filters) == [grade for grade in in_order if grade.grade_id in set(expected)]
+        assert repo.count(**filters) == len(expected)
+        assert [grade.grade_id for grade in repo.list_page(1000, **filters)] == expected
+        if len(expected) > 3:
+            assert [grade.grade_id for grade in repo.list_page(2, after=expected[0], **filters)] == expected[1:3]
+
+
+def test_add_many_writes_once_and_notifies_once(tmp_path):
+    """Тест: add_many сохраняет пачку одной записью и одним оповещением"""
+    repo = make_grade_repo(tmp_path)
+    writes, batches = [], []
+    record_changes = repo.storage.record_changes
+    repo.storage.record_changes = lambda changes, snapshot: (writes.append(len(changes)),
+                                                              record_changes(changes, snapshot))
+    repo.add_listener(batches.append)
+
+    grades = repo.add_many([Grade(f"s{i % 3}", "c1", i) for i in range(50)])
+
+    assert writes == [50]
+    assert len(batches) == 1 and len(batches[0]) == 50
+    assert len(make_grade_repo(tmp_path).get_all()) == 50
+    assert repo.get_by_student("s0") == grades[::3]
+    assert repo.check_indexes()
+
+
+def test_update_gpas_without_changes_keeps_generation(tmp_path):
+    """Тест: update_gpas без изменений не пишет в хранилище и не меняет поколение"""
+    repo = StudentRepository(str(tmp_path / "students.json"))
+    student = repo.add(Student("Иван", "ivan@example.com"))
+    assert repo.update_gpas({student.student_id: 4.5}) == 1
+    writes = []
+    record_changes = repo.storage.record_changes
+    repo.storage.record_changes = lambda changes, snapshot: (writes.append(len(changes)),
+                                                              record_changes(changes, snapshot))
+    generation = repo.generation
+
+    assert repo.update_gpas({student.student_id: 4.5, "missing": 3.0}) == 0
+    assert writes == [] and repo.generation == generation
+
+    assert repo.update_gpas({student.student_id: 7.0}) == 1
+    assert writes == [1] and repo.generation == generation + 1
+    assert repo.get_by_id(student.student_id).gpa == 5.0
+
+
+def test_failed_listener_discards_unsaved_grade(tmp_path):
+    """Тест: упавший подписчик не оставляет незаписанную оценку в памяти и в следующей записи"""
+    repo = make_grade_repo(tmp_path)
+    kept = repo.add(Grade("s1", "c1", 70))
+    seen = []
+    repo.add_listener(lambda events: seen.extend((event.kind, event.grade.grade_id) for event in events))
+
+    failures = [RuntimeError("подписчик недоступен")]
+
+    def failing(events):
+        if failures:
+            raise failures.pop()
+
+    repo.add_listener(failing)
+    with pytest.raises(RuntimeError):
+        repo.add(Grade("fail", "c1", 90))
+    lost = seen[-1][1]
+
+    other = repo.add(Grade("s2", "c1", 80))
+    assert sorted(repo.grades) == sorted([kept.grade_id, other.grade_id])
+    assert sorted(make_grade_repo(tmp_path).grades) == sorted(repo.grades)
+    # Подписчики получили удаление оценки, которую уже учли
+    assert ("deleted", lost) in seen
+    assert repo.check_indexes(rebuild=False)
+
+
+def test_student_add_many_rejects_duplicate_batch(tmp_path):
+    """Тест: дубликат email в пачке или в репозитории отклоняет всю пачку"""
+    repo = StudentRepository(str(tmp_path / "students.json"))
+    repo.add(Student("Иван", "ivan@example.com"))
+
+    with pytest.raises(DuplicateKeyError):
+        repo.add_many([Student("Мария", "maria@example.com"), Student("Мария 2", "MARIA@example.com")])
+    with pytest.raises(DuplicateKeyError):
+        repo.add_many([Student("Петр", "petr@example.com"), Student("Иван 2", "ivan@example.com")])
+    assert repo.count() == 1
+
+    added = repo.add_many([Student("Мария", "maria@example.com"), Student("Петр", "petr@example.com")])
+    assert repo.get_by_email("petr@example.com") is added[1]
+    assert list(repo._ids) == sorted(repo.students)
+    assert len(repo.top_by_gpa(10)) == 3
+
+
+def test_loaded_grades_are_compact(tmp_path):
+    """Тест: оценки без __dict__, ID студента и курса после загрузки - общие строки"""
+    repo = make_grade_repo(tmp_path)
+    repo.add_many([Grade("s1", "c1", 80), Grade("s1", "c1", 90)])
+
+    first, second = make_grade_repo(tmp_path).get_all()
+    assert not hasattr(first, '__dict__')
+    assert first.student_id is second.student_id
+    assert first.course_id is second.course_id
+
+
+def test_reads_are_safe_during_mutations_from_other_threads(tmp_path, monkeypatch):
+    """Тест: постраничные чтения не падают, пока другие потоки добавляют и удаляют оценки"""
+    monkeypatch.setattr("infrastructure.config.STORAGE_FSYNC", False)
+    file_path = str(tmp_path / "grades.json")
+    repo = GradeRepository(file_path, storage=JournalStorage(file_path, 'grade_id'))
+    repo.add_many([Grade("s1", f"c{i % 3}", i % 100) for i in range(300)])
+    stop = threading.Event()
+
+    def mutate(worker):
+        while not stop.is_set():
+            grade = repo.add(Grade("s1", f"c{worker}", 50))
+            repo.delete(grade.grade_id)
+
+    writers = [threading.Thread(target=mutate, args=(worker,)) for worker in range(2)]
+    for writer in writers:
+        writer.start()
+    try:
+        for _ in range(200):
+            assert len(repo.list_page(50, student_id="s1", min_score=10)) == 50
+            assert len(repo.list_page(50)) == 50
+            assert repo.count(course_id="c1", max_score=90) > 0
+    finally:
+        stop.set()
+        for writer in writers:
+            writer.join()
+    assert repo.count() == 300
+
+
+def test_delete_by_student_removes_grades_in_one_write(tmp_path):
+    """Тест: оценки студента удаляются по индексу одной записью и одним оповещением"""
+    repo = make_grade_repo(tmp_path)
+    repo.add_many([Grade(f"s{i % 4}", f"c{i % 3}", i) for i in range(200)])
+    writes, batches = [], []
+    record_changes = repo.storage.record_changes
+    repo.storage.record_changes = lambda changes, snapshot: (writes.append(len(changes)),
+                                                              record_changes(changes, snapshot))
+    repo.add_listener(batches.append)
+
+    assert repo.delete_by_student("s1") == 50
+    in_course = len(repo.get_by_course("c0"))
+    assert repo.delete_by_course("c0") == in_course
+    assert repo.delete_by_student("s1") == 0
+
+    assert writes == [50, in_course]
+    assert [len(batch) for batch in batches] == [50, in_course]
+    assert all(event.kind == 'deleted' for batch in batches for event in batch)
+    assert repo.get_by_student("s1") == [] and repo.get_by_course("c0") == []
+    assert repo.check_indexes(rebuild=False)
+    assert len(make_grade_repo(tmp_path).get_all()) == 150 - in_course
+
+
+def test_orphan_sweep_removes_grades_of_deleted_entities(tmp_path):
+    """Тест: команда очистки удаляет оценки удаленных студентов и курсов и пересчитывает GPA"""
+    from infrastructure.orphans import sweep_orphans
+    from infrastructure.stats import MaterializedStats, StudentGpaSync
+
+    students = StudentRepository(str(tmp_path / "students.json"))
+    courses = CourseRepository(str(tmp_path / "courses.json"))
+    grades = make_grade_repo(tmp_path)
+    ivan, maria = students.add(Student("Иван", "ivan@example.com")), students.add(Student("Мария", "maria@example.com"))
+    math, art = courses.add(Course("MATH", "Математика", 4)), courses.add(Course("ART", "Рисование", 2))
+    grades.add_many([Grade(ivan.student_id, math.course_id, 90), Grade(ivan.student_id, art.course_id, 40),
+                     Grade(maria.student_id, math.course_id, 70)])
+    StudentGpaSync(MaterializedStats(grades), students).sync_all()
+    # Удаление мимо API оставляет оценки
+    students.delete(maria.student_id)
+    courses.delete(art.course_id)
+
+    assert len(sweep_orphans(grades, students, courses, dry_run=True)) == 2
+    assert len(grades.get_all()) == 3
+    assert len(sweep_orphans(grades, students, courses)) == 2
+    assert [(g.student_id, g.course_id) for g in grades.get_all()] == [(ivan.student_id, math.course_id)]
+    assert students.get_by_id(ivan.student_id).gpa == 4.5
+    assert sweep_orphans(grades, students, courses) == []
@@ -0,0 +1,192 @@
+"""
+Тесты для репозиториев на SQLite
+"""
+import pytest
+
+from domain.exceptions import DuplicateKeyError
+from domain.models import Course, Grade, Student
+from infrastructure.repositories import GradeRepository
+from infrastructure.sqlite_repositories import (
+    SqliteCourseRepository, SqliteDatabase, SqliteGradeRepository, SqliteStudentRepository
+)
+from infrastructure.stats import MaterializedStats, StudentGpaSync
+
+
+@pytest.fixture
+def database(tmp_path):
+    return SqliteDatabase(str(tmp_path / "test.db"))
+
+
+def test_sqlite_uses_wal(database):
+    """Тест: база открыта в режиме WAL"""
+    assert database.connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_sqlite_student_crud_and_unique_email(database):
+    """Тест: CRUD студентов и уникальность email без учета регистра"""
+    repo = SqliteStudentRepository(database)
+    ivan = repo.add(Student("Иван", "Ivan@Example.com"))
+    maria = repo.add(Student("Мария", "maria@example.com"))
+
+    assert repo.get_by_email("ivan@example.com").student_id == ivan.student_id
+    assert [s.student_id for s in repo.get_all()] == [ivan.student_id, maria.student_id]
+    assert [s.student_id for s in repo.get_many([maria.student_id, "нет", ivan.student_id, maria.student_id])] == \
+        [maria.student_id, ivan.student_id]
+    with pytest.raises(DuplicateKeyError):
+        repo.add(Student("Другой Иван", "IVAN@example.com"))
+    with pytest.raises(DuplicateKeyError):
+        repo.update(maria.student_id, email="ivan@example.com")
+
+    assert repo.update(maria.student_id, name="Мария П.").name == "Мария П."
+    assert repo.delete(ivan.student_id) is True
+    assert repo.delete(ivan.student_id) is False
+    assert repo.get_by_id(ivan.student_id) is None
+
+
+def test_sqlite_course_unique_code(database):
+    """Тест: код курса уникален"""
+    repo = SqliteCourseRepository(database)
+    course = repo.add(Course("CS101", "Программирование", 4))
+
+    assert repo.get_by_code("cs101").course_id == course.course_id
+    with pytest.raises(DuplicateKeyError):
+        repo.add(Course("cs101", "Другой курс", 3))
+
+
+def test_sqlite_grades_with_stats_and_gpa(database):
+    """Тест: оценки, события для статистики и GPA поверх SQLite"""
+    students = SqliteStudentRepository(database)
+    grades = SqliteGradeRepository(database)
+    stats = MaterializedStats(grades)
+    StudentGpaSync(stats, students)
+    ivan = students.add(Student("Иван", "ivan@example.com"))
+    maria = students.add(Student("Мария", "maria@example.com"))
+
+    g1 = grades.add(Grade(ivan.student_id, "c1", 70))
+    g2 = grades.add(Grade(ivan.student_id, "c2", 90))
+    grades.add(Grade(maria.student_id, "c1", 95))
+    grades.update(g1.grade_id, 50)
+
+    assert [g.grade_id for g in grades.get_by_student(ivan.student_id)] == [g1.grade_id, g2.grade_id]
+    assert [g.score for g in grades.get_by_student_and_course(ivan.student_id, "c1")] == [50]
+    assert grades.get_by_id(g1.grade_id).letter_grade == '1'
+    assert grades.calculate_student_gpa(ivan.student_id) == 3.5
+    assert students.get_by_id(ivan.student_id).gpa == 3.5
+    assert [s.student_id for s in students.top_by_gpa(1)] == [maria.student_id]
+
+    grades.delete(g2.grade_id)
+    assert stats.verify() == []
+    assert stats.course("c1").count == 2
+    assert grades.check_indexes()
+
+
+def test_sqlite_keyset_pagination(database):
+    """Тест: постраничная выборка оценок по курсору в SQLite"""
+    grades = SqliteGradeRepository(database)
+    for i in range(12):
+        grades.add(Grade(f"s{i % 2}", "c1", i * 8))
+
+    first = grades.list_page(5)
+    second = grades.list_page(5, after=first[-1].grade_id)
+    all_ids = sorted(g.grade_id for g in grades.get_all())
+    assert [g.grade_id for g in first + second] == all_ids[:10]
+
+    page = grades.list_page(10, student_id="s0", min_score=20)
+    assert all(g.student_id == "s0" and g.score >= 20 for g in page)
+    assert grades.count(student_id="s0", min_score=20) == len(page)
+
+    cutoff = sorted(g.date for g in grades.get_all())[3]
+    later = grades.list_page(100, date_from=cutoff, max_score=60)
+    assert [g.grade_id for g in later] == sorted(
+        g.grade_id for g in grades.get_all() if g.date >= cutoff and g.score <= 60)
+    assert later
+    assert grades.count(date_from=cutoff, max_score=60) == len(later) == len(grades.find(date_from=cutoff, max_score=60))
+    in_order = sorted(grades.get_all(), key=lambda grade: (grade.date, grade.grade_id))
+    assert [g.grade_id for g in grades.find()] == [g.grade_id for g in in_order]
+    assert [g.grade_id for g in grades.find(student_id="s1")] == [g.grade_id for g in in_order if g.student_id == "s1"]
+
+
+def test_sqlite_add_many_single_transaction(database):
+    """Тест: пачка оценок пишется одной транзакцией, дубликат email откатывает пачку студентов"""
+    students = SqliteStudentRepository(database)
+    grades = SqliteGradeRepository(database)
+    stats = MaterializedStats(grades)
+
+    with pytest.raises(DuplicateKeyError) as error:
+        students.add_many([Student("Иван", "ivan@example.com"), Student("Иван 2", "IVAN@example.com")])
+    assert error.value.value == "IVAN@example.com"
+    assert students.count() == 0
+
+    batch = grades.add_many([Grade(f"s{i % 4}", "c1", i * 2) for i in range(40)])
+    assert grades.count() == 40
+    assert grades.generation == 1
+    assert stats.course("c1").count == 40
+    assert [g.grade_id for g in grades.get_by_student("s1")] == [g.grade_id for g in batch[1::4]]
+
+
+def test_sqlite_update_gpas_without_changes_keeps_generation(database):
+    """Тест: update_gpas без изменений в SQLite не меняет поколение"""
+    students = SqliteStudentRepository(database)
+    student = students.add(Student("Иван", "ivan@example.com"))
+    assert students.update_gpas({student.student_id: 4.5}) == 1
+    generation = students.generation
+
+    assert students.update_gpas({student.student_id: 4.5, "missing": 3.0}) == 0
+    assert students.generation == generation
+    assert students.update_gpas({student.student_id: None}) == 1
+    assert students.generation == generation + 1 and students.get_by_id(student.student_id).gpa is None
+
+
+def test_generation_grows_after_listeners(tmp_path, database):
+    """Тест: счетчик изменений растет после подписчиков (кэш не увидит его со старой статистикой)"""
+    for repo in (SqliteGradeRepository(database), GradeRepository(str(tmp_path / "grades.json"))):
+        seen = []
+        repo.add_listener(lambda events, repo=repo: seen.append(repo.generation))
+        before = repo.generation
+        repo.add(Grade("s1", "c1", 80))
+        assert seen == [before] and repo.generation > before
+
+
+def test_sqlite_concurrent_deletes_emit_one_event(database):
+    """Тест: параллельные удаления одной оценки дают подписчикам одно событие"""
+    import threading
+
+    repo = SqliteGradeRepository(database)
+    grade = repo.add(Grade("s1", "c1", 80))
+    events = []
+    repo.add_listener(events.extend)
+
+    start = threading.Barrier(4)
+    def delete():
+        start.wait()
+        repo.delete(grade.grade_id)
+    threads = [threading.Thread(target=delete) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [event.kind for event in events] == ['deleted']
+
+
+def test_sqlite_worker_sees_changes_of_another_worker(tmp_path):
+    """Тест: изменения другого воркера (своя база-соединение) пересчитывают статистику и счетчик"""
+    path = str(tmp_path / "shared.db")
+    grades = SqliteGradeRepository(SqliteDatabase(path))
+    stats = MaterializedStats(grades)
+    other = SqliteGradeRepository(SqliteDatabase(path))
+
+    grades.add(Grade("s1", "c1", 60))
+    assert grades.refresh() is False
+    other.add(Grade("s1", "c1", 100))
+    other.delete("missing")
+
+    generation = grades.generation
+    assert grades.refresh() is True
+    assert grades.generation > generation and grades.refresh() is False
+    assert stats.overall.count == 2 and stats.student("s1").average == 80
+
+    # Запись этого воркера после чужой тоже сначала учитывает чужие изменения
+    other.add(Grade("s2", "c1", 70))
+    grades.add(Grade("s3", "c1", 50))
+    assert stats.overall.count == 4 and grades.refresh() is False
@@ -0,0 +1,125 @@
+"""
+Тесты для материализованной статистики
+"""
+import random
+import threading
+
+from domain.models import Grade, Student
+from infrastructure.repositories import GradeRepository, StudentRepository
+from infrastructure.stats import MaterializedStats, StudentGpaSync
+
+
+def make_stats(tmp_path):
+    repo = GradeRepository(str(tmp_path / "grades.json"))
+    return repo, MaterializedStats(repo)
+
+
+def test_stats_follow_random_mutations(tmp_path):
+    """Тест: инкрементальное состояние совпадает с полным пересчетом"""
+    repo, stats = make_stats(tmp_path)
+    rnd = random.Random(7)
+    ids = []
+    for _ in range(200):
+        action = rnd.random()
+        if action < 0.6 or not ids:
+            grade = repo.add(Grade(f"s{rnd.randint(1, 5)}", f"c{rnd.randint(1, 3)}", rnd.uniform(0, 100)))
+            ids.append(grade.grade_id)
+        elif action < 0.8:
+            repo.update(rnd.choice(ids), rnd.uniform(0, 100))
+        else:
+            repo.delete(ids.pop(rnd.randrange(len(ids))))
+
+    assert stats.verify() == []
+    assert stats.overall.count == len(ids)
+
+
+def test_stats_refresh_extremes_after_delete(tmp_path):
+    """Тест: min/max пересчитываются после удаления крайнего балла"""
+    repo, stats = make_stats(tmp_path)
+    low = repo.add(Grade("s1", "c1", 40))
+    repo.add(Grade("s1", "c2", 70))
+    high = repo.add(Grade("s1", "c1", 95))
+
+    repo.delete(low.grade_id)
+    repo.update(high.grade_id, 60)
+
+    acc = stats.student("s1")
+    assert (acc.count, acc.min, acc.max) == (2, 60, 70)
+    assert stats.pair("s1", "c1").count == 1
+    assert stats.course("c2").average == 70
+    assert stats.select(student_id="s1", course_id="c1").max == 60
+
+
+def test_stats_extremes_refresh_does_not_race_with_delete(tmp_path):
+    """Тест: удаление во время досчета min/max не теряется (досчет и события под одной блокировкой)"""
+    repo, stats = make_stats(tmp_path)
+    low = repo.add(Grade("s1", "c1", 30))
+    repo.add(Grade("s1", "c1", 90))
+    repo.delete(repo.add(Grade("s1", "c1", 10)).grade_id)
+
+    get_by_student = repo.get_by_student
+    deleter = threading.Thread(target=repo.delete, args=(low.grade_id,))
+
+    def scan_while_deleting(student_id):
+        grades = get_by_student(student_id)
+        # Другой поток удаляет минимальный балл, пока досчет перебирает оценки
+        deleter.start()
+        deleter.join(0.2)
+        return grades
+
+    repo.get_by_student = scan_while_deleting
+    stats.student("s1")
+    repo.get_by_student = get_by_student
+    deleter.join(5)
+    acc = stats.student("s1")
+    assert (acc.count, acc.min, acc.max) == (1, 90, 90)
+
+
+def test_stats_verify_detects_drift_and_rebuild_fixes_it(tmp_path):
+    """Тест: режим проверки находит расхождение, полный пересчет его устраняет"""
+    repo, stats = make_stats(tmp_path)
+    repo.add(Grade("s1", "c1", 80))
+    stats.student("s1").count += 1
+
+    assert stats.verify()
+    stats.rebuild()
+    assert stats.verify() == []
+
+
+def test_student_gpa_follows_grades(tmp_path):
+    """Тест: GPA студента и рейтинг обновляются при изменении оценок"""
+    students = StudentRepository(str(tmp_path / "students.json"))
+    repo, stats = make_stats(tmp_path)
+    StudentGpaSync(stats, students)
+    ivan = students.add(Student("Иван", "ivan@example.com"))
+    maria = students.add(Student("Мария", "maria@example.com"))
+    oleg = students.add(Student("Олег", "oleg@example.com"))
+
+    repo.add(Grade(ivan.student_id, "c1", 70))
+    grade = repo.add(Grade(maria.student_id, "c1", 90))
+    assert (ivan.gpa, maria.gpa, oleg.gpa) == (3.5, 4.5, None)
+    assert students.top_by_gpa(2) == [maria, ivan]
+
+    repo.update(grade.grade_id, 50)
+    assert maria.gpa == 2.5
+    assert students.top_by_gpa(3) == [ivan, maria, oleg]
+
+    repo.delete(grade.grade_id)
+    assert maria.gpa is None
+    assert students.top_by_gpa(3) == [ivan, maria, oleg]
+
+    reloaded = StudentRepository(str(tmp_path / "students.json"))
+    assert reloaded.get_by_id(ivan.student_id).gpa == 3.5
+
+
+def test_stats_describe_refreshes_after_mutation(tmp_path):
+    """Тест: медиана из кэша пересчитывается после изменения оценок"""
+    repo, stats = make_stats(tmp_path)
+    for score in (50, 60, 90):
+        repo.add(Grade("s1", "c1", score))
+
+    assert stats.describe().median == 60
+    assert stats.describe(student_id="s1", course_id="c1") is stats.describe(student_id="s1", course_id="c1")
+    repo.add(Grade("s1", "c1", 100))
+    assert stats.describe().median == 75
+    assert stats.describe(course_id="missing").size == 0
@@ -0,0 +1,346 @@
+"""
+Тесты для хранилищ репозиториев
+"""
+import json
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from domain.exceptions import DuplicateKeyError
+from domain.models import Grade, Student
+from infrastructure import storage as storage_module
+from infrastructure.binary_snapshot import convert_json_file, decode_records, encode_records
+from infrastructure.repositories import GradeRepository, StudentRepository
+from infrastructure.storage import (
+    BinarySnapshotStorage, JournalStorage, JsonFileStorage, PersistenceError, WriteBehindStorage
+)
+
+
+def make_repo(tmp_path, compact_threshold=1000):
+    file_path = str(tmp_path / "grades.json")
+    storage = JournalStorage(file_path, 'grade_id', compact_threshold=compact_threshold)
+    return GradeRepository(file_path, storage=storage)
+
+
+def test_journal_appends_one_line_per_mutation(tmp_path):
+    """Тест: каждая мутация дописывает одну строку в журнал"""
+    repo = make_repo(tmp_path)
+    grade = repo.add(Grade("s1", "c1", 75))
+    repo.update(grade.grade_id, 95)
+    repo.delete(grade.grade_id)
+
+    with open(repo.storage.log_path, encoding='utf-8') as f:
+        ops = [json.loads(line)['op'] for line in f]
+    assert ops == ['put', 'put', 'delete']
+    assert not (tmp_path / "grades.json").exists()
+
+
+def test_journal_replay_restores_state(tmp_path):
+    """Тест: снимок + журнал восстанавливаются при старте"""
+    repo = make_repo(tmp_path)
+    kept = repo.add(Grade("s1", "c1", 75))
+    removed = repo.add(Grade("s2", "c1", 50))
+    repo.update(kept.grade_id, 91)
+    repo.delete(removed.grade_id)
+
+    reloaded = make_repo(tmp_path)
+    assert list(reloaded.grades) == [kept.grade_id]
+    assert reloaded.grades[kept.grade_id].score == 91
+    assert reloaded.grades[kept.grade_id].letter_grade == '5'
+
+
+def test_journal_compaction_rolls_log_into_snapshot(tmp_path):
+    """Тест: компактизация сворачивает журнал в снимок"""
+    repo = make_repo(tmp_path, compact_threshold=3)
+    grades = [repo.add(Grade("s1", "c1", score)) for score in (60, 70, 80, 90)]
+    repo.storage.flush()
+
+    with open(tmp_path / "grades.json", encoding='utf-8') as f:
+        assert len(json.load(f)) == 3
+    assert not (tmp_path / "grades.json.log.1").exists()
+
+    reloaded = make_repo(tmp_path)
+    assert list(reloaded.grades) == [g.grade_id for g in grades]
+
+
+def test_journal_ignores_torn_last_line(tmp_path):
+    """Тест: недописанная строка журнала не ломает загрузку"""
+    repo = make_repo(tmp_path)
+    grade = repo.add(Grade("s1", "c1", 75))
+    with open(repo.storage.log_path, 'a', encoding='utf-8') as f:
+        f.write('{"op": "put", "rec')
+
+    reloaded = make_repo(tmp_path)
+    assert list(reloaded.grades) == [grade.grade_id]
+
+
+def test_journal_torn_line_does_not_swallow_later_writes(tmp_path):
+    """Тест: после сбоя посреди записи новые изменения не дописываются в обрывок строки"""
+    repo = make_repo(tmp_path)
+    first = repo.add(Grade("s1", "c1", 75))
+    with open(repo.storage.log_path, 'a', encoding='utf-8') as f:
+        f.write('{"op": "put", "rec')
+
+    restarted = make_repo(tmp_path)
+    second = restarted.add(Grade("s2", "c1", 80))
+    third = restarted.add(Grade("s3", "c1", 90))
+
+    reloaded = make_repo(tmp_path)
+    assert sorted(reloaded.grades) == sorted([first.grade_id, second.grade_id, third.grade_id])
+
+
+def test_journal_append_after_torn_line_of_another_writer(tmp_path):
+    """Тест: запись после обрыва чужой строки (без перезапуска) начинается с новой строки"""
+    repo = make_repo(tmp_path)
+    first = repo.add(Grade("s1", "c1", 75))
+    with open(repo.storage.log_path, 'a', encoding='utf-8') as f:
+        f.write('{"op": "put", "rec')
+    second = repo.add(Grade("s2", "c1", 80))
+
+    reloaded = make_repo(tmp_path)
+    assert sorted(reloaded.grades) == sorted([first.grade_id, second.grade_id])
+
+
+def test_binary_snapshot_round_trip():
+    """Тест: бинарный снимок сохраняет строки, числа, None и прочие значения"""
+    records = [
+        {"id": "a", "name": "Иван", "credits": 4, "gpa": 4.5, "flag": True},
+        {"id": "b", "name": "Иван", "credits": None, "gpa": None, "flag": [1, "x"]},
+        {"id": "c", "name": "", "credits": 2 ** 40, "gpa": 3.0, "flag": None},
+    ]
+    assert decode_records(encode_records(records)) == records
+    assert decode_records(encode_records([])) == []
+
+
+def test_binary_storage_migrates_json_and_compacts(tmp_path):
+    """Тест: бинарное хранилище подхватывает JSON снимок с журналом и сворачивает журнал в .snap"""
+    json_repo = make_repo(tmp_path)
+    grades = [json_repo.add(Grade("s1", f"c{i}", 50 + i)) for i in range(4)]
+    json_repo.delete(grades[0].grade_id)
+
+    file_path = str(tmp_path / "grades.json")
+    repo = GradeRepository(file_path, storage=BinarySnapshotStorage(file_path, 'grade_id', compact_threshold=2))
+    assert list(repo.grades) == [g.grade_id for g in grades[1:]]
+    assert (tmp_path / "grades.snap").exists()
+
+    repo.update(grades[1].grade_id, 99)
+    repo.add(Grade("s2", "c1", 70))
+    repo.storage.flush()
+    assert not (tmp_path / "grades.snap.log.1").exists()
+
+    reloaded = GradeRepository(file_path, storage=BinarySnapshotStorage(file_path, 'grade_id'))
+    assert len(reloaded.grades) == 4
+    assert reloaded.grades[grades[1].grade_id].score == 99
+    assert reloaded.get_by_student("s1")[0].student_id == "s1"
+
+
+def test_convert_json_file_is_seen_by_running_binary_worker(tmp_path):
+    """Тест: конвертация пишет .snap под блокировкой с новым поколением, и работающий воркер его перечитывает"""
+    file_path = str(tmp_path / "grades.json")
+    worker = GradeRepository(file_path, storage=BinarySnapshotStorage(file_path, 'grade_id'))
+    worker.add(Grade("s0", "c1", 40))
+    json_repo = make_repo(tmp_path)
+    added = [json_repo.add(Grade("s1", f"c{i}", 60 + i)) for i in range(3)]
+
+    target = convert_json_file(file_path)
+
+    assert target == str(tmp_path / "grades.snap")
+    assert not (tmp_path / "grades.snap.tmp").exists()
+    assert worker.refresh()
+    assert sorted(worker.grades) == sorted(grade.grade_id for grade in added)
+
+
+def test_failed_write_keeps_previous_file(tmp_path, monkeypatch):
+    """Тест: сбой посреди записи не портит файл, а ошибка не глотается"""
+    file_path = str(tmp_path / "grades.json")
+    repo = GradeRepository(file_path, storage=JsonFileStorage(file_path))
+    kept = repo.add(Grade("s1", "c1", 75))
+
+    def crash(path, records):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('[{"grade_id": ')
+        raise OSError("disk full")
+
+    monkeypatch.setattr(storage_module, "_write_json_snapshot", crash)
+    with pytest.raises(PersistenceError):
+        repo.add(Grade("s2", "c1", 50))
+    monkeypatch.undo()
+
+    assert [g["grade_id"] for g in json.loads((tmp_path / "grades.json").read_text())] == [kept.grade_id]
+    assert not (tmp_path / "grades.json.tmp").exists()
+    # Несохраненная оценка пропадает из памяти при следующем обращении
+    repo.refresh()
+    assert list(repo.grades) == [kept.grade_id]
+
+
+def test_corrupted_file_is_not_loaded_as_empty(tmp_path):
+    """Тест: поврежденный файл дает PersistenceError вместо пустой коллекции"""
+    (tmp_path / "grades.json").write_text('[{"grade_id": ', encoding='utf-8')
+    file_path = str(tmp_path / "grades.json")
+    with pytest.raises(PersistenceError):
+        GradeRepository(file_path, storage=JsonFileStorage(file_path))
+
+
+def test_repository_picks_up_changes_of_another_instance(tmp_path):
+    """Тест: репозиторий видит изменения другого процесса и не затирает их"""
+    first, second = make_repo(tmp_path), make_repo(tmp_path)
+    grade = first.add(Grade("s1", "c1", 75))
+    assert second.refresh()
+    assert second.get_by_student("s1") == [second.grades[grade.grade_id]]
+
+    second.update(grade.grade_id, 40)
+    other = first.add(Grade("s2", "c1", 90))
+    assert first.grades[grade.grade_id].score == 40
+
+    reloaded = make_repo(tmp_path)
+    assert sorted(reloaded.grades) == sorted([grade.grade_id, other.grade_id])
+    assert reloaded.grades[grade.grade_id].score == 40
+
+
+def _add_grades(file_path, mode, worker, count):
+    if mode == "json":
+        storage = JsonFileStorage(file_path)
+    else:
+        storage = JournalStorage(file_path, 'grade_id', compact_threshold=7)
+    repo = GradeRepository(file_path, storage=storage)
+    for i in range(count):
+        repo.add(Grade(f"s{worker}", "c1", i))
+    repo.storage.flush()
+
+
+def _add_student(file_path, email, results):
+    repo = StudentRepository(file_path, storage=JsonFileStorage(file_path))
+    try:
+        repo.add(Student("Студент", email))
+        results.put(True)
+    except DuplicateKeyError:
+        results.put(False)
+
+
+fork_only = pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(),
+                               reason="нужен fork")
+
+
+@fork_only
+@pytest.mark.parametrize("mode", ["json", "journal"])
+def test_concurrent_processes_do_not_lose_updates(tmp_path, mode):
+    """Тест: параллельные процессы пишут в один файл без потерянных изменений"""
+    file_path = str(tmp_path / "grades.json")
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_add_grades, args=(file_path, mode, worker, 25)) for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    storage = JsonFileStorage(file_path) if mode == "json" else JournalStorage(file_path, 'grade_id')
+    repo = GradeRepository(file_path, storage=storage)
+    assert repo.count() == 100
+    assert {student_id: repo.count(student_id=student_id) for student_id in repo._by_student} == \
+        {f"s{worker}": 25 for worker in range(4)}
+
+
+@fork_only
+def test_concurrent_processes_keep_emails_unique(tmp_path):
+    """Тест: уникальность email соблюдается между процессами"""
+    file_path = str(tmp_path / "students.json")
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [context.Process(target=_add_student, args=(file_path, "same@example.com", results)) for _ in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+
+    assert sorted(results.get() for _ in workers) == [False, False, False, True]
+    assert StudentRepository(file_path, storage=JsonFileStorage(file_path)).count() == 1
+
+
+def make_write_behind_repo(tmp_path, interval=60.0, max_pending=1000):
+    file_path = str(tmp_path / "grades.json")
+    storage = WriteBehindStorage(JsonFileStorage(file_path), 'grade_id', interval=interval, max_pending=max_pending)
+    return GradeRepository(file_path, storage=storage)
+
+
+def test_write_behind_coalesces_burst_into_one_write(tmp_path):
+    """Тест: серия изменений записывается одним сбросом"""
+    repo = make_write_behind_repo(tmp_path)
+    grades = [repo.add(Grade("s1", "c1", score)) for score in range(40)]
+    repo.update(grades[0].grade_id, 99)
+    assert not (tmp_path / "grades.json").exists()
+    assert repo.storage.metrics()["pending_records"] == 40
+    assert repo.storage.metrics()["pending_changes"] == 41
+
+    repo.storage.flush()
+    metrics = repo.storage.metrics()
+    assert (metrics["flushes"], metrics["flushed_changes"], metrics["pending_records"]) == (1, 41, 0)
+    file_path = str(tmp_path / "grades.json")
+    reloaded = GradeRepository(file_path, storage=JsonFileStorage(file_path))
+    assert len(reloaded.grades) == 40
+    assert reloaded.grades[grades[0].grade_id].score == 99
+
+
+def test_write_behind_flushes_in_background(tmp_path):
+    """Тест: очередь сбрасывается фоновым потоком по числу изменений и по времени"""
+    repo = make_write_behind_repo(tmp_path, max_pending=3)
+    for score in (60, 70, 80):
+        repo.add(Grade("s1", "c1", score))
+    (tmp_path / "timed").mkdir()
+    timed = make_write_behind_repo(tmp_path / "timed", interval=0.05)
+    timed.add(Grade("s2", "c1", 50))
+
+    deadline = time.monotonic() + 5
+    while (repo.storage.metrics()["flushes"] == 0 or timed.storage.metrics()["flushes"] == 0) \
+            and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert repo.storage.metrics()["flushed_changes"] == 3
+    assert timed.storage.metrics()["flushed_changes"] == 1
+    assert repo.storage.metrics()["last_flush_latency_seconds"] is not None
+
+
+def test_write_behind_save_all_during_compaction(tmp_path):
+    """Тест: save_all поверх журнала не зависает, пока идет компактизация"""
+    file_path = str(tmp_path / "grades.json")
+    journal = JournalStorage(file_path, 'grade_id', compact_threshold=2)
+    release = threading.Event()
+    write_snapshot_file = journal._write_snapshot_file
+
+    def slow_compaction(path, records):
+        if threading.current_thread().name == "journal-compaction":
+            release.wait(5)
+        write_snapshot_file(path, records)
+
+    journal._write_snapshot_file = slow_compaction
+    storage = WriteBehindStorage(journal, 'grade_id', interval=60.0, max_pending=1000)
+    repo = GradeRepository(file_path, storage=storage)
+    for score in (60, 70, 80):
+        repo.add(Grade("s1", "c1", score))
+    # Очередь дописывается в журнал и запускает компактизацию, которая ждет release
+    assert storage._flush_pending()
+    assert journal._compaction.is_alive()
+
+    saver = threading.Thread(target=storage.save_all, args=(repo._snapshot(),), daemon=True)
+    saver.start()
+    time.sleep(0.05)
+    release.set()
+    saver.join(5)
+    assert not saver.is_alive()
+    reloaded = GradeRepository(file_path, storage=JsonFileStorage(file_path))
+    assert sorted(reloaded.grades) == sorted(repo.grades)
+
+
+def test_write_behind_merges_changes_of_another_process(tmp_path):
+    """Тест: отложенная запись не затирает то, что успел записать другой процесс"""
+    file_path = str(tmp_path / "grades.json")
+    delayed = make_write_behind_repo(tmp_path)
+    mine = delayed.add(Grade("s1", "c1", 75))
+    other = GradeRepository(file_path, storage=JsonFileStorage(file_path)).add(Grade("s2", "c1", 90))
+
+    delayed.storage.flush()
+    reloaded = GradeRepository(file_path, storage=JsonFileStorage(file_path))
+    assert sorted(reloaded.grades) == sorted([mine.grade_id, other.grade_id])
+    assert delayed.refresh()
+    assert sorted(delayed.grades) == sorted([mine.grade_id, other.grade_id])
@@ -36,9 +36,10 @@ const GradesPage = () => {
       setLoading(true);
       const cleanedFilters = cleanFilters(filters);
       const [gradesData, studentsData, coursesData] = await Promise.all([
-        gradeApi.getAll(cleanedFilters),
-        studentApi.getAll(),
-        courseApi.getAll()
+        gradeApi.getAll({ ...cleanedFilters, expand: 'student,course' }),
+        // Для выпадающих списков нужны только ID и названия
+        studentApi.getAll({ fields: 'student_id,name' }),
+        courseApi.getAll({ fields: 'course_id,code,name' })
       ]);
       setGrades(gradesData);
       setStudents(studentsData);
@@ -243,8 +244,9 @@ const GradesPage = () => {
                 </TableRow>
               ) : (
                 grades.map((grade) => {
-                  const student = students.find(s => s.student_id === grade.student_id);
-                  const course = courses.find(c => c.course_id === grade.course_id);
+                  // Имена приходят вместе с оценкой (expand), списки - запасной вариант
+                  const student = grade.student || students.find(s => s.student_id === grade.student_id);
+                  const course = grade.course || courses.find(c => c.course_id === grade.course_id);
                   return (
                     <TableRow key={grade.grade_id}>
                       <TableCell>{student?.name || grade.student_id}</TableCell>
@@ -2,10 +2,35 @@ import axios from 'axios';
 
 const API_BASE = 'http://localhost:8001';
 
+// GET responses with an ETag are kept in memory: repeated requests send
+// If-None-Match, and on 304 the cached data is reused without a body
+const etagCache = new Map();
+
+const cachedGet = (url, config = {}) => {
+  const key = axios.getUri({ url, params: config.params });
+  const cached = etagCache.get(key);
+  return axios.get(url, {
+    ...config,
+    headers: cached ? { 'If-None-Match': cached.etag } : {},
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+  }).then(res => {
+    if (res.status === 304 && cached) {
+      return cached.data;
+    }
+    if (res.headers.etag) {
+      etagCache.set(key, { etag: res.headers.etag, data: res.data });
+    }
+    return res.data;
+  });
+};
+
 // Student API
 export const studentApi = {
-  getAll: () => axios.get(`${API_BASE}/students`).then(res => res.data),
+  // params.fields limits the response to the listed fields, e.g. 'student_id,name'
+  getAll: (params = {}) => cachedGet(`${API_BASE}/students`, { params }),
   getById: (id) => axios.get(`${API_BASE}/students/${id}`).then(res => res.data),
+  getMany: (ids) =>
+    axios.post(`${API_BASE}/students/batch`, { ids }).then(res => res.data),
   create: (student) => 
     axios.post(`${API_BASE}/students`, student).then(res => res.data),
   update: (id, student) => 
@@ -15,8 +40,10 @@ export const studentApi = {
 
 // Course API
 export const courseApi = {
-  getAll: () => axios.get(`${API_BASE}/courses`).then(res => res.data),
+  getAll: (params = {}) => cachedGet(`${API_BASE}/courses`, { params }),
   getById: (id) => axios.get(`${API_BASE}/courses/${id}`).then(res => res.data),
+  getMany: (ids) =>
+    axios.post(`${API_BASE}/courses/batch`, { ids }).then(res => res.data),
   create: (course) => 
     axios.post(`${API_BASE}/courses`, course).then(res => res.data),
   delete: (id) => axios.delete(`${API_BASE}/courses/${id}`),
@@ -25,7 +52,7 @@ export const courseApi = {
 // Grade API
 export const gradeApi = {
   getAll: (params = {}) => 
-    axios.get(`${API_BASE}/grades`, { params }).then(res => res.data),
+    cachedGet(`${API_BASE}/grades`, { params }),
   getById: (id) => axios.get(`${API_BASE}/grades/${id}`).then(res => res.data),
   create: (grade) => 
     axios.post(`${API_BASE}/grades`, grade).then(res => res.data),
@@ -37,9 +64,9 @@ export const gradeApi = {
 // Reports API
 export const reportsApi = {
   getStudentsSummary: (params = {}) => 
-    axios.get(`${API_BASE}/reports/students/summary`, { params }).then(res => res.data),
+    cachedGet(`${API_BASE}/reports/students/summary`, { params }),
   getCoursesSummary: () => 
-    axios.get(`${API_BASE}/reports/courses/summary`).then(res => res.data),
+    cachedGet(`${API_BASE}/reports/courses/summary`),
   getGradesStatistics: (params = {}) => 
-    axios.get(`${API_BASE}/reports/grades/statistics`, { params }).then(res => res.data),
+    cachedGet(`${API_BASE}/reports/grades/statistics`, { params }),
 };
\ No newline at end of file